@@ -5,7 +5,7 @@ Description: Uma biblioteca para backtesting de estratégias de negociação de
 File name: __main__.py
 Author: Daniel Tell <daniel.tell@gmail.com>
 Date created: 19/09/2022
-Date last modified: 19/09/2022
+Date last modified: 17/10/2026
 """
 
 import algotradingpy
@@ -19,13 +19,14 @@ import sys
 run_mode = "main"
 
 
-def run_get_data(log_dir):
+def run_get_data(log_dir, use_async=False, backfill=False):
     global run_mode
     run_mode = "get_data"
     console.create_logger(log_dir, run_mode)
-    console.show('Coleta de dados da Bitfinex foi iniciada')
+    mode = ' (carga histórica)' if backfill else ' (modo assíncrono)' if use_async else ''
+    console.show('Coleta de dados da Bitfinex foi iniciada' + mode)
 
-    getData = DataCollection()
+    getData = DataCollection(use_async=use_async, backfill=backfill)
     # symbols = config.get_symbols()
     # if ('btcusd' in symbols):
     #     print(symbols['btcusd'])
@@ -47,6 +48,16 @@ def main():
                             help='Coleta e popula continuamente cotações da Bitfinex no banco de dados.'
                                  ' Edite o arquivo de configuração (json) para incluir ou remover os símbolos,')
 
+        parser.add_argument('--async', dest='use_async', action='store_true',
+                            help='Usado com --get-data: faz os requests de todos os símbolos e timeframes em paralelo'
+                                 ' (até "concurrency" da configuração ao mesmo tempo) e grava no banco de dados'
+                                 ' enquanto os demais requests são feitos.')
+
+        parser.add_argument('--backfill', dest='backfill', action='store_true',
+                            help='Usado com --get-data: carrega o histórico desde "past" da configuração em janelas'
+                                 ' por símbolo e timeframe buscadas em paralelo e termina. As janelas concluídas são'
+                                 ' gravadas na tabela backfill, assim uma nova execução continua das pendentes.')
+
         parser.add_argument('--enable-logging', dest='logging',
                             help='Habilita geração de registros de atividades em arquivo de log.'
                                  ' Diretório do arquivo de log pode ser alterado através do argumento --log-dir.',
@@ -75,7 +86,7 @@ def main():
             log_dir = args.logdir
         console.log_level = config.get_loglevel()
         if args.getdata:
-            run_get_data(log_dir)
+            run_get_data(log_dir, args.use_async, args.backfill)
 
         #console.log_level = "debug";
         #config.set_file("/home/daniel/.AlgoTradingPy/config.json")
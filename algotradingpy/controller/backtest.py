@@ -4,21 +4,45 @@ Description: Módulo com classes que para aplicar as estratégias de backtesting
 File name: backtest.py
 Author: Daniel Tell <daniel.tell@gmail.com>
 Date created: 02/10/2021
-Date last modified: 24/10/2022
+Date last modified: 17/10/2026
 """
 import pandas as pd
 import numpy as np
 import algotradingpy.utils.indicators as indicators
+import algotradingpy.controller.engine as engine
 import algotradingpy.view.console as console
 from algotradingpy.model.setup import Setup
 from algotradingpy.model.asset import Asset
 from algotradingpy.model.signal import Signal
 from algotradingpy.model.btresult import BacktestResult
+from algotradingpy.model.tradelog import TradeLog, BUY, SELL_STOP_LOSS, SELL_STOP_GAIN, TRAILING_STOP, SELL_RSI, \
+    BUY_RSI
 import algotradingpy.utils.util as util
 from datetime import datetime, timedelta
 import json
 
 
+class Checkpoint:
+
+    def __init__(self, state, wallet_rows, last_index, equity, position, times):
+        r"""Estado de um backtest executado pelos motores vetorizados, usado por BackTest.update para processar
+        apenas os candles novos.
+
+        :param engine.EngineState state: estado do motor ao fim da última barra
+        :param list wallet_rows: registros [dia, saldo] do saldo diário, sem o registro da última barra
+        :param pd.Timestamp last_index: índice da última barra processada
+        :param np.ndarray equity: saldo da carteira em USD de cada barra processada
+        :param np.ndarray position: True nas barras que terminaram em posição comprado
+        :param np.ndarray times: timestamps int64 (ns) das barras processadas
+        """
+        self.state = state
+        self.wallet_rows = wallet_rows
+        self.last_index = last_index
+        self.equity = equity
+        self.position = position
+        self.times = times
+
+
 class BackTest:
 
     asset: Asset = None
@@ -28,14 +52,34 @@ class BackTest:
     __rsi: pd.Series = None
     signal: Signal = None
     bt_result: BacktestResult = None
-
-    def __init__(self, asset: Asset, setup: Setup, days: int):
-
+    _resume_key: tuple = None  # data inicial e parâmetros do setup do último backtest
+    _streams: dict = None  # indicadores incrementais (indicators.EmaStream, SmaStream e RsiStream) no último candle
+    _last_sign = np.nan  # sinal da diferença entre as médias no último candle
+    _stale = False  # indica se os indicadores devem ser recalculados (após um backtest continuado)
+
+    def __init__(self, asset: Asset, setup: Setup, days: int, engine="array", silent=False):
+        r"""Construtor de BackTest que executa o primeiro backtest de 'setup' nos últimos 'days' dias de 'asset'.
+
+        :param Asset asset: ativo com os dados de candlestick
+        :param Setup setup: setup do simulador
+        :param int days: quantidade de dias do backtest
+        :param str engine: motor do backtest, um dos valores em util.ENGINES: "array" (vetorizado, padrão) ou
+        "loop" (iteração linha a linha, mantido como referência)
+        :param bool silent: se True os backtests não registram as operações (TradeLog), usado em execuções em lote
+        """
+        self.silent = silent
+        self.set_engine(engine)
         self.setup = setup
         self.days = days
         self.asset = asset
         self.update()
 
+    def set_engine(self, engine):
+        if engine in util.ENGINES:
+            self.engine = engine
+        else:
+            raise Exception(f"Valor de engine é inválido! Valores aceitos: {util.ENGINES}")
+
     def get_symbol(self):
         return self.asset.symbol
 
@@ -77,18 +121,26 @@ class BackTest:
         return end_date.strftime("%Y-%m-%d")
 
     def get_rsi_series(self):
+        self._refresh_indicators()
         return self.__rsi
 
     def get_short_ema(self):
+        self._refresh_indicators()
         return self.__short_ema
 
     def get_long_sma(self):
+        self._refresh_indicators()
         return self.__long_sma
 
-    def update(self):
+    def update(self, full=False):
         r"""Atualiza as médias móveis/rsi e executa um backtest atualizando o atributo signal e o atributo 'returns'
-        de setup.
-        :param Asset asset:
+        de setup. Com o motor "array" e as estratégias MAxMA, MAxPrice e RSI_Min_Max o backtest anterior é
+        continuado, processando apenas os candles novos. Os candles antigos removidos por Mysql.update não
+        interrompem o backtest continuado, pois os indicadores incrementais e o estado da carteira são mantidos. O
+        backtest é refeito por completo se a data inicial ou o setup mudaram, se o último candle processado não existe
+        mais ou se 'full' for True.
+
+        :param bool full: se True sempre recalcula os indicadores e refaz o backtest
         :return: True se o backtest foi atualizado, ou seja, asset possui dados novos, caso contrario retorna False.
         :rtype: bool
         """
@@ -97,43 +149,121 @@ class BackTest:
 
         if self.asset.updated:
             self.asset.updated = False
+            start_date, end_date = self._get_start_date_bt(), self._get_end_date()
+            resume_key = (start_date, self._get_setup_key())
+            bt_result, first_signal = None, 0
+            if not full and resume_key == self._resume_key and self._can_resume():
+                bt_result, first_signal = self._resume()
+
+            if bt_result is None:
+                if self.setup.get_strategy().startswith("RSI"):
+                    self._update_rsi(self._get_start_date(), end_date)
+                else:
+                    self._update_moving_averages()
+                bt_result = self.run(start_date, end_date)
+                self._resume_key = resume_key if bt_result is not None else None
 
-            if self.setup.get_strategy().startswith("RSI"):
-                self._update_rsi(self._get_start_date(), self._get_end_date())
-            else:
-                self._update_moving_averages()
-
-            bt_result = self.run(self._get_start_date_bt(), self._get_end_date())
             if bt_result is not None:
                 self.bt_result = bt_result
                 self.setup.set_parameters(returns=bt_result.get_trade_returns(), accuracy=bt_result.get_accuracy(),
-                                          start_date=self._get_start_date_bt(), end_date=self._get_end_date())
+                                          start_date=start_date, end_date=end_date)
                 if self.signal is None:
                     self.signal = bt_result.get_signal()
-                else:
-                    list_signals = bt_result.get_signal().get_signals()
-                    for sig in list_signals:
-                        self.signal.insert_signal(sig["date"], sig["price"], sig["action"], sig["strategy"], sig["obs"],
-                                                  sig["rsi"])
+                elif self.signal is not bt_result.get_signal():
+                    self.signal.merge(bt_result.get_signal(), first_signal)
             return True
         else:
             return False
 
+    def _get_setup_key(self):
+        r"""Retorna os parâmetros do setup que definem o resultado do backtest."""
+        return (self.setup.get_strategy(), self.setup.start_money, self.setup.short, self.setup.long,
+                self.setup.stop_gain, self.setup.stop_loss, self.setup.trailing_stop, self.setup.rsi_min,
+                self.setup.rsi_max, self.setup.rsi_period, self.setup.buy_increase, self.setup.sell_decrease)
+
+    def _can_resume(self):
+        r"""Verifica se o último backtest pode ser continuado com os candles novos de asset."""
+        if self.engine != "array" or self.bt_result is None or self.bt_result.get_checkpoint() is None:
+            return False
+        if util.STRATEGIES[self.setup.get_strategy()] > 3:  # limites do RSI dependem de toda a série
+            return False
+        index = self.asset.candles.index
+        last_index = self.bt_result.get_checkpoint().last_index
+        pos = index.searchsorted(last_index, side="right")
+        return 0 < pos < len(index) and index[pos - 1] == last_index
+
+    def _resume(self):
+        r"""Continua os indicadores e o backtest anterior a partir do último candle processado.
+
+        :return: uma tupla com o BacktestResult e a posição do primeiro sinal novo, ou (None, 0) se houver erro
+        :rtype: tuple
+        """
+        try:
+            checkpoint = self.bt_result.get_checkpoint()
+            signal = self.bt_result.get_signal()
+            total_signals = len(signal)
+            pos = self.asset.candles.index.searchsorted(checkpoint.last_index, side="right")
+            index = self.asset.candles.index[pos:]
+            new_close = self.asset.candles["close"].to_numpy(dtype=np.float64)[pos:]
+
+            strategy = util.STRATEGIES[self.setup.get_strategy()]
+            if strategy <= 2:
+                ema = self._streams["ema"].update(new_close)
+                if strategy == 1:  # MA x MA
+                    diff = ema - self._streams["sma"].update(new_close)
+                else:  # MA x Price
+                    diff = new_close - ema
+                sign = np.sign(diff)
+                cross = np.append(self._last_sign, sign[:-1])  # sinais atrasados em um período
+                self._last_sign = sign[-1]
+                bt_result = _crossover_array(index, new_close, cross, self.setup, checkpoint, signal, self.silent)
+            else:
+                rsi = self._streams["rsi"].update(new_close)
+                bt_result = _rsi_array(index, new_close, rsi, self.setup, checkpoint, signal, self.silent)
+        except Exception as e:
+            console.show_error(f"Erro ao continuar backtest de {self.setup.get_strategy()} para {self.get_symbol()}", e)
+            return None, 0
+
+        self._stale = True
+        return bt_result, total_signals
+
+    def _refresh_indicators(self):
+        r"""Recalcula os indicadores se o último backtest foi continuado sem atualizá-los."""
+        if self._stale:
+            self._stale = False
+            if self.setup.get_strategy().startswith("RSI"):
+                self._update_rsi(self._get_start_date(), self._get_end_date())
+            else:
+                self._update_moving_averages()
+
     def _update_moving_averages(self):
         r"""Atualiza as médias móveis"""
         try:
             self.__short_ema = indicators.calc_ema(self.asset.candles, self.setup.short)
             self.__short_sma = indicators.calc_sma(self.asset.candles, self.setup.short)
             self.__long_sma = indicators.calc_sma(self.asset.candles, self.setup.long)
+            close = self.asset.candles["close"]
+            ema = self.__short_ema["close"].iloc[-1]
+            self._streams = {"ema": indicators.EmaStream(self.setup.short, last=ema)}
+            if util.STRATEGIES[self.setup.get_strategy()] == 1:  # MA x MA
+                self._streams["sma"] = indicators.SmaStream(self.setup.long, history=close.iloc[-self.setup.long:])
+                self._last_sign = np.sign(ema - self.__long_sma["close"].iloc[-1])
+            else:  # MA x Price
+                self._last_sign = np.sign(close.iloc[-1] - ema)
+            self._stale = False
         except Exception as e:
             console.show_error(f"Erro ao atualizar as médias móveis de {self.get_symbol()}: "
                                f"short {self.setup.short} long {self.setup.long}", e)
 
     def _update_rsi(self, start_date, end_date):
         r"""Atualiza o índice de força relativa (RSI) do ativo."""
-
-        self.__rsi = indicators.calc_rsi(values=self.asset.candles, start_date=start_date, end_date=end_date,
-                                         period=self.setup.rsi_period)
+        roll_up, roll_down = indicators.calc_rsi_averages(values=self.asset.candles, start_date=start_date,
+                                                          end_date=end_date, period=self.setup.rsi_period)
+        self.__rsi = indicators.calc_rsi_from_averages(roll_up, roll_down).loc[start_date: end_date]
+        self._streams = {"rsi": indicators.RsiStream(self.setup.rsi_period, roll_up=roll_up.iloc[-1],
+                                                     roll_down=roll_down.iloc[-1],
+                                                     last_close=self.asset.candles.at[roll_up.index[-1], "close"])}
+        self._stale = False
 
     def run(self, start_date, end_date) -> BacktestResult:
         r"""Executa um back test de acordo com a estratégia do atributo setup.
@@ -146,23 +276,26 @@ class BackTest:
         bt_result = None
         try:
             strategy = util.STRATEGIES[self.setup.get_strategy()]
+            crossover = _trading_crossover_engines[self.engine]
             if strategy == 1:  # MA x MA
-                bt_result = trading_crossover(setup=self.setup, df_candles=self.asset.candles,
-                                              df_short_ema=self.__short_ema, df_long_sma=self.__long_sma,
-                                              start_date=start_date, end_date=end_date)
+                bt_result = crossover(setup=self.setup, df_candles=self.asset.candles,
+                                      df_short_ema=self.__short_ema, df_long_sma=self.__long_sma,
+                                      start_date=start_date, end_date=end_date, silent=self.silent)
             elif strategy == 2:  # MA x Price
-                bt_result = trading_crossover(setup=self.setup, df_candles=self.asset.candles,
-                                              df_short_ema=self.asset.candles, df_long_sma=self.__short_ema,
-                                              start_date=start_date, end_date=end_date)
+                bt_result = crossover(setup=self.setup, df_candles=self.asset.candles,
+                                      df_short_ema=self.asset.candles, df_long_sma=self.__short_ema,
+                                      start_date=start_date, end_date=end_date, silent=self.silent)
             elif strategy == 3:  # RSI: Min, Max
-                bt_result = trading_rsi(df_candles=self.asset.candles, rsi_series=self.__rsi, start_date=start_date,
-                                        end_date=end_date, setup=self.setup)
+                bt_result = _trading_rsi_engines[self.engine](df_candles=self.asset.candles, rsi_series=self.__rsi,
+                                                              start_date=start_date, end_date=end_date,
+                                                              setup=self.setup, silent=self.silent)
             elif 4 <= strategy <= 6:  # RSI: 4=quartis. 5=pelos discrepantes, 6=pela média de quartis e discrepantes
                 rsi_min, rsi_max = indicators.get_rsi_thresholds(self.__rsi, self.setup.get_strategy())
                 self.setup.rsi_min = rsi_min
                 self.setup.rsi_max = rsi_max
-                bt_result = trading_rsi(df_candles=self.asset.candles, rsi_series=self.__rsi, start_date=start_date,
-                                        end_date=end_date, setup=self.setup)
+                bt_result = _trading_rsi_engines[self.engine](df_candles=self.asset.candles, rsi_series=self.__rsi,
+                                                              start_date=start_date, end_date=end_date,
+                                                              setup=self.setup, silent=self.silent)
 
         except Exception as e:
             console.show_error(f"Erro ao executar backtest de {self.setup.get_strategy()} para {self.get_symbol()}", e)
@@ -172,7 +305,7 @@ class BackTest:
     def get_json_signal(self, obs_only=False, limit=0):
         jsonstr = ""
         if self.signal is not None:
-            df_signal = pd.DataFrame(self.signal.get_signals())
+            df_signal = self.signal.to_dataframe()
             if obs_only:
                 df_signal = df_signal[df_signal.obs != ""]
 
@@ -190,7 +323,7 @@ class BackTest:
         return jsonstr
 
 
-def trading_crossover(df_candles, df_short_ema, df_long_sma, start_date, end_date, setup):
+def trading_crossover(df_candles, df_short_ema, df_long_sma, start_date, end_date, setup, silent=False):
     r"""Back-testing utilizando a estratégia de cruzamento entre as médias móveis de menor e maior período
     ou preço X média. Onde a entrada é no cruzamento e a saída: no stop gain/loss.
 
@@ -200,24 +333,25 @@ def trading_crossover(df_candles, df_short_ema, df_long_sma, start_date, end_dat
    :param pd.DataFrame df_long_sma: as médias móveis longas do preço fechamento dos candles
    :param str start_date: data inicial dos registros de candles
    :param str end_date: data final dos registros de candles
+   :param bool silent: se True não registra as operações (TradeLog)
    :return: objeto da classe BacktestResult
    :rtype: BacktestResult
    """
     my_wallet_usd = setup.start_money
     my_wallet_coins = buy_and_hold = 0
     accuracy = total_gains = total_losses = 0  # métricas para medir a precisão da estratégia
-    price_position = price_position_real = price_sell = price_buy = price = time_position = 0
+    price_position = price_position_real = price_sell = price_buy = price = 0
     last_row = last_balance = 0
     wallet_per_day = []  # lista que mantém o saldo da carteira em USD por dia
+    equity, position = [], []  # saldo da carteira em USD e se está comprado no fim de cada barra
     signal = Signal()
-    console.debug("Saldo inicial da carteira \033[1m(USD): {:.2f}\033[m".format(my_wallet_usd))
+    trade_log = None if silent else TradeLog(start_money=my_wallet_usd)
     df_cross = indicators.calc_crossover(df_short_ema, df_long_sma, start_date, end_date)  # dataframe com os cruzamentos de média ou preço x média
 
     for row in df_cross.itertuples():
         price = df_candles.loc[row.Index, "close"]  # preço verdadeiro
         price_buy = price + (price * setup.buy_increase / 100)  # preço com incremento de 'buy_increase'% ao comprar
         price_sell = price + (price * setup.sell_decrease / 100)  # preço com decremento de 'sell_decrease'% ao vender
-        time = row.Index.strftime("%d/%m/%Y %H:%M")
 
         if buy_and_hold == 0:
             buy_and_hold = my_wallet_usd / price_buy  # inicializa estrategia buy and hold
@@ -232,57 +366,38 @@ def trading_crossover(df_candles, df_short_ema, df_long_sma, start_date, end_dat
             price_position_real = price_buy
             signal.insert_signal(date=row.Index, price=price_buy, action=1, strategy=setup.get_strategy(),
                                  obs="Comprou")  # sinal compra simulação
-            if time_position == 0:  # primeira compra
-                console.debug(f"\033[1;34mPrimeira compra em {time} ({my_wallet_coins:.8f} moedas ao preço de "
-                              f"{price_buy:.5f} dólares \033[m)")
-            else:
-                interval = int((row.Index - time_position).total_seconds())
-                h = interval // 3600
-                m = (interval % 3600) // 60
-                console.debug(
-                    f"\033[1;34mPosição de compra em {time}, após {h:02d}h{m:02d}m ({my_wallet_coins:.8f} "
-                    f"moedas ao preço de {price_buy:.5f} dólares).\033[m")
-            time_position = row.Index  # atualiza o momento que fez a última operação, nesse caso foi compra
+            if trade_log is not None:
+                trade_log.record(row.Index.value, BUY, price_buy, coins=my_wallet_coins)
         elif my_wallet_coins > 0:  # se estiver em posicao comprado
             porc_price = ((price_sell / price_position) * 100) - 100
 
             if porc_price < setup.stop_loss:  # quando o preço cair abaixo do stop loss, vende o ativo
                 porc_price_real = ((price_sell / price_position_real) * 100) - 100  # % preço no momento da compra
                 if porc_price_real < 0:
-                    color = 31  # vermelho
                     total_losses += 1
                 else:
-                    color = 32  # verde
                     total_gains += 1
-                interval = int((row.Index - time_position).total_seconds())
-                h = interval // 3600
-                m = (interval % 3600) // 60
-                console.debug(f"\033[1;{color}mGatilho Stop Loss atingido em {time}, após {h:02d}h{m:02d}m "
-                              f"(stop {price_position:.5f}, compra {price_position_real:.5f}, venda {price_sell:.5f}, "
-                              f"var. stop {porc_price:.2f}%, var. real {porc_price_real:.2f}%).\033[m")
+                if trade_log is not None:
+                    trade_log.record(row.Index.value, SELL_STOP_LOSS, price_sell, price_position, price_position_real,
+                                     porc_price, porc_price_real, my_wallet_coins)
                 my_wallet_usd = my_wallet_coins * price_sell  # atualiza a quantidade moedas na carteira
                 my_wallet_coins = 0
-                time_position = row.Index
                 price_position = price_sell
                 signal.insert_signal(date=row.Index, price=price_sell, action=-1, strategy=setup.get_strategy(),
                                      obs=f"Vendeu por stop loss={porc_price:.2f}%")  # sinal venda simulação
 
             elif porc_price > setup.stop_gain:  # quando o preço subir e ultrapassar o stopgain
-                interval = int((row.Index - time_position).total_seconds())
-                h = interval // 3600
-                m = (interval % 3600) // 60
                 if setup.trailing_stop:  # atualiza o preço da última compra
-                    console.debug(
-                        f"\033[7;32mGatilho Trailing Stop em {time} (preço comprado {price_position:.5f}, "
-                        f"preço atual {price_buy:.5f}, aumento de {porc_price:.2f}%).\033[m")
+                    if trade_log is not None:
+                        trade_log.record(row.Index.value, TRAILING_STOP, price_buy, price_position, price_position_real,
+                                         porc_price, coins=my_wallet_coins)
                     price_position = price_buy
                 else:  # vende o ativo
-                    console.debug(
-                        f"\033[1;32mGatilho Stop Gain atingido em {time}, após {h:02d}h{m:02d}m (preço comprado "
-                        f"{price_position:.5f}, preço vendido {price_sell:.5f}, variação de {porc_price:.2f}%).\033[m")
+                    if trade_log is not None:
+                        trade_log.record(row.Index.value, SELL_STOP_GAIN, price_sell, price_position,
+                                         price_position_real, porc_price, coins=my_wallet_coins)
                     my_wallet_usd = my_wallet_coins * price_sell
                     my_wallet_coins = 0
-                    time_position = row.Index
                     price_position = price_sell
                     total_gains += 1
                     signal.insert_signal(date=row.Index, price=price_sell, action=-1, strategy=setup.get_strategy(),
@@ -295,9 +410,11 @@ def trading_crossover(df_candles, df_short_ema, df_long_sma, start_date, end_dat
             #else:
             #    signal.insert_signal(date=row.Index, price=price_sell, action=0, strategy=setup.get_strategy())
 
-        if row.Index.day_name() != last_row.Index.day_name():
+        if row.Index.date() != last_row.Index.date():
             wallet_per_day.append([last_row.Index, last_balance])  # armazena o resultado do dia anterior se mudar o dia
         last_balance = my_wallet_coins * price_sell if my_wallet_coins > 0 else my_wallet_usd  # ternário em Python
+        equity.append(last_balance)
+        position.append(my_wallet_coins > 0)
         last_row = row
     wallet_per_day.append([last_row.Index, last_balance])  # insere o último valor registrado no saldo diário
     df_wallet = pd.DataFrame(data=wallet_per_day)  # cria o df com a lista por dia
@@ -305,15 +422,12 @@ def trading_crossover(df_candles, df_short_ema, df_long_sma, start_date, end_dat
     df_wallet.set_index("day", inplace=True)  # cria um índice com a coluna dia (datetime)
     if my_wallet_coins > 0:
         trade_res = f"{((my_wallet_coins * price_sell / setup.start_money) * 100) - 100:.2f}"
-        console.debug("Finalizou período na posição comprado com {:.8f} moedas (\033[1mUSD {:.2f} = {}%\033[m)".format(
-            my_wallet_coins, my_wallet_coins * price, trade_res))
         if price_buy > price_position_real:  # se o preço subiu depois de comprado
             total_gains += 1  # acertou a previsão
         else:
             total_losses += 1  # errou a previsão
     else:
         trade_res = f"{((my_wallet_usd / setup.start_money) * 100) - 100:.2f}"
-        console.debug("Finalizou período na posição vendido com \033[1mUSD {:.2f} = {}%\033[m".format(my_wallet_usd, trade_res))
         if price_position > 0:  # se posicionou pelo menos 1 vez
             if price_sell > price_position_real:  # e o preço subiu depois de vendido
                 total_losses += 1  # errou a previsão
@@ -322,12 +436,153 @@ def trading_crossover(df_candles, df_short_ema, df_long_sma, start_date, end_dat
     buy_and_hold_res = ((buy_and_hold * price_sell / setup.start_money) * 100) - 100
     if total_gains > 0 or total_losses > 0:
         accuracy = (total_gains / (total_gains + total_losses)) * 100
+    if trade_log is not None:
+        trade_log.finish(my_wallet_coins, my_wallet_usd, price, trade_res, decimals=2)
+        if console.log_level == "debug":
+            trade_log.show()
 
     return BacktestResult(trade_returns=float(trade_res), buy_and_hold_returns=buy_and_hold_res, accuracy=accuracy,
-                          df_wallet=df_wallet, signal=signal)
+                          df_wallet=df_wallet, signal=signal, trade_log=trade_log,
+                          equity=np.array(equity, dtype=np.float64), position=np.array(position, dtype=bool),
+                          times=df_cross.index.values.astype("datetime64[ns]").view(np.int64))
+
+
+def trading_crossover_array(df_candles, df_short_ema, df_long_sma, start_date, end_date, setup, silent=False):
+    r"""Versão vetorizada de trading_crossover. Converte os DataFrames em arrays NumPy (preços de fechamento
+    alinhados, sinais dos cruzamentos e timestamps int64) e executa engine.crossover_engine, produzindo o mesmo
+    BacktestResult que trading_crossover.
+
+   :param Setup setup: setup inicial do simulador
+   :param pd.DataFrame df_candles: contém os preços de abertura, fechamento, minima, maxima e volume
+   :param pd.DataFrame df_short_ema: as médias móveis curtas do preço de fechamento dos candles
+   :param pd.DataFrame df_long_sma: as médias móveis longas do preço fechamento dos candles
+   :param str start_date: data inicial dos registros de candles
+   :param str end_date: data final dos registros de candles
+   :param bool silent: se True não registra as operações (TradeLog)
+   :return: objeto da classe BacktestResult
+   :rtype: BacktestResult
+   """
+    df_cross = indicators.calc_crossover(df_short_ema, df_long_sma, start_date, end_date)
+    index = df_cross.index
+    close = df_candles.loc[index, "close"].to_numpy(dtype=np.float64)
+    cross = df_cross["close"].to_numpy(dtype=np.float64)
+    return _crossover_array(index, close, cross, setup, silent=silent)
+
+
+def _crossover_array(index, close, cross, setup, checkpoint=None, signal=None, silent=False):
+    r"""Executa engine.crossover_engine sobre arrays alinhados com 'index' e monta o BacktestResult. Com um
+    'checkpoint' a simulação continua do estado salvo e os novos sinais são inseridos em 'signal'.
+
+    :param pd.DatetimeIndex index: índice das barras
+    :param np.ndarray close: preços de fechamento das barras
+    :param np.ndarray cross: sinal da diferença entre as médias, já atrasado em um período
+    :param Setup setup: setup do simulador
+    :param Checkpoint checkpoint: estado do backtest anterior, ou None para iniciar um novo
+    :param Signal signal: objeto que recebe os sinais, ou None para criar um novo
+    :param bool silent: se True não registra as operações (TradeLog)
+    :return: objeto da classe BacktestResult
+    :rtype: BacktestResult
+    """
+    state = checkpoint.state if checkpoint is not None else None
+    times = index.values.astype("datetime64[ns]").view(np.int64)
+    res = engine.crossover_engine(close=close, cross=cross, times=times, start_money=setup.start_money,
+                                  buy_increase=setup.buy_increase, sell_decrease=setup.sell_decrease,
+                                  stop_loss=setup.stop_loss, stop_gain=setup.stop_gain,
+                                  trailing_stop=setup.trailing_stop, state=state)
+    trade_log = None if silent else _trade_log(res, times, setup, state)
+
+    # sinais da simulação e sinais de cruzamento enquanto comprado, em ordem cronológica
+    bars = [e[0] for e in res.events if e[1] != engine.TRAILING_STOP] + res.raw_bars.tolist()
+    prices = [e[2] for e in res.events if e[1] != engine.TRAILING_STOP] + list(res.raw_prices)
+    actions = [1 if e[1] == engine.BUY else -1 for e in res.events if e[1] != engine.TRAILING_STOP] + \
+        res.raw_actions.tolist()
+    obs = [_CROSSOVER_OBS[e[1]].format(e[5]) for e in res.events if e[1] != engine.TRAILING_STOP] + \
+        [""] * len(res.raw_bars)
+    order = sorted(range(len(bars)), key=bars.__getitem__)
+    if signal is None:
+        signal = Signal()
+    signal.insert_signals(dates=index[[bars[i] for i in order]], prices=[prices[i] for i in order],
+                          actions=[actions[i] for i in order], strategy=setup.get_strategy(),
+                          obs=[obs[i] for i in order])
+
+    return _array_result(res, index, times, setup, checkpoint, signal, trade_log, decimals=2)
+
+
+_CROSSOVER_OBS = {engine.BUY: "Comprou", engine.SELL_STOP_LOSS: "Vendeu por stop loss={:.2f}%",
+                  engine.SELL_STOP_GAIN: "Vendeu por stop gain={:.2f}%"}
+
+_trading_crossover_engines = {"loop": trading_crossover, "array": trading_crossover_array}
+
+
+def _trade_log(res, times, setup, state=None, rsi=None):
+    r"""Cria o TradeLog com os eventos de um motor vetorizado. Ao continuar um backtest ('state') o saldo inicial
+    não é registrado e o intervalo da primeira operação é contado a partir da última operação anterior."""
+    trade_log = TradeLog(start_money=setup.start_money if state is None else None,
+                         time_position=state.time_position if state is not None else None)
+    trade_log.add_events(res.events, times, rsi)
+    return trade_log
+
+
+def _array_result(res, index, times, setup, checkpoint, signal, trade_log, decimals):
+    r"""Monta o BacktestResult de um motor vetorizado: saldo diário, retorno arredondado com 'decimals' casas
+    (como nas versões em loop) e o checkpoint para continuar o backtest."""
+    df_wallet, wallet_rows = _wallet_per_day(index, times, res, setup.start_money, checkpoint)
+    state = res.state
+    equity, position = res.balance, res.position
+    if checkpoint is not None:  # curva de capital desde o início do backtest
+        equity = np.concatenate((checkpoint.equity, equity))
+        position = np.concatenate((checkpoint.position, position))
+        times = np.concatenate((checkpoint.times, times))
+    trade_res = f"{res.trade_returns:.{decimals}f}"
+    if trade_log is not None:
+        trade_log.finish(state.wallet_coins, state.wallet_usd, res.price, trade_res, decimals=decimals)
+        if console.log_level == "debug":
+            trade_log.show()
+
+    return BacktestResult(trade_returns=float(trade_res), buy_and_hold_returns=res.buy_and_hold_returns,
+                          accuracy=res.accuracy, df_wallet=df_wallet, signal=signal,
+                          checkpoint=Checkpoint(state, wallet_rows, index[-1], equity, position, times),
+                          trade_log=trade_log, equity=equity, position=position, times=times)
+
+
+def _wallet_per_day(index, times, res, start_money, checkpoint=None):
+    r"""Monta o DataFrame com o saldo da carteira por dia a partir do saldo de cada barra.
+
+    :param pd.DatetimeIndex index: índice das barras do backtest
+    :param np.ndarray times: timestamps int64 (ns) das barras
+    :param engine.EngineResult res: resultado do motor, com o saldo de cada barra e os eventos
+    :param float start_money: saldo inicial da carteira, primeiro registro do saldo diário
+    :param Checkpoint checkpoint: estado do backtest anterior, cujos registros são continuados
+    :return: uma tupla com o DataFrame indexado por 'day' com a coluna 'balance' e a lista de registros sem o
+    registro da última barra
+    :rtype: tuple
+    """
+    # antes da primeira compra o saldo é o próprio 'start_money'
+    if checkpoint is not None and checkpoint.state.price_position > 0:
+        first_trade = -1
+    else:
+        first_trade = res.events[0][0] if res.events else len(index)
+    if checkpoint is None:
+        wallet_rows = [[index[0], start_money]]
+        bars = engine.wallet_per_day_bars(times)
+    else:
+        wallet_rows = list(checkpoint.wallet_rows)
+        bars = engine.wallet_per_day_bars(times, checkpoint.state.last_time)
+    for bar in bars.tolist():
+        if bar < 0:  # última barra do backtest anterior
+            wallet_rows.append([checkpoint.last_index,
+                                checkpoint.state.last_balance if first_trade < 0 else start_money])
+        else:
+            wallet_rows.append([index[bar], start_money if bar < first_trade else res.balance[bar]])
+    last = len(index) - 1
+    df_wallet = pd.DataFrame(data=wallet_rows + [[index[last], start_money if last < first_trade
+                                                  else res.balance[last]]])
+    df_wallet.columns = ("day", "balance")
+    df_wallet.set_index("day", inplace=True)
+    return df_wallet, wallet_rows
 
 
-def trading_rsi(df_candles, rsi_series, start_date, end_date, setup):
+def trading_rsi(df_candles, rsi_series, start_date, end_date, setup, silent=False):
     r"""Back-testing utilizando a estratégia RSI (Índice de Força Relativa), onde a entrada e saída é sinalizada
      pelo indicador de sobrevenda e sobrecompra do ativo.
 
@@ -336,23 +591,24 @@ def trading_rsi(df_candles, rsi_series, start_date, end_date, setup):
    :param pd.Series rsi_series: série que contém o Índice de Força Relativa de df_candle no período
    :param str start_date: data inicial dos registros de candles
    :param str end_date: data final dos registros de candles
+   :param bool silent: se True não registra as operações (TradeLog)
    :return: objeto da classe BacktestResult
    :rtype: BacktestResult
    """
     my_wallet_usd = setup.start_money
     my_wallet_coins = buy_and_hold = 0
     accuracy = total_gains = total_losses = 0  # métricas para medir a precisão da estratégia
-    price_position = time_position = 0
+    price_position = 0
     last_index = last_balance = 0
     wallet_per_day = []  # lista que mantém o saldo da carteira em USD por dia
+    equity, position = [], []  # saldo da carteira em USD e se está comprado no fim de cada barra
     signal = Signal()
-    console.debug("Saldo inicial da carteira \033[1m(USD): {:.2f}\033[m".format(my_wallet_usd))
+    trade_log = None if silent else TradeLog(start_money=my_wallet_usd)
     rsi_series = rsi_series.loc[start_date: end_date]
     for index, value in rsi_series.items():
         price = df_candles.loc[index, "close"]
         price_buy = price + (price * setup.buy_increase / 100)  # preço com incremento de 'buy_increase'% ao comprar
         price_sell = price + (price * setup.sell_decrease / 100)  # preço com decremento de 'sell_decrease'% ao vender
-        time = index.strftime("%d/%m/%Y %H:%M")
 
         if buy_and_hold == 0:
             buy_and_hold = my_wallet_usd / price_buy  # inicializa estrategia buy and hold
@@ -364,21 +620,14 @@ def trading_rsi(df_candles, rsi_series, start_date, end_date, setup):
             if my_wallet_coins > 0:  # e estiver em posicao comprado
                 porc_price = ((price_sell / price_position) * 100) - 100
                 if porc_price < 0:
-                    cor = 31  # vermelho
                     total_losses += 1
                 else:
-                    cor = 32  # verde
                     total_gains += 1
-
-                interval = int((index - time_position).total_seconds())
-                h = interval // 3600
-                m = (interval % 3600) // 60
-                console.debug(
-                    f"\033[1;{cor}mRSI sobrecomprado em {time}, após {h:02d}h{m:02d}m (RSI: {value:.2f}, "
-                    f"vendido a {price_sell:.5f}, preço de compra {price_position:.5f}, {porc_price:.2f}%).\033[m")
+                if trade_log is not None:
+                    trade_log.record(index.value, SELL_RSI, price_sell, price_position, porc=porc_price,
+                                     coins=my_wallet_coins, rsi=value)
                 my_wallet_usd = my_wallet_coins * price_sell  # atualiza a quantidade moedas na carteira
                 my_wallet_coins = 0  # atualiza a quantidade de USD na carteira
-                time_position = index  # atualiza o momento que fez a última operação, nesse caso foi venda
                 price_position = price_sell
                 signal.insert_signal(date=index, price=price_sell, action=-1, strategy=setup.get_strategy(),
                                      obs=f"Vendeu por sobrecompra RSI={value:.2f}", rsi=value)  # sinal simulador venda
@@ -391,19 +640,9 @@ def trading_rsi(df_candles, rsi_series, start_date, end_date, setup):
             if my_wallet_usd > 0:  # estiver em posição vendido
                 my_wallet_coins = my_wallet_usd / price_buy
                 my_wallet_usd = 0
-
-                if time_position == 0:   # primeira compra não calcular o tempo
-                    console.debug(f"\033[1;34mPrimeira compra, RSI sobrevendido em {time} (RSI: {value:.2f}, "
-                                  f"comprado {my_wallet_coins:.8f} moedas ao preço de {price_buy:.5f} USD \033[m).")
-                else:
-                    interval = int((index - time_position).total_seconds())
-                    h = interval // 3600
-                    m = (interval % 3600) // 60
-                    console.debug(f"\033[1;34mRSI sobrevendido em {time}, após {h:02d}h{m:02d}m (RSI: {value:.2f}, "
-                                  f"comprado {my_wallet_coins:.8f} moedas ao preço de {price_buy:.5f} USD).\033[m")
-
+                if trade_log is not None:
+                    trade_log.record(index.value, BUY_RSI, price_buy, coins=my_wallet_coins, rsi=value)
                 price_position = price_buy
-                time_position = index  # atualiza o momento que fez a última operação, nesse caso foi compra
                 signal.insert_signal(date=index, price=price_buy, action=1, strategy=setup.get_strategy(),
                                      obs=f"Comprou por sobrevenda RSI={value:.2f}", rsi=value)  # sinal simulador compra
 
@@ -411,9 +650,11 @@ def trading_rsi(df_candles, rsi_series, start_date, end_date, setup):
         #else:
         #    signal.insert_signal(date=index, price=price, action=0, strategy=setup.get_strategy())  # sinal neutro
 
-        if index.day_name() != last_index.day_name():
+        if index.date() != last_index.date():
             wallet_per_day.append([last_index, last_balance])  # armazena o resultado do dia anterior se mudar o dia
         last_balance = my_wallet_coins * price_sell if my_wallet_coins > 0 else my_wallet_usd  # ternário em Python
+        equity.append(last_balance)
+        position.append(my_wallet_coins > 0)
         last_index = index
 
     wallet_per_day.append([last_index, last_balance])  # insere o último valor registrado no saldo diário
@@ -422,16 +663,12 @@ def trading_rsi(df_candles, rsi_series, start_date, end_date, setup):
     df_wallet.set_index("day", inplace=True)  # cria um índice com a coluna dia (datetime)
     if my_wallet_coins > 0:
         trade_res = f"{((my_wallet_coins * price_sell / setup.start_money) * 100) - 100:.3f}"
-        console.debug("Finalizou período na posição comprado com {:.8f} moedas (\033[1mUSD {:.2f} = {}%\033[m)".format(
-            my_wallet_coins, my_wallet_coins * price, trade_res))
         if price_sell > price_position:  # e se preço subiu depois de comprado
             total_gains += 1  # acertou a previsão
         else:
             total_losses += 1  # errou a previsão
     else:
         trade_res = f"{((my_wallet_usd / setup.start_money) * 100) - 100:.3f}"
-        console.debug("Finalizou período na posição vendido com \033[1mUSD {:.3f} = {}%\033[m".
-                      format(my_wallet_usd, trade_res))
         if price_position > 0:  # se se posicionou pelo menos 1 vez
             if price_buy > price_position:  # e se preço subiu depois de vendido
                 total_losses += 1  # errou a previsão
@@ -441,7 +678,69 @@ def trading_rsi(df_candles, rsi_series, start_date, end_date, setup):
     buy_and_hold_res = ((buy_and_hold * price_sell / setup.start_money) * 100) - 100
     if total_gains > 0 or total_losses > 0:
         accuracy = (total_gains / (total_gains + total_losses)) * 100
+    if trade_log is not None:
+        trade_log.finish(my_wallet_coins, my_wallet_usd, price, trade_res, decimals=3)
+        if console.log_level == "debug":
+            trade_log.show()
 
     return BacktestResult(trade_returns=float(trade_res), buy_and_hold_returns=buy_and_hold_res, accuracy=accuracy,
-                          df_wallet=df_wallet, signal=signal)
+                          df_wallet=df_wallet, signal=signal, trade_log=trade_log,
+                          equity=np.array(equity, dtype=np.float64), position=np.array(position, dtype=bool),
+                          times=rsi_series.index.values.astype("datetime64[ns]").view(np.int64))
+
 
+def trading_rsi_array(df_candles, rsi_series, start_date, end_date, setup, silent=False):
+    r"""Versão vetorizada de trading_rsi. Converte a série RSI e os preços de fechamento alinhados em arrays NumPy e
+    executa engine.rsi_engine, produzindo o mesmo BacktestResult que trading_rsi.
+
+   :param Setup setup: setup inicial do simulador
+   :param pd.DataFrame df_candles: contém os preços de abertura, fechamento, minima, maxima e volume
+   :param pd.Series rsi_series: série que contém o Índice de Força Relativa de df_candle no período
+   :param str start_date: data inicial dos registros de candles
+   :param str end_date: data final dos registros de candles
+   :param bool silent: se True não registra as operações (TradeLog)
+   :return: objeto da classe BacktestResult
+   :rtype: BacktestResult
+   """
+    rsi_series = rsi_series.loc[start_date: end_date]
+    index = rsi_series.index
+    close = df_candles.loc[index, "close"].to_numpy(dtype=np.float64)
+    return _rsi_array(index, close, rsi_series.to_numpy(dtype=np.float64), setup, silent=silent)
+
+
+def _rsi_array(index, close, rsi, setup, checkpoint=None, signal=None, silent=False):
+    r"""Executa engine.rsi_engine sobre arrays alinhados com 'index' e monta o BacktestResult. Com um 'checkpoint'
+    a simulação continua do estado salvo e os novos sinais são inseridos em 'signal'.
+
+    :param pd.DatetimeIndex index: índice das barras
+    :param np.ndarray close: preços de fechamento das barras
+    :param np.ndarray rsi: índice de força relativa das barras
+    :param Setup setup: setup do simulador
+    :param Checkpoint checkpoint: estado do backtest anterior, ou None para iniciar um novo
+    :param Signal signal: objeto que recebe os sinais, ou None para criar um novo
+    :param bool silent: se True não registra as operações (TradeLog)
+    :return: objeto da classe BacktestResult
+    :rtype: BacktestResult
+    """
+    state = checkpoint.state if checkpoint is not None else None
+    times = index.values.astype("datetime64[ns]").view(np.int64)
+    res = engine.rsi_engine(close=close, rsi=rsi, times=times, rsi_min=setup.rsi_min, rsi_max=setup.rsi_max,
+                            start_money=setup.start_money, buy_increase=setup.buy_increase,
+                            sell_decrease=setup.sell_decrease, state=state)
+    trade_log = None if silent else _trade_log(res, times, setup, state, rsi)
+
+    # todas as barras de sobrecompra/sobrevenda geram sinal, as que mudaram a posição recebem a observação
+    obs = dict((e[0], _RSI_OBS[e[1]].format(rsi[e[0]])) for e in res.events)
+    bars = res.raw_bars.tolist()
+    if signal is None:
+        signal = Signal()
+    signal.insert_signals(dates=index[bars], prices=res.raw_prices, actions=res.raw_actions.tolist(),
+                          strategy=setup.get_strategy(), obs=[obs.get(bar, "") for bar in bars],
+                          rsi=rsi[bars].tolist())
+
+    return _array_result(res, index, times, setup, checkpoint, signal, trade_log, decimals=3)
+
+
+_RSI_OBS = {engine.SELL_RSI: "Vendeu por sobrecompra RSI={:.2f}", engine.BUY_RSI: "Comprou por sobrevenda RSI={:.2f}"}
+
+_trading_rsi_engines = {"loop": trading_rsi, "array": trading_rsi_array}
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+u"""
+Description: Módulo para agregar os trades (trades_raw) em barras de tempo, de ticks, de volume ou de dólar.
+File name: bars.py
+Author: Daniel Tell <daniel.tell@gmail.com>
+Date created: 17/10/2026
+Date last modified: 17/10/2026
+"""
+import numpy as np
+import pandas as pd
+from algotradingpy.controller.rollup import bucket_start
+
+BAR_TYPES = ("time", "tick", "volume", "dollar")  # tipos de barras aceitos por BarBuilder
+BAR_COLUMNS = ("open", "close", "low", "high", "volume")  # colunas das barras, as mesmas dos candles
+
+
+class BarBuilder:
+
+    def __init__(self, bar_type, size):
+        r"""Agrega trades em barras OHLCV a partir de blocos de trades em ordem cronológica, sem laço por trade.
+        Cada trade é atribuído a uma barra por uma soma acumulada e as barras de cada bloco são calculadas com
+        reduceat. Entre os blocos é guardado somente o OHLCV da última barra, que ainda pode receber trades do próximo
+        bloco, então a memória não depende da quantidade de trades, nem da quantidade de trades de uma barra.
+
+        - time: barras de duração 'size' (timeframe como 1m, 1h), alinhadas como os candles (rollup.bucket_start)
+        - tick: uma barra a cada 'size' trades
+        - volume: uma barra a cada 'size' unidades negociadas (soma de |amount|)
+        - dollar: uma barra a cada 'size' dólares negociados (soma de |amount| * price)
+
+        Nas barras de tick, volume e dólar a barra k contém os trades cuja soma acumulada antes do trade está em
+        [k * size, (k + 1) * size), ou seja, o trade que ultrapassa o limite fecha a barra.
+
+        :param str bar_type: um dos tipos em BAR_TYPES
+        :param size: timeframe das barras de tempo ou limite (número) das demais
+        """
+        if bar_type not in BAR_TYPES:
+            raise Exception(f"Valor de bar_type é inválido! Valores aceitos: {BAR_TYPES}")
+        if bar_type != "time" and not float(size) > 0:
+            raise Exception(f"Valor de size ({size}) é inválido! Deve ser maior que zero.")
+        self.bar_type = bar_type
+        self.size = size if bar_type == "time" else float(size)
+        self._bar = None  # (chave, OHLCV) da última barra, que ainda pode estar incompleta
+        self._offset = 0.0  # soma acumulada de todos os trades recebidos (barras de tick, volume e dólar)
+
+    def get_time_frame(self):
+        r"""Nome do 'timeframe' das barras, usado no Asset (ex.: 1m, tick_1000, volume_50)."""
+        return self.size if self.bar_type == "time" else f"{self.bar_type}_{self.size:g}"
+
+    def update(self, times, price, amount):
+        r"""Adiciona um bloco de trades e retorna as barras que foram fechadas.
+
+        :param np.ndarray times: timestamps (datetime64 ou int64 em ns) dos trades, em ordem crescente
+        :param np.ndarray price: preço de cada trade
+        :param np.ndarray amount: quantidade de cada trade (negativa nas vendas)
+        :return: DataFrame com as barras fechadas indexado por time (início da barra de tempo ou hora do primeiro
+        trade)
+        :rtype: pd.DataFrame
+        """
+        times = np.asarray(times).astype("datetime64[ns]").view(np.int64)
+        price = np.asarray(price, dtype=np.float64)
+        amount = np.abs(np.asarray(amount, dtype=np.float64))
+        if len(times) == 0:
+            return _frame(_bars(times, price, amount, np.empty(0, dtype=np.int64), times))
+        keys = self._bar_keys(times, price, amount)
+        starts = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+        bars = _bars(times, price, amount, starts, keys[starts] if self.bar_type == "time" else times[starts])
+        keys = keys[starts]
+        if self._bar is not None:
+            key, bar = self._bar
+            if key == keys[0]:  # o bloco continua a barra guardada
+                bars["time"][0], bars["open"][0] = bar["time"], bar["open"]
+                bars["low"][0] = min(bar["low"], bars["low"][0])
+                bars["high"][0] = max(bar["high"], bars["high"][0])
+                bars["volume"][0] += bar["volume"]
+            else:
+                bars = dict((name, np.append(bar[name], values)) for name, values in bars.items())
+                keys = np.append(key, keys)
+        # a última barra fica guardada até o próximo bloco
+        self._bar = (keys[-1], dict((name, values[-1]) for name, values in bars.items()))
+        return _frame(dict((name, values[:-1]) for name, values in bars.items()))
+
+    def finish(self):
+        r"""Retorna a última barra (com os trades que sobraram) e reinicia o BarBuilder."""
+        bars = {"time": np.empty(0, dtype=np.int64)}
+        if self._bar is not None:
+            bars = dict((name, np.array([value])) for name, value in self._bar[1].items())
+        self._bar, self._offset = None, 0.0
+        return _frame(bars)
+
+    def _bar_keys(self, times, price, amount):
+        r"""Chave da barra de cada trade: início da barra de tempo ou índice da barra (soma acumulada antes do trade
+        dividida por 'size')."""
+        if self.bar_type == "time":
+            return bucket_start(times, self.size)
+        if self.bar_type == "tick":
+            measure = np.ones(len(times))
+        elif self.bar_type == "volume":
+            measure = amount
+        else:
+            measure = amount * price
+        before = self._offset + np.cumsum(measure) - measure  # soma acumulada antes de cada trade
+        self._offset = before[-1] + measure[-1]
+        return np.floor(before / self.size).astype(np.int64)
+
+
+def _bars(times, price, amount, starts, labels):
+    r"""Calcula o OHLCV das barras que começam nas posições 'starts' dos trades, com o início de cada barra em
+    'labels' (timestamps int64 em ns)."""
+    if len(starts) == 0:
+        return dict((name, np.empty(0, dtype=np.int64 if name == "time" else np.float64))
+                    for name in ("time",) + BAR_COLUMNS)
+    ends = np.append(starts[1:], len(times)) - 1
+    return {"time": np.asarray(labels, dtype=np.int64), "open": price[starts], "close": price[ends],
+            "low": np.minimum.reduceat(price, starts), "high": np.maximum.reduceat(price, starts),
+            "volume": np.add.reduceat(amount, starts)}
+
+
+def _frame(bars):
+    r"""DataFrame com as barras de '_bars', indexado por time."""
+    return pd.DataFrame(dict((name, np.asarray(bars.get(name, np.empty(0)), dtype=np.float64))
+                             for name in BAR_COLUMNS),
+                        index=pd.DatetimeIndex(np.asarray(bars["time"], dtype=np.int64).view("datetime64[ns]"),
+                                               name="time"))
+
+
+def trade_bars(df_trades, bar_type, size):
+    r"""Agrega um DataFrame de trades (como o de Mysql.get_trades) em barras.
+
+    :param pd.DataFrame df_trades: trades indexados por time com as colunas price e amount
+    :param str bar_type: um dos tipos em BAR_TYPES
+    :param size: timeframe das barras de tempo ou limite (número) das demais
+    :return: DataFrame com as barras indexado por time
+    :rtype: pd.DataFrame
+    """
+    builder = BarBuilder(bar_type, size)
+    df_bars = builder.update(df_trades.index.values, df_trades["price"].to_numpy(), df_trades["amount"].to_numpy())
+    return pd.concat((df_bars, builder.finish()))
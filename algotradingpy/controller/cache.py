@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+u"""
+Description: Módulo com o cache local (em disco) dos dados de candlestick consultados no banco de dados.
+File name: cache.py
+Author: Daniel Tell <daniel.tell@gmail.com>
+Date created: 17/10/2026
+Date last modified: 17/10/2026
+"""
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+import algotradingpy.view.console as console
+
+CANDLE_COLUMNS = ("open", "close", "low", "high", "volume")  # colunas de candles_raw, na ordem de get_candles
+NS_PER_SECOND = 1_000_000_000  # a coluna time de candles_raw tem precisão de segundos
+
+
+class CandleCache:
+
+    def __init__(self, path):
+        r"""Cache de candles em disco, um arquivo NumPy (.npz) por símbolo e timeframe com as colunas time (int64 ns)
+        e OHLCV (float64), mais os intervalos de tempo que já foram consultados no banco. Assim uma nova consulta
+        busca no banco somente os intervalos que ainda não estão no cache.
+
+        :param str path: diretório dos arquivos do cache (criado se não existir)
+        """
+        self.path = path
+        self._memory = {}  # (símbolo, timeframe) -> dados já carregados do disco
+        self._locks = {}  # (símbolo, timeframe) -> lock que serializa a leitura e a gravação do arquivo
+        self._locks_lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, symbol, time_frame):
+        # letras maiúsculas são marcadas para não confundir 1M (mês) e 1m (minuto) em sistemas de arquivos que não
+        # diferenciam maiúsculas de minúsculas
+        time_frame = "".join(c + "_" if c.isupper() else c for c in time_frame)
+        return os.path.join(self.path, f"{symbol}-{time_frame}.npz")
+
+    def _lock(self, symbol, time_frame):
+        # consultas em paralelo (Mysql.submit/map) podem carregar e gravar o mesmo símbolo e timeframe; o RLock
+        # permite que store chame load com o lock já adquirido
+        with self._locks_lock:
+            return self._locks.setdefault((symbol, time_frame), threading.RLock())
+
+    def load(self, symbol, time_frame):
+        r"""Carrega os dados do cache de 'symbol' e 'time_frame'.
+
+        :return: dicionário com description, time, as colunas OHLCV e ranges (array n x 2 com os intervalos
+        [início, fim] em ns já consultados), ou None se não houver cache
+        :rtype: dict
+        """
+        key = (symbol, time_frame)
+        with self._lock(symbol, time_frame):
+            if key not in self._memory:
+                file = self._file(symbol, time_frame)
+                if not os.path.exists(file):
+                    return None
+                with np.load(file, allow_pickle=False) as npz:
+                    data = dict((name, npz[name]) for name in npz.files)
+                data["description"] = str(data["description"])
+                self._memory[key] = data
+            return self._memory[key]
+
+    def missing(self, symbol, time_frame, start_date, end_date):
+        r"""Calcula os intervalos entre 'start_date' e 'end_date' que ainda não foram consultados no banco.
+
+        :return: lista de tuplas (início, fim) com datetime, tipo aceito como parâmetro pelo mysql.connector
+        :rtype: list
+        """
+        start, end = pd.Timestamp(start_date).value, pd.Timestamp(end_date).value
+        data = self.load(symbol, time_frame)
+        gaps = []
+        for lo, hi in (data["ranges"].tolist() if data is not None else []):
+            if hi < start or lo > end:
+                continue
+            if lo > start:
+                gaps.append((start, lo - NS_PER_SECOND))
+            start = max(start, hi + NS_PER_SECOND)
+        if start <= end:
+            gaps.append((start, end))
+        return [(pd.Timestamp(lo).to_pydatetime(), pd.Timestamp(hi).to_pydatetime()) for lo, hi in gaps]
+
+    def store(self, symbol, time_frame, description, df_candles, start_date, end_date):
+        r"""Insere no cache os candles consultados no banco entre 'start_date' e 'end_date' e grava o arquivo.
+        O intervalo consultado só é marcado como completo até o último candle conhecido, pois o coletor insere os
+        candles em ordem e os mais novos ainda podem chegar.
+
+        :param str description: descrição do símbolo
+        :param pd.DataFrame df_candles: candles indexados por time com as colunas OHLCV, ou None se não houver
+        :param start_date: data inicial da consulta
+        :param end_date: data final da consulta
+        """
+        with self._lock(symbol, time_frame):
+            data = self.load(symbol, time_frame)
+            empty = df_candles is None or df_candles.empty
+            if empty and data is None:
+                return
+            if empty:
+                times = data["time"]
+                columns = dict((name, data[name]) for name in CANDLE_COLUMNS)
+                description = data["description"]
+            else:
+                times = df_candles.index.values.astype("datetime64[ns]").view(np.int64)
+                columns = dict((name, df_candles[name].to_numpy(dtype=np.float64)) for name in CANDLE_COLUMNS)
+                if data is not None:
+                    times = np.concatenate((data["time"], times))
+                    for name in CANDLE_COLUMNS:
+                        columns[name] = np.concatenate((data[name], columns[name]))
+                    # ordena pelo tempo e, em tempos repetidos, mantém o último candle consultado
+                    times, first = np.unique(times[::-1], return_index=True)
+                    keep = len(columns["open"]) - 1 - first
+                    columns = dict((name, values[keep]) for name, values in columns.items())
+            start, end = pd.Timestamp(start_date).value, min(pd.Timestamp(end_date).value, times[-1])
+            if start > end:
+                return
+            ranges = np.array([[start, end]], dtype=np.int64)
+            if data is not None:
+                ranges = np.concatenate((data["ranges"], ranges))
+            data = dict(columns, time=times, ranges=_merge_ranges(ranges), description=description)
+            self._memory[(symbol, time_frame)] = data
+            file = self._file(symbol, time_frame)
+            # arquivo temporário único no mesmo diretório, para que os.replace seja atômico
+            fd, temp = tempfile.mkstemp(suffix=".tmp.npz", dir=self.path)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, **dict(data, description=np.array(description)))
+                os.replace(temp, file)  # substitui o arquivo de uma vez, sem deixar um cache incompleto
+            except Exception:
+                os.remove(temp)
+                raise
+            console.debug(f"Cache de {symbol} ({time_frame}) atualizado com {0 if empty else len(df_candles)} candles, "
+                          f"total de {len(times)}.")
+
+    def get(self, symbol, time_frame, start_date, end_date):
+        r"""Retorna os candles do cache entre 'start_date' e 'end_date'.
+
+        :return: uma tupla com a descrição do símbolo e o DataFrame indexado por time, ou (None, None) se não houver
+        candles no período
+        :rtype: tuple
+        """
+        data = self.load(symbol, time_frame)
+        if data is None:
+            return None, None
+        times = data["time"]
+        first = np.searchsorted(times, pd.Timestamp(start_date).value, side="left")
+        last = np.searchsorted(times, pd.Timestamp(end_date).value, side="right")
+        if first >= last:
+            return None, None
+        index = pd.DatetimeIndex(times[first:last].view("datetime64[ns]"), name="time")
+        df_candles = pd.DataFrame(dict((name, data[name][first:last]) for name in CANDLE_COLUMNS), index=index)
+        return data["description"], df_candles
+
+    def clear(self, symbol, time_frame):
+        r"""Remove o cache de 'symbol' e 'time_frame', ex.: após inserir candles antigos no banco."""
+        with self._lock(symbol, time_frame):
+            self._memory.pop((symbol, time_frame), None)
+            file = self._file(symbol, time_frame)
+            if os.path.exists(file):
+                os.remove(file)
+
+
+def _merge_ranges(ranges):
+    r"""Une os intervalos [início, fim] que se sobrepõem ou são vizinhos (diferença de até um segundo)."""
+    ranges = ranges[np.argsort(ranges[:, 0], kind="stable")]
+    merged = [ranges[0].tolist()]
+    for lo, hi in ranges[1:].tolist():
+        if lo <= merged[-1][1] + NS_PER_SECOND:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return np.array(merged, dtype=np.int64)
@@ -3,22 +3,29 @@ Classe utilizada para obter os dados das criptomoedas na
 exchange Bitfinex inserindo em banco de dados Mysql.
 '''
 Created on 2021-10-23
-Updated on 2021-10-23
+Updated on 2026-10-17
 
 @author: Daniel Tell
 """
 from datetime import date
 
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
 import datetime
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
 import mysql.connector
 import mysql.connector as db
 from mysql.connector import Error
 import algotradingpy.utils.util as util
 from algotradingpy.view import console
+from algotradingpy.utils.ratelimit import RateLimiter
 import algotradingpy.utils.config as config
+from algotradingpy.controller.rollup import ROLLUP_BASE, CandleRollup, bucket_start, bucket_end
 
 
 class DataCollection:
@@ -29,10 +36,19 @@ class DataCollection:
     exec_hour = datetime.datetime.now()
     start_hour = datetime.datetime.now()
     dict_time_candles = {}
+    dict_next_candles = {}  # símbolo + timeframe -> momento (time.time()) da próxima consulta de candles
     dict_last_trades = {}
     dict_cid_symbol = {}
+    dict_rollup = {}  # (símbolo, timeframe) -> CandleRollup, quando os timeframes são calculados a partir de 1m
+    session = None  # requests.Session (keep-alive) usada nos requests da API, ou None para usar requests.get
+    limiter = RateLimiter(util.API_RATE_LIMITS)  # limite de requests por endpoint, compartilhado pelo processo
+    backfill = False  # True na carga histórica (run_backfill)
+    failed_windows = set()  # janelas (cid, timeframe, início) da carga histórica com erro ao gravar
 
-    def __init__(self):
+    def __init__(self, use_async=False, sweeps=None, backfill=False):
+        # use_async: coleta no modo assíncrono (run_async) em vez do laço sequencial (run)
+        # sweeps: quantidade de varreduras de todos os símbolos no modo assíncrono, None para coletar eternamente
+        # backfill: faz somente a carga histórica desde 'past' (run_backfill) e termina
 
         self.db_host = config.get_db_host()
         self.db_user = config.get_db_user()
@@ -45,12 +61,22 @@ class DataCollection:
             if tf not in util.API_TIME_FRAMES:
                 console.show_warning(f"AVISO! O timeframe '{tf}' configurado em config.json é inválido. "
                        f"São aceito apenas estes timeframes: {util.API_TIME_FRAMES}")
+        # Com 'rollup' somente os candles de 1m são buscados na API e os demais timeframes são calculados localmente
+        self.rollup = config.get_rollup()
+        self.api_time_frames = [ROLLUP_BASE] if self.rollup else self.time_frames
+        self.rollup_time_frames = [tf for tf in self.time_frames if tf != ROLLUP_BASE] if self.rollup else []
         self.start_date = config.get_past()
         self.interval = config.get_interval()
         self.api_limit = config.get_limit()
+        self.concurrency = config.get_concurrency()
         self.conn = self.connect()
         self.cursor = self.conn.cursor(buffered=True)
-        self.run()
+        if backfill:
+            self.run_backfill()
+        elif use_async:
+            self.run_async(sweeps)
+        else:
+            self.run()
 
     def connect(self):
         try:
@@ -66,16 +92,30 @@ class DataCollection:
         except Error as e:
             console.show_error('Não foi possível conectar com o banco de dados, causa:', e)
 
+    def prepare(self):
+        # Prepara o banco e carrega os últimos registros antes de iniciar a coleta (run ou run_async)
+        self.create_tables()
+        self.insert_new_coins()
+        self.update_coins()
+        # obtém o cid e timestamp dos últimos registros de trades de todos os simbolos de config.json
+        self.get_all_last_trades()
+        # obtém o timestamp últimos registros de candles de todos os simbolos e timeframes vindos de config.json
+        self.get_all_last_candles()
+        # inicializa o cálculo dos timeframes a partir de 1m com os candles que já estão no banco
+        self.start_rollup()
+        self.print_coins()
+
+    def reconnect(self):
+        try:
+            if not self.conn.is_connected():
+                console.show_warning('Não conectado com o banco de dados! Tentando reconectar...')
+                self.conn.reconnect()
+        except Exception as e:
+            console.show_error('Falha ao reconectar no banco de dados.', e)
+
     def run(self):
         try:
-            self.create_tables()
-            self.insert_new_coins()
-            self.update_coins()
-            # obtém o cid e timestamp dos últimos registros de trades de todos os simbolos de config.json
-            self.get_all_last_trades()
-            # obtém o timestamp últimos registros de candles de todos os simbolos e timeframes vindos de config.json
-            self.get_all_last_candles()
-            self.print_coins()
+            self.prepare()
             # Execute eternamente o seguinte:
             while True:
                 # Percorra cada símbolo do dicionario que está vindo do arquivo de configuração
@@ -85,19 +125,17 @@ class DataCollection:
                         cid = self.dict_cid_symbol[symbol]
                         last_in_trade = self.dict_last_trades[symbol]
                         self.insert_trade(cid, symbol, desc, last_in_trade)
-                        # consulta candles para cada timeframe que estiver no arquivo de configuracao
-                        for time_frame in self.time_frames:
-                            last_in_candle = self.dict_time_candles[str(symbol + time_frame)]
-                            self.insert_candle(cid, symbol, desc, time_frame, last_in_candle)
-                            time.sleep(self.interval)
-                        time.sleep(self.interval)
+                        # consulta candles para cada timeframe que estiver no arquivo de configuracao, logo após o
+                        # fechamento do candle ou seguidamente enquanto a API retornar 'api_limit' candles
+                        for time_frame in self.api_time_frames:
+                            while self.candle_due(symbol, time_frame):
+                                last_in_candle = self.dict_time_candles[str(symbol + time_frame)]
+                                if not self.insert_candle(cid, symbol, desc, time_frame, last_in_candle):
+                                    break
+                    # os requests são espaçados pelo limiter, 'interval' é a pausa máxima entre as varreduras
+                    time.sleep(self.get_sweep_delay())
                 except Exception as e:
-                    try:
-                        if not self.conn.is_connected():
-                            console.show_warning('Não conectado com o banco de dados! Tentando reconectar...')
-                            self.conn.reconnect()
-                    except Exception as e:
-                        console.show_error('Falha ao reconectar no banco de dados.', e)
+                    self.reconnect()
 
                 # Se passou 10 minutos mostre relatório dos inserts até o momento
                 if (datetime.datetime.now() - self.exec_hour).seconds > 600:
@@ -111,12 +149,249 @@ class DataCollection:
         finally:
             self.conn.close()
 
+    def run_async(self, sweeps=None):
+        # Coleta no modo assíncrono (--get-data --async): os requests de todos os símbolos e timeframes de uma
+        # varredura são feitos em paralelo e os registros são gravados no MySQL por uma única tarefa de escrita
+        try:
+            self.prepare()
+            asyncio.run(self.collect_async(sweeps))
+        except Error as e:
+            console.show_error('Erro no programa principal, causa:', e)
+        finally:
+            self.conn.close()
+
+    async def collect_async(self, sweeps=None):
+        # Cada varredura busca os trades de todos os símbolos e os candles que fecharam (candle_due) com até
+        # 'concurrency' requests ao mesmo tempo (start_pipeline). Os requests respondidos são gravados pela tarefa
+        # write_queue enquanto os demais requests continuam. A próxima varredura começa até 'interval' segundos
+        # (get_sweep_delay) depois que todos os registros da anterior foram gravados.
+        await self.start_pipeline()
+        sweep = 0
+        try:
+            while sweeps is None or sweep < sweeps:
+                started = time.monotonic()
+                jobs = []
+                for symbol, desc in self.symbols.items():
+                    symbol = str(symbol).strip()
+                    cid = self.dict_cid_symbol[symbol]
+                    jobs.append(self.collect_job('trades', self.fetch_trades, self.write_trades, cid,
+                                                 (symbol, desc, self.dict_last_trades[symbol])))
+                    jobs += [self.collect_candles(cid, symbol, desc, time_frame) for time_frame in self.api_time_frames
+                             if self.candle_due(symbol, time_frame)]
+                await asyncio.gather(*jobs)
+                await self.queue.join()
+                sweep += 1
+                console.debug(f'Varredura de {len(jobs)} requests concluída em {time.monotonic() - started:.1f} '
+                              f'segundos. Limites da API: {self.limiter.stats()}')
+                # Se passou 10 minutos mostre relatório dos inserts até o momento
+                if (datetime.datetime.now() - self.exec_hour).seconds > 600:
+                    self.print_results()
+                    self.exec_hour = datetime.datetime.now()
+                if sweeps is None or sweep < sweeps:
+                    await asyncio.sleep(self.get_sweep_delay())
+        finally:
+            await self.stop_pipeline()
+
+    async def start_pipeline(self):
+        # Cria a sessão HTTP keep-alive, as threads dos requests (no máximo 'concurrency' ao mesmo tempo) e a tarefa
+        # write_queue, que grava no MySQL em uma única thread os registros enviados para self.queue
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.fetch_executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='fetch')
+        self.write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mysql')
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.queue = asyncio.Queue()
+        self.writer = asyncio.ensure_future(self.write_queue())
+
+    async def stop_pipeline(self):
+        # Espera a gravação dos registros que estão na fila e libera as threads e a sessão HTTP
+        await self.queue.put(None)
+        await self.writer
+        self.fetch_executor.shutdown()
+        self.write_executor.shutdown()
+        self.session.close()
+        self.session = None
+
+    async def fetch_async(self, endpoint, fetch, *args):
+        # Executa o request 'fetch' em uma thread e retorna o resultado. A espera pelo limite de 'endpoint' é feita
+        # antes de ocupar uma thread, assim um endpoint parado não bloqueia os demais
+        while self.limiter[endpoint].delay() > 0:
+            await asyncio.sleep(self.limiter[endpoint].delay())
+        async with self.semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self.fetch_executor, fetch, *args)
+
+    async def collect_job(self, endpoint, fetch, write, cid, args):
+        # Faz um request da varredura e envia os registros para a fila de escrita
+        data = await self.fetch_async(endpoint, fetch, *args)
+        if data:
+            await self.queue.put((write, (cid,) + args + (data,)))
+
+    async def collect_candles(self, cid, symbol, desc, time_frame):
+        # Busca os candles do símbolo e timeframe e envia para a fila de escrita, com requests seguidos enquanto a API
+        # retornar 'api_limit' candles (fetch_candles agenda a próxima consulta para agora)
+        last_in_candle = self.dict_time_candles[str(symbol + time_frame)]
+        while self.candle_due(symbol, time_frame):
+            candles = await self.fetch_async('candles', self.fetch_candles, symbol, desc, time_frame, last_in_candle)
+            if not candles:
+                break
+            await self.queue.put((self.write_candles, (cid, symbol, desc, time_frame, last_in_candle, candles)))
+            last_in_candle = candles[-1][0] / 1000
+
+    async def write_queue(self):
+        # Grava no MySQL os registros da fila em uma única thread, até receber None. Os itens da carga histórica
+        # trazem a janela (cid, timeframe, início): depois de um erro ao gravar, os demais itens da janela (inclusive
+        # write_backfill_done) são descartados e a janela fica pendente
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.queue.get()
+            window = None
+            try:
+                if item is None:
+                    return
+                write, args = item[:2]
+                window = item[2] if len(item) > 2 else None
+                if window in self.failed_windows:
+                    continue
+                await loop.run_in_executor(self.write_executor, write, *args)
+            except Exception as e:
+                console.show_error('Erro ao gravar registros da API no MySQL.', e)
+                if window is not None:
+                    self.failed_windows.add(window)
+                await loop.run_in_executor(self.write_executor, self.reconnect)
+            finally:
+                self.queue.task_done()
+
+    def run_backfill(self):
+        # Carga histórica (--get-data --backfill): o período desde 'past' de config.json é dividido em janelas por
+        # símbolo e timeframe (ou trades), que são buscadas em paralelo dentro do limite da API e marcadas como
+        # concluídas na tabela backfill, assim uma nova execução continua das janelas que ficaram pendentes
+        try:
+            self.prepare()
+            self.backfill = True
+            asyncio.run(self.backfill_async())
+            # os candles de 1m da carga chegam fora de ordem, então os timeframes calculados a partir de 1m são
+            # recalculados desde 'past' (os candles que já estão no banco são ignorados pelo INSERT IGNORE)
+            self.start_rollup(since_past=True)
+            self.print_results()
+        except Error as e:
+            console.show_error('Erro na carga histórica, causa:', e)
+        finally:
+            self.backfill = False
+            self.conn.close()
+
+    async def backfill_async(self):
+        past = int(datetime.datetime.strptime(self.start_date, '%Y-%m-%d %H:%M:%S').timestamp() * 1000)
+        now = int(time.time() * 1000)
+        windows = []
+        for symbol in self.symbols:
+            cid = self.dict_cid_symbol[str(symbol).strip()]
+            windows += [(cid, util.BACKFILL_TRADES, start, end) for start, end in
+                        self.get_backfill_windows(util.BACKFILL_TRADES, past, now)]
+            for time_frame in self.api_time_frames:
+                # o candle atual ainda não está fechado
+                end = int(bucket_start([now * 1_000_000], time_frame)[0] // 1_000_000)
+                windows += [(cid, time_frame, start, window_end) for start, window_end in
+                            self.get_backfill_windows(time_frame, past, end)]
+        self.plan_backfill(windows)
+        kinds = [util.BACKFILL_TRADES] + list(self.api_time_frames)
+        symbols = dict((self.dict_cid_symbol[str(symbol).strip()], (str(symbol).strip(), desc))
+                       for symbol, desc in self.symbols.items())
+        pending = [window for window in self.get_pending_backfill() if window[0] in symbols and window[1] in kinds]
+        console.show(f'Carga histórica: {len(pending)} de {len(windows)} janelas pendentes.')
+        started = time.monotonic()
+        self.failed_windows = set()
+        await self.start_pipeline()
+        try:
+            results = await asyncio.gather(*(self.backfill_window(cid, *symbols[cid], kind, start, end)
+                                             for cid, kind, start, end in pending))
+            await self.queue.join()
+        finally:
+            await self.stop_pipeline()
+        done = sum(1 for result, window in zip(results, pending) if result and window[:3] not in self.failed_windows)
+        if len(self.failed_windows) > 0:
+            console.show_warning(f'Carga histórica: {len(self.failed_windows)} janelas ficaram pendentes por erro ao '
+                                 f'gravar no MySQL.')
+        console.show(f'Carga histórica: {done} de {len(pending)} janelas concluídas em '
+                     f'{time.monotonic() - started:.0f} segundos. Limites da API: {self.limiter.stats()}')
+
+    def get_backfill_windows(self, kind, start, end):
+        # Divide [start, end) (timestamps em ms) em janelas alinhadas a múltiplos do tamanho da janela, assim as
+        # janelas são as mesmas em todas as execuções. As janelas de candles têm 'api_limit' candles (um request)
+        if kind == util.BACKFILL_TRADES:
+            size = util.BACKFILL_TRADES_WINDOW * 1000
+        elif str(kind).endswith('M'):
+            size = self.api_limit * int(kind[:-1]) * 31 * 86400 * 1000
+        else:
+            size = self.api_limit * util.get_time_frame_seconds(kind) * 1000
+        first = start - start % size
+        return [(max(window, start), min(window + size, end)) for window in range(first, end, size)]
+
+    def plan_backfill(self, windows):
+        # Grava as janelas (cid, timeframe, início, fim) na tabela backfill, mantendo as que já foram concluídas
+        cursor2 = self.conn.cursor()
+        if len(windows) > 0:
+            self.insert_rows(cursor2, util.INSERT_TBL_BACKFILL, windows, util.VALUES_TBL_BACKFILL)
+        self.conn.commit()
+
+    def get_pending_backfill(self):
+        # Janelas (cid, timeframe, início, fim) que ainda não foram concluídas
+        cursor2 = self.conn.cursor(buffered=True)
+        cursor2.execute(util.SELECT_PENDING_BACKFILL)
+        return [(cid, kind, int(start), int(end)) for cid, kind, start, end in cursor2.fetchall()]
+
+    async def backfill_window(self, cid, symbol, desc, kind, start, end):
+        # Busca todos os registros da janela [start, end) em requests sucessivos de até 'api_limit' registros e marca
+        # a janela como concluída depois de gravá-los. Retorna False se algum request falhar (a janela fica pendente),
+        # se a gravação falhar a janela também fica pendente (write_queue)
+        window = (cid, kind, start)
+        records = 0
+        page = start
+        while page < end:
+            if kind == util.BACKFILL_TRADES:
+                data = await self.fetch_async('trades', self.fetch_trades, symbol, desc, (page - 1) / 1000, end - 1)
+                args = (self.write_trades, (cid, symbol, desc, (page - 1) / 1000, data))
+            else:
+                data = await self.fetch_async('candles', self.fetch_candles, symbol, desc, kind, (page - 1) / 1000,
+                                              end - 1)
+                args = (self.write_candles, (cid, symbol, desc, kind, (page - 1) / 1000, data))
+            if data is None:
+                console.show_warning(f'Janela {kind} de {symbol} a partir de {datetime.datetime.fromtimestamp(start / 1000)} ficou '
+                                     f'pendente.')
+                return False
+            if len(data) == 0:
+                break
+            await self.queue.put(args + (window,))
+            records += len(data)
+            # as janelas de candles têm no máximo 'api_limit' candles (get_backfill_windows)
+            if len(data) < self.api_limit or kind != util.BACKFILL_TRADES:
+                break
+            # os trades seguintes podem ter o mesmo timestamp do último (repetidos são ignorados pelo INSERT IGNORE)
+            last = data[-1][1]
+            page = last if last > page else last + 1
+        await self.queue.put((self.write_backfill_done, (cid, kind, start, records), window))
+        return True
+
+    def write_backfill_done(self, cid, kind, start, records):
+        cursor2 = self.conn.cursor()
+        cursor2.execute(util.UPDATE_DONE_TBL_BACKFILL, (records, cid, kind, start))
+        self.conn.commit()
+
     def create_tables(self):
         # Cria as tabelas no MySQL caso elas não existam
         try:
             self.cursor.execute(util.CREATE_TBL_COINS)
             self.cursor.execute(util.CREATE_TBL_TRADES_RAW)
             self.cursor.execute(util.CREATE_TBL_CANDLES_RAW)
+            self.cursor.execute(util.CREATE_TBL_CANDLE_COVERAGE)
+            self.cursor.execute(util.CREATE_TBL_BACKFILL)
+            # Preenche o catálogo candle_coverage a partir de candles_raw na primeira execução
+            self.cursor.execute(util.SELECT_COUNT_CANDLE_COVERAGE)
+            if self.cursor.fetchone()[0] == 0:
+                console.show('Criando o catálogo candle_coverage a partir da tabela candles_raw...')
+                self.cursor.execute(util.REBUILD_TBL_CANDLE_COVERAGE)
+                self.conn.commit()
         except Error as e:
             console.show_error('Erro ao criar tabela , causa:', e)
 
@@ -170,38 +445,64 @@ class DataCollection:
         except Error as e:
             console.show_error('Erro ao atualizar moedas do dicionário, causa:', e)
 
+    def request_api(self, endpoint, url, description):
+        # Faz um GET na API esperando o limite de requests de 'endpoint' (self.limiter) e retorna o JSON da resposta,
+        # ou None se o status não for 200. Com HTTP 429 (ou uma resposta de erro de ratelimit) somente o endpoint
+        # fica parado, pelo tempo de Retry-After ou do backoff exponencial, e o request é repetido até
+        # util.API_RETRIES vezes
+        bucket = self.limiter[endpoint]
+        for attempt in range(util.API_RETRIES + 1):
+            bucket.acquire()
+            r = (self.session or requests).get(url, timeout=util.API_TIMEOUT)
+            if r.status_code == 429 or (r.status_code == 200 and r.text.startswith('["error"')):
+                delay = bucket.backoff(r.headers.get('Retry-After'))
+                console.show_warning(f'Atingiu o ratelimit de {endpoint} ({description}), aguardando {delay:.1f} '
+                                     f'segundos...')
+                continue
+            bucket.success()
+            if r.status_code != 200:
+                console.debug('{} retornando status {} no request de {}.'.format(description, r.status_code, endpoint))
+                return None
+            return json.loads(r.text)
+        return None
+
     def insert_trade(self, cid, symbol, description, last_in_trade):
+        trades = self.fetch_trades(symbol, description, last_in_trade)
+        if not trades:
+            return False
+        self.write_trades(cid, symbol, description, last_in_trade, trades)
+        return True
+
+    def fetch_trades(self, symbol, description, last_in_trade, end_time=None):
+        # Busca na API os trades do símbolo depois de last_in_trade (timestamp em segundos) até end_time (ms, padrão
+        # agora), retorna uma lista vazia se não houver registros ou None se o request falhar
+        # Converta o obj datetime em milisegundos para ser utilizado na API
+        start_time = int(round(last_in_trade * 1000)) + 1
+        end_time = int(time.time() * 1000) if end_time is None else end_time
+        # Busque registros de trades para esse simbolo na API a partir de startTime (coluna lastintrade MySQL)
+        #print(str(util.API_GET_TRADES_V2).format(symbol.upper(), self.api_limit, start_time, end_time))
+        trades = []
+        try:
+            trades = self.request_api('trades', str(util.API_GET_TRADES_V2).format(
+                symbol.upper(), self.api_limit, start_time, end_time), description)
+            if trades is None:
+                return None
+        except (json.JSONDecodeError, requests.ConnectionError) as e:
+            console.show_error('Erro ao carregar o JSON de Trades da API, causa:', e)
+            return None
+        except Exception as e:
+            console.show_error('Erro durante execução do request na API.', e)
+            return None
+        # Verifique se o JSON está vazio
+        if len(trades) == 0:
+            console.debug('\033[1;31m{}\033[m sem registros de \033[7;34mtrade\033[m para inserir.'.format(description))
+        return trades
+
+    def write_trades(self, cid, symbol, description, last_in_trade, trades):
+        # Insere no MySQL os trades retornados por fetch_trades e atualiza o último trade do símbolo
         try:
-            # Converta o obj datetime em milisegundos para ser utilizado na API
-            start_time = (last_in_trade * 1000) + 1
-            end_time = int(time.time() * 1000)
             # Converta o timestamp (last_in_trade) vindo do MySQL para o objeto datetime para mostrar no print
             last_in_trade = datetime.datetime.fromtimestamp(last_in_trade)
-            # Busque registros de trades para esse simbolo na API a partir de startTime (coluna lastintrade MySQL)
-            #print(str(util.API_GET_TRADES_V2).format(symbol.upper(), self.api_limit, start_time, end_time))
-            trades = []
-            try:
-                r = requests.get(
-                    str(util.API_GET_TRADES_V2).format(symbol.upper(), self.api_limit, start_time, end_time))
-                if r.status_code != 200:
-                    console.debug('{} retornando status {} no request de trade.'.format(description, r.status_code))
-                    return False
-                trades = json.loads(r.text)
-            except (json.JSONDecodeError, requests.ConnectionError) as e:
-                console.show_error('Erro ao carregar o JSON de Trades da API, causa:', e)
-                return False
-            except Exception as e:
-                console.show_error('Erro durante execução do request na API.', e)
-                return False
-            # Verifique se o JSON está vazio ou se atin giu o ratelimit
-            if len(trades) == 0:
-                console.debug('\033[1;31m{}\033[m sem registros de \033[7;34mtrade\033[m para inserir.'.format(description))
-                return False
-            elif 'error' in trades:
-                msg = 'Atingiu o ratelimit, dormindo por 1 minuto...'
-                console.show_warning(msg)
-                time.sleep(60)
-                return False
             # Com o último registro do JSON converta para obj datetime e armazene na var. endTime para mostrar no print
             end_time_timestamp = trades[len(trades) - 1][1] / 1000
             end_time = datetime.datetime.fromtimestamp(end_time_timestamp)
@@ -209,12 +510,11 @@ class DataCollection:
                 'Inserindo {} registros de \033[7;34mtrades\033[m da moeda \033[7;34m{}\033[m. Período: {} a {}.'.format(
                     len(trades), description, last_in_trade.strftime("%d/%m/%Y %H:%M:%S"),
                     end_time.strftime("%d/%m/%Y %H:%M:%S")))
-            # Para cada registro  do JSON insira no MySQL
+            # Insira os registros do JSON no MySQL em lotes (INSERT com várias linhas)
             cursor2 = self.conn.cursor()
-            for trade in trades:
-                args = (trade[0], trade[1], trade[3], trade[2],
-                        'bitfinex', 'buy' if float(trade[2]) >= 0.0 else 'sell', cid)
-                cursor2.execute(util.INSERT_TBL_TRADES, args)
+            rows = [(trade[0], trade[1], trade[3], trade[2],
+                     'bitfinex', 'buy' if float(trade[2]) >= 0.0 else 'sell', cid) for trade in trades]
+            self.insert_rows(cursor2, util.INSERT_TBL_TRADES, rows, util.VALUES_TBL_TRADES)
             # Atualize a coluna lastintrade da moeada atual com o timestamp do último registro inserido em trades_raw
             args = (trades[len(trades) - 1][1], cid)
             cursor2.execute(util.UPDATE_LASTINTRADE_TBL_COINS, args)
@@ -224,40 +524,76 @@ class DataCollection:
         except Error as e:
             console.show_error('Erro ao inserir registros de trades no MySQL, causa:', e)
             raise Exception(e)
-        return True
 
     def insert_candle(self, cid, symbol, description, time_frame, last_in_candle):
+        candles = self.fetch_candles(symbol, description, time_frame, last_in_candle)
+        if not candles:
+            return False
+        self.write_candles(cid, symbol, description, time_frame, last_in_candle, candles)
+        return True
+
+    def fetch_candles(self, symbol, description, time_frame, last_in_candle, end_time=None):
+        # Busca na API os candles fechados do símbolo e timeframe depois de last_in_candle (timestamp em segundos) até
+        # end_time (ms, padrão agora), retorna uma lista vazia se não houver registros ou None se o request falhar
+        # Converta o obj datetime em milisegundos para ser utilizado na API
+        start_time = int(round(last_in_candle * 1000)) + 1
+        live = end_time is None
+        end_time = int(time.time() * 1000) if live else end_time
+        #print(str(util.API_GET_CANDLES).format(time_frame, symbol.upper(), self.api_limit, start_time, end_time))
+        candles = []
+        try:
+            candles = self.request_api('candles', str(util.API_GET_CANDLES).format(
+                time_frame, symbol.upper(), self.api_limit, start_time, end_time), description)
+            if candles is None:
+                return None
+        except (json.JSONDecodeError, requests.ConnectionError) as e:
+            console.show_error('Erro ao carregar o JSON de Candles da API, causa:', e)
+            return None
+        except Exception as e:
+            console.show_error('Erro durante execução do request na API.', e)
+            return None
+        if live:
+            self.schedule_candle(symbol, time_frame, candles)
+        # Verifique se o JSON está vazio
+        if len(candles) <= (1 if live else 0):
+            console.debug(
+                '\033[1;31m{} - {}\033[m sem registros de \033[7;33mcandles\033[m para inserir.'.format(description, time_frame))
+            return []
+        # não inserir o último candle até agora, pois não deve estar fechado ainda
+        return candles[:-1] if live else candles
+
+    def schedule_candle(self, symbol, time_frame, candles):
+        # Agenda a próxima consulta de candles do símbolo e timeframe a partir da resposta da API: imediatamente se a
+        # resposta veio com 'api_limit' candles (ainda há candles fechados para buscar), util.API_CLOSE_DELAY segundos
+        # após o fechamento do candle atual se a resposta já trouxe o candle atual, ou senão (o último candle fechado
+        # ainda não foi publicado, ou não houve negociações) até 'interval' segundos depois
+        now = time.time()
+        if len(candles) >= self.api_limit:
+            self.dict_next_candles[str(symbol + time_frame)] = now
+            return
+        current = bucket_start([time.time_ns()], time_frame)
+        due = bucket_end(current, time_frame)[0] / 1e9 + util.API_CLOSE_DELAY
+        if len(candles) == 0 or candles[-1][0] * 1_000_000 < current[0]:
+            due = min(due, now + self.interval)
+        self.dict_next_candles[str(symbol + time_frame)] = due
+
+    def candle_due(self, symbol, time_frame):
+        # True se os candles do símbolo e timeframe devem ser consultados (ainda não consultados ou agendados para
+        # agora ou antes)
+        return time.time() >= self.dict_next_candles.get(str(symbol + time_frame), 0)
+
+    def get_sweep_delay(self):
+        # Segundos até a próxima varredura: 'interval' (trades), ou menos se algum candle fechar antes
+        now = time.time()
+        upcoming = [due - now for due in self.dict_next_candles.values() if due > now]
+        return min([self.interval] + upcoming)
+
+    def write_candles(self, cid, symbol, description, time_frame, last_in_candle, candles):
+        # Insere no MySQL os candles retornados por fetch_candles, atualizando o catálogo candle_coverage, o último
+        # candle do símbolo e os timeframes calculados a partir de 1m
         try:
-            # Converta o obj datetime em milisegundos para ser utilizado na API
-            start_time = (last_in_candle * 1000) + 1
-            end_time = int(time.time() * 1000)
             # Converta o timestamp (last_in_candle) vindo do MySQL para o objeto datetime para mostrar no print
             last_in_candle = datetime.datetime.fromtimestamp(last_in_candle)
-            #print(str(util.API_GET_CANDLES).format(time_frame, symbol.upper(), self.api_limit, start_time, end_time))
-            candles = []
-            try:
-                r = requests.get(
-                    str(util.API_GET_CANDLES).format(time_frame, symbol.upper(), self.api_limit, start_time, end_time))
-                if r.status_code != 200:
-                    console.debug('{} retornando status {} no request de candle.'.format(description, r.status_code))
-                    return False
-                candles = json.loads(r.text)
-            except (json.JSONDecodeError, requests.ConnectionError) as e:
-                console.show_error('Erro ao carregar o JSON de Candles da API, causa:', e)
-            except Exception as e:
-                console.show_error('Erro durante execução do request na API.', e)
-                return False
-            # Verifique se o JSON está vazio ou se atingiu o ratelimit
-            if len(candles) <= 1:
-                console.debug(
-                    '\033[1;31m{} - {}\033[m sem registros de \033[7;33mcandles\033[m para inserir.'.format(description, time_frame))
-                return False
-            elif 'error' in candles:
-                msg = 'Atingiu o ratelimit, dormindo por 1 minuto...'
-                console.show_warning(msg)
-                time.sleep(60)
-                return False
-            candles = candles[:-1]  # não inserir o último candle, pois não deve estar fechado ainda
             end_time_timestamp = candles[len(candles) - 1][0] / 1000
             end_time = datetime.datetime.fromtimestamp(end_time_timestamp)
             console.debug(
@@ -266,21 +602,91 @@ class DataCollection:
                                            last_in_candle.strftime("%d/%m/%Y %H:%M:%S"),
                                            end_time.strftime("%d/%m/%Y %H:%M:%S")))
             cursor2 = self.conn.cursor()
-            for candle in candles:
-                '''INSERT IGNORE INTO candles_raw (time, open, close, high, low, volume, cid, timeframe) 
-                VALUES (SELECT FROM_UNIXTIME(%s * 1000 * 0.001))),%s,%s,%s,%s,%s,%s)'''
-                args = (candle[0], candle[1], candle[2], candle[3], candle[4], candle[5], cid, time_frame)
-                cursor2.execute(util.INSERT_TBL_CANDLES, args)
+            rows = [(candle[0], candle[1], candle[2], candle[3], candle[4], candle[5], cid, time_frame)
+                    for candle in candles]
+            inserted = self.insert_rows(cursor2, util.INSERT_TBL_CANDLES, rows, util.VALUES_TBL_CANDLES)
+            # Atualize o intervalo e a quantidade de candles do símbolo e timeframe no catálogo candle_coverage
+            args = (cid, time_frame, candles[0][0], candles[len(candles) - 1][0], inserted,
+                    candles[len(candles) - 1][0])
+            cursor2.execute(util.UPSERT_TBL_CANDLE_COVERAGE, args)
             # Atualize a coluna lastincandle da moeada atual com o timestamp do último registro inserido em candles_raw
             args = (candles[len(candles) - 1][0], cid)
             cursor2.execute(util.UPDATE_LASTINCANDLE_TBL_COINS, args)
             self.dict_time_candles[str(symbol + time_frame)] = end_time_timestamp
             self.total_candles += len(candles)
+            if self.rollup and time_frame == ROLLUP_BASE and not self.backfill:
+                self.insert_rollup(cid, symbol, candles)
             self.conn.commit()
         except Error as e:
             console.show_error('Erro ao inserir registros de candles no MySQL, causa:', e)
             raise Exception(e)
-        return True
+
+    def insert_rows(self, cursor, insert, rows, values=None):
+        # Insere 'rows' com instruções INSERT de várias linhas (util.INSERT_BATCH registros por instrução), com a lista
+        # 'values' por registro (ex.: util.VALUES_TBL_CANDLES), e retorna a quantidade de registros inseridos (0 para
+        # os que já existiam, por causa do INSERT IGNORE)
+        inserted = 0
+        for stmt, args in util.get_insert_rows(insert, rows, values):
+            cursor.execute(stmt, args)
+            inserted += cursor.rowcount
+        return inserted
+
+    def insert_rollup(self, cid, symbol, candles):
+        # Calcula os candles dos demais timeframes a partir dos novos candles de 1m (no formato da API:
+        # [MTS, OPEN, CLOSE, HIGH, LOW, VOLUME]) e insere os candles que foram completados
+        times = pd.DatetimeIndex(pd.to_datetime(np.array([candle[0] for candle in candles], dtype=np.int64), unit='ms'),
+                                 name='time')
+        df_candles = pd.DataFrame(dict((name, np.array([candle[i] for candle in candles], dtype=np.float64))
+                                       for i, name in ((1, 'open'), (2, 'close'), (3, 'high'), (4, 'low'),
+                                                       (5, 'volume'))), index=times)
+        cursor2 = self.conn.cursor()
+        for time_frame in self.rollup_time_frames:
+            df_rollup = self.dict_rollup[(symbol, time_frame)].update(df_candles)
+            if df_rollup.empty:
+                continue
+            mts = df_rollup.index.values.astype('datetime64[ms]').astype(np.int64).tolist()
+            rows = [(row_mts, row.open, row.close, row.high, row.low, row.volume, cid,
+                     time_frame) for row_mts, row in zip(mts, df_rollup.itertuples(index=False))]
+            inserted = self.insert_rows(cursor2, util.INSERT_TBL_CANDLES, rows, util.VALUES_TBL_CANDLES)
+            args = (cid, time_frame, mts[0], mts[-1], inserted, mts[-1])
+            cursor2.execute(util.UPSERT_TBL_CANDLE_COVERAGE, args)
+            self.dict_time_candles[str(symbol + time_frame)] = mts[-1] / 1000
+            self.total_candles += inserted
+            console.debug(f'{inserted} candles de {time_frame} da moeda {symbol} calculados a partir de '
+                          f'{ROLLUP_BASE}.')
+
+    def start_rollup(self, since_past=False):
+        # Cria um CandleRollup por símbolo e timeframe começando no candle seguinte ao último do banco e carrega os
+        # candles de 1m que já estão no banco desde então (calculando também os candles que estiverem faltando)
+        # since_past: começa no candle que contém a data 'past' de config.json (após a carga histórica)
+        if not self.rollup:
+            return
+        console.show(f'Calculando timeframes {self.rollup_time_frames} a partir dos candles de {ROLLUP_BASE}...')
+        past = datetime.datetime.strptime(self.start_date, '%Y-%m-%d %H:%M:%S')
+        past = int(past.timestamp())
+        for symbol in self.symbols:
+            symbol = str(symbol).strip()  # remover espaços
+            starts = {}
+            for time_frame in self.rollup_time_frames:
+                last = self.dict_time_candles[str(symbol + time_frame)]
+                if last > past and not since_past:  # início do candle seguinte ao último no banco
+                    start = bucket_end(bucket_start([pd.Timestamp(last, unit='s').value], time_frame), time_frame)
+                else:  # sem candles no banco, começa no candle que contém a data 'past' de config.json
+                    start = bucket_start([pd.Timestamp(past, unit='s').value], time_frame)
+                starts[time_frame] = pd.Timestamp(start[0])
+                self.dict_rollup[(symbol, time_frame)] = CandleRollup(time_frame, start=starts[time_frame])
+            if len(starts) == 0:
+                continue
+            try:
+                cursor2 = self.conn.cursor(buffered=True)
+                args = (self.dict_cid_symbol[symbol], ROLLUP_BASE, int(min(starts.values()).value // 1_000_000))
+                cursor2.execute(util.SELECT_CANDLES_SINCE, args)
+                candles = cursor2.fetchall()
+                if len(candles) > 0:
+                    self.insert_rollup(self.dict_cid_symbol[symbol], symbol, candles)
+                    self.conn.commit()
+            except Exception as e:
+                console.show_error(f"Erro ao calcular os candles de '{symbol}' a partir de {ROLLUP_BASE}.", e)
 
     def print_results(self):
         interval = (datetime.datetime.now() - self.exec_hour).seconds // 60
@@ -295,6 +701,10 @@ class DataCollection:
                          .format(util.get_readable_number(total - self.total_inserts), util.get_readable_number(
                 (total - self.total_inserts) / interval)))
             console.show('Total: {} registros inseridos.'.format(util.get_readable_number(total)))
+            for endpoint, stats in self.limiter.stats().items():
+                console.show('Requests de {}: {} no último minuto ({:.0%} do limite), {} com ratelimit (429), {:.0f} '
+                             'segundos de espera.'.format(endpoint, stats['last_window'], stats['utilization'],
+                                                          stats['throttled'], stats['waited']))
             self.total_inserts = (self.total_trades + self.total_candles)
 
     def print_coins(self):
@@ -350,20 +760,17 @@ class DataCollection:
             console.show('Consultando últimos registros de candles no MySQL...')
             past = datetime.datetime.strptime(self.start_date, '%Y-%m-%d %H:%M:%S')
             past = int(past.timestamp())
+            # Uma única consulta ao catálogo candle_coverage com o último candle de todos os símbolos e timeframes
+            cursor2 = self.conn.cursor(buffered=True)
+            cursor2.execute(util.SELECT_LAST_IN_CANDLES)
+            last_in_candles = dict((str(symbol + time_frame), last) for symbol, time_frame, last in cursor2.fetchall())
             for symbol in self.symbols:
                 symbol = str(symbol).strip()  # remover espaços
                 for time_frame in self.time_frames:
                     time_frame = str(time_frame).strip()  # remover espaços
-                    args = (past, symbol, time_frame)
-                    try:
-                        cursor2 = self.conn.cursor(buffered=True)
-                        cursor2.execute(util.SELECT_LAST_IN_CANDLE, args)
-                        row_last_in_candle = cursor2.fetchone()
-                        #console.debug(f"Obtendo último timestamp candle de {symbol} - {time_frame} = {row_last_in_candle[0]}")
-                        self.dict_time_candles[str(symbol + time_frame)] = row_last_in_candle[0]
-                    except Exception as e:
-                        console.show_error(f"Erro ao consultar data e hora do último candle de símbolo '{symbol}' "
-                                     f"e timeframe '{time_frame}' no banco de dados.", e)
+                    # símbolos e timeframes sem candles começam a partir da data 'past' de config.json
+                    self.dict_time_candles[str(symbol + time_frame)] = last_in_candles.get(str(symbol + time_frame),
+                                                                                         past)
 
             console.show('Últimos registros de candles foram carregados com sucesso')
 
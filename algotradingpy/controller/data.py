@@ -4,22 +4,44 @@ Description: Módulo com classes que vão controlar o carregamento dos dados do
 File name: data.py
 Author: Daniel Tell <daniel.tell@gmail.com>
 Date created: 19/09/2022
-Date last modified: 30/09/2022
+Date last modified: 17/10/2026
 """
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 import mysql.connector as db
 from mysql.connector import pooling
 import algotradingpy.view.console as console
+import numpy as np
 import pandas as pd
 from algotradingpy.model.asset import Asset
 from algotradingpy.model.setup import Setup
+from algotradingpy.controller.cache import CandleCache
+from algotradingpy.controller.rollup import ROLLUP_BASE, bucket_start, bucket_end, rollup_candles
+from algotradingpy.controller.bars import BarBuilder
 from datetime import datetime, timedelta
 import algotradingpy.utils.util as util
 
+POOL_SIZE = 32  # conexões da pool, também é a quantidade de consultas em paralelo de submit e dos métodos *_many
+POOL_WAIT = 10  # segundos que get_mysql_conn espera uma conexão livre quando a pool está esgotada
+SELECT_CHUNK = 20000  # registros lidos por vez nas consultas em streaming (_select_arrays)
+# tipos das colunas retornadas por _select_arrays em get_candles e get_trades
+CANDLE_DTYPES = {"time": "datetime64[ns]", "open": np.float64, "close": np.float64, "low": np.float64,
+                 "high": np.float64, "volume": np.float64}
+TRADE_DTYPES = {"time": "datetime64[ns]", "amount": np.float64, "price": np.float64, "type": object}
+
 
 class Mysql:
     connection_pool: db.pooling.MySQLConnectionPool = None
-
-    def __init__(self, db_host, db_user, db_pass, db_name, db_port=3306):
+    cache: CandleCache = None  # cache local dos candles, ou None para consultar sempre o banco
+    rollup = False  # se True os timeframes maiores são calculados a partir dos candles de 1m
+    _pools = {}  # pools de conexões compartilhadas pelas instâncias, por dados de conexão
+    _executors = {}  # executores das consultas em paralelo (submit), um por pool
+    _pools_lock = threading.Lock()
+    _pool_key = None  # dados de conexão que identificam a pool em _pools
+
+    def __init__(self, db_host, db_user, db_pass, db_name, db_port=3306, cache_dir=None, rollup=False):
         r"""Classe para gerenciar dados de um banco Mysql.
 
         :param str db_host: endereço do banco de dados
@@ -27,31 +49,42 @@ class Mysql:
         :param str db_pass: senha do usuário
         :param str db_name: nome da base de dados
         :param int db_port: porta do banco de dados
+        :param str cache_dir: diretório do cache local de candles (CandleCache), ou None para não usar cache
+        :param bool rollup: se True get_candles calcula os timeframes maiores que 1m a partir dos candles de 1m, para
+        bancos em que o coletor grava somente 1m
         """
         self.db_host = db_host
         self.db_user = db_user
         self.db_pass = db_pass
         self.db_name = db_name
         self.db_port = db_port
+        self.rollup = rollup
+        if cache_dir is not None:
+            self.cache = CandleCache(cache_dir)
         self.create_mysql_pool()
         # self.conn = self.connect_mysql()
 
-    def create_mysql_pool(self, pool_size=32):
-        r"""Cria uma pool de conexões com o banco de dados a armazena no atributo connection_pool.
+    def create_mysql_pool(self, pool_size=POOL_SIZE):
+        r"""Cria uma pool de conexões com o banco de dados a armazena no atributo connection_pool. As instâncias com
+        os mesmos dados de conexão compartilham a mesma pool (a primeira a cria com 'pool_size' conexões).
 
          :param int pool_size: tamanho de pool é um número de objetos de conexão que o pool pode suportar
          :return: True se consegui criar ou False se não
          :rtype: bool
          """
+        key = self._pool_key = (self.db_host, self.db_port, self.db_name, self.db_user, self.db_pass)
         try:
-            self.connection_pool = db.pooling.MySQLConnectionPool(pool_name="mysql_pool",
-                                                                            pool_size=pool_size,
-                                                                            pool_reset_session=True,
-                                                                            host=self.db_host,
-                                                                            port=self.db_port,
-                                                                            database=self.db_name,
-                                                                            user=self.db_user,
-                                                                            password=self.db_pass)
+            with Mysql._pools_lock:
+                if key not in Mysql._pools:
+                    Mysql._pools[key] = db.pooling.MySQLConnectionPool(pool_name="mysql_pool",
+                                                                       pool_size=pool_size,
+                                                                       pool_reset_session=True,
+                                                                       host=self.db_host,
+                                                                       port=self.db_port,
+                                                                       database=self.db_name,
+                                                                       user=self.db_user,
+                                                                       password=self.db_pass)
+                self.connection_pool = Mysql._pools[key]
             return True
         except db.Error as e:
             console.show_error("Não foi possível criar pool de conexoes com o banco de dados.", e)
@@ -59,10 +92,19 @@ class Mysql:
             return False
 
     def get_mysql_conn(self):
-        r"""Obtém uma conexão MySQL da pool de conexões com o banco de dados,"""
+        r"""Obtém uma conexão MySQL da pool de conexões com o banco de dados. Se todas as conexões estiverem em uso
+        (ex.: consultas em paralelo) espera até POOL_WAIT segundos por uma conexão livre."""
         if self.connection_pool is not None:
             try:
-                conn = self.connection_pool.get_connection()
+                deadline = time.monotonic() + POOL_WAIT
+                while True:
+                    try:
+                        conn = self.connection_pool.get_connection()
+                        break
+                    except db.PoolError:
+                        if time.monotonic() >= deadline:
+                            raise
+                        time.sleep(0.05)
 
                 if conn.is_connected():
                     db_Info = conn.get_server_info()
@@ -96,6 +138,87 @@ class Mysql:
                 cursor.close()
                 conn.close()
 
+    def _select_chunks(self, query, args=None, dtypes=None, chunk_size=SELECT_CHUNK):
+        r"""Faz uma consulta (select) em streaming: os registros são lidos em blocos de 'chunk_size' por um cursor
+        sem buffer e cada bloco é convertido em arrays NumPy tipados, sem materializar a consulta inteira.
+
+            :param str query: uma consulta ao banco na sintaxe MySQL
+            :param dict args: argumentos da consulta
+            :param dict dtypes: tipo NumPy de cada coluna pelo nome (padrão object)
+            :param int chunk_size: quantidade de registros lidos por vez
+            :return: gerador de dicionários com os arrays de cada coluna do bloco, na ordem da consulta
+            :rtype: generator
+            """
+        dtypes = dtypes or {}
+        conn = cursor = None
+        try:
+            conn = self.get_mysql_conn()
+            if not conn.is_connected():
+                conn.reconnect()
+            cursor = conn.cursor(buffered=False)
+            cursor.execute(query, args)
+            names = cursor.column_names
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                columns = dict((name, np.empty(len(rows), dtype=dtypes.get(name, object))) for name in names)
+                for column, values in zip(columns.values(), zip(*rows)):
+                    column[:] = values
+                yield columns
+                if len(rows) < chunk_size:  # último bloco (vazio se a consulta não retornar registros)
+                    break
+        except db.Error as e:
+            raise db.Error(e.msg)
+        finally:
+            # o consumidor pode parar antes do fim (erro ou gerador abandonado): os registros não lidos do cursor sem
+            # buffer são descartados antes de fechá-lo, senão close() falha com "Unread result found" e esconde o
+            # erro original
+            try:
+                if conn is not None and conn.is_connected():
+                    if cursor is not None:
+                        try:
+                            cursor.fetchall()
+                        except db.Error:
+                            pass  # sem resultado pendente
+                        cursor.close()
+                    conn.close()
+            except db.Error as e:
+                console.show_error("Erro ao fechar o cursor da consulta em blocos", e)
+
+    def _select_arrays(self, query, args=None, dtypes=None, chunk_size=SELECT_CHUNK):
+        r"""Faz uma consulta (select) em streaming (_select_chunks) e copia os blocos para arrays NumPy tipados que
+        crescem conforme necessário. Assim a consulta não é materializada inteira como uma lista de tuplas e o pico
+        de memória fica próximo do tamanho final dos arrays.
+
+            :param str query: uma consulta ao banco na sintaxe MySQL
+            :param dict args: argumentos da consulta
+            :param dict dtypes: tipo NumPy de cada coluna pelo nome (padrão object)
+            :param int chunk_size: quantidade de registros lidos por vez
+            :return: dicionário com os arrays de cada coluna, na ordem da consulta
+            :rtype: dict
+            """
+        columns = {}
+        size = 0
+        for chunk in self._select_chunks(query, args, dtypes, chunk_size):
+            end = size + len(next(iter(chunk.values())))
+            if len(columns) == 0:
+                columns = dict((name, np.empty(max(end, chunk_size), dtype=values.dtype))
+                               for name, values in chunk.items())
+            elif end > len(next(iter(columns.values()))):  # dobra a capacidade dos arrays
+                for name, column in columns.items():
+                    columns[name] = np.empty(max(end, 2 * len(column)), dtype=column.dtype)
+                    columns[name][:size] = column[:size]
+            for name, values in chunk.items():
+                columns[name][size:end] = values
+            size = end
+        # copia somente o que foi usado, liberando a capacidade extra dos arrays
+        return dict((name, column[:size].copy()) for name, column in columns.items())
+
+    def _get_description(self, symbol):
+        r"""Obtém a descrição de 'symbol' na tabela coins, ou None se o símbolo não existir."""
+        column_names, rows = self._select("SELECT description FROM coins WHERE symbol = %(symbol)s",
+                                          {'symbol': symbol})
+        return rows[0][0] if len(rows) > 0 else None
+
     def _execute(self, stmt, args):
         r"""Faz uma operação de insert/update/delete no banco de dados MySQL.
 
@@ -131,9 +254,10 @@ class Mysql:
             console.debug("Consultando dados de todos símbolos disponíveis...")
             query = "SELECT symbol, description, type FROM coins ORDER BY cid"
             if with_data_only:
-                query = '''SELECT c.symbol, c.description, c.lastincandle, cr.timeframes FROM coins c INNER JOIN
-                        (SELECT cr.cid, group_concat(DISTINCT cr.timeframe) as timeframes FROM candles_raw cr GROUP BY cr.cid
-                        ORDER BY cr.timeframe ASC) cr ON c.cid = cr.cid'''
+                # lê o catálogo candle_coverage (uma linha por símbolo e timeframe) em vez de percorrer candles_raw
+                query = '''SELECT c.symbol, c.description, c.lastincandle, cv.timeframes FROM coins c INNER JOIN
+                        (SELECT cid, group_concat(timeframe ORDER BY timeframe) as timeframes FROM candle_coverage
+                        GROUP BY cid) cv ON c.cid = cv.cid'''
 
             column_names, rows = self._select(query)
             df_symbols = pd.DataFrame(rows)
@@ -146,43 +270,287 @@ class Mysql:
         except Exception as e:
             console.show_error("Erro ao consultar os símbolos no banco de dados", e)
 
-    def get_candles(self, symbol, time_frame, start_date, end_date) -> Asset:
-        r"""Obtém um Asset com dados de candlestick com períodos de 'time_frame' e entre 'start_date' e 'end_date',
+    def get_candles(self, symbol, time_frame, start_date, end_date, max_points=None, bucket=None) -> Asset:
+        r"""Obtém um Asset com dados de candlestick com períodos de 'time_frame' e entre 'start_date' e 'end_date'.
+        Com o cache ativo (cache_dir) somente os intervalos que ainda não estão no cache são consultados no banco.
+        Com 'max_points' ou 'bucket' os candles são agregados no banco em intervalos maiores (ex.: para gráficos de
+        períodos longos), assim somente um candle por intervalo é transferido.
 
            :param str symbol: símbolo do ativo que possui dados de candlestick
            :param str time_frame: período de tempo de cada candlestick (1m, 5m, 15m, etc)
            :param start_date: data inicial dos registros de candles_raw
            :param end_date: data final dos registros de candles_raw
+           :param int max_points: quantidade máxima de candles retornados, o intervalo de agregação é o menor múltiplo
+           de 'time_frame' que não ultrapassa essa quantidade
+           :param str bucket: intervalo de agregação dos candles (ex.: 1h, 4h, 1D), ignorado se 'max_points' for usado
            :return: um objeto Asset de type='candlestick' ou None se não encontrar registros
            :rtype: Asset
            """
         try:
+            seconds = self._get_bucket_seconds(time_frame, start_date, end_date, max_points, bucket)
+            if seconds is not None:
+                return self._get_candles_bucket(symbol, time_frame, start_date, end_date, seconds)
+            if self.rollup and time_frame != ROLLUP_BASE:
+                return self._get_candles_rollup(symbol, time_frame, start_date, end_date)
             console.debug(f"Consultando dados de candlestick (intervalos de {time_frame}) para {symbol} "
                           f"no período de {start_date} até {end_date}...")
-            query = """SELECT c.description, cr.time, cr.open, cr.close, cr.low, cr.high, cr.volume
-                      FROM candles_raw cr, coins c WHERE c.cid = cr.cid AND c.symbol = %(symbol)s 
-                      AND cr.time BETWEEN %(start_date)s AND %(end_date)s AND cr.timeframe = %(time_frame)s 
-                      ORDER BY cr.time ASC """
-            args = {'symbol': symbol, 'time_frame': time_frame, 'start_date': start_date, 'end_date': end_date}
-            column_names, rows = self._select(query, args)
-            df_candlestick = pd.DataFrame(rows)
-            if df_candlestick.empty:
+            if self.cache is None:
+                description, df_candlestick = self._select_candles(symbol, time_frame, start_date, end_date)
+            else:
+                for start, end in self.cache.missing(symbol, time_frame, start_date, end_date):
+                    description, df_candlestick = self._select_candles(symbol, time_frame, start, end)
+                    self.cache.store(symbol, time_frame, description, df_candlestick, start, end)
+                description, df_candlestick = self.cache.get(symbol, time_frame, start_date, end_date)
+            if df_candlestick is None:
                 console.debug("Sem registros no período!")
                 return None
             else:
                 console.debug(f"{len(df_candlestick)} registros retornados")
-            df_candlestick.columns = column_names
-            description = df_candlestick['description'].head(1)
-            description = description[0]
-            del df_candlestick['description']
-            df_candlestick.set_index("time", inplace=True)
             asset = Asset(ptype="candlestick", symbol=symbol, time_frame=time_frame, description=description,
-                          data=df_candlestick)
+                          data=df_candlestick, copy=False)
             return asset
 
         except Exception as e:
             console.show_error("Erro ao consultar dados de candlestick no banco de dados", e)
 
+    def _get_candles_rollup(self, symbol, time_frame, start_date, end_date) -> Asset:
+        r"""Obtém um Asset com os candles de 'time_frame' calculados a partir dos candles de 1m (_rollup_candles)."""
+        try:
+            console.debug(f"Calculando dados de candlestick (intervalos de {time_frame}) a partir de {ROLLUP_BASE} "
+                          f"para {symbol} no período de {start_date} até {end_date}...")
+            return self._rollup_candles(symbol, [time_frame], start_date, end_date).get(time_frame)
+
+        except Exception as e:
+            console.show_error(f"Erro ao calcular dados de candlestick a partir dos candles de {ROLLUP_BASE}", e)
+
+    def _rollup_candles(self, symbol, time_frames, start_date, end_date) -> dict:
+        r"""Calcula os candles de cada timeframe de 'time_frames' a partir dos candles de 1m (rollup_candles), que são
+        consultados uma única vez do início do candle que contém 'start_date' até o fim do candle que contém
+        'end_date'. Os candles são agrupados em UTC (UNIX_TIMESTAMP), como na Bitfinex e no coletor, e o índice volta
+        para o fuso horário da sessão do MySQL, como nas demais consultas. Somente candles completos são retornados.
+
+           :return: dicionário {timeframe: Asset}, sem os timeframes que não possuem candles no período
+           :rtype: dict
+           """
+        description = self._get_description(symbol)
+        if description is None:
+            return {}
+        column_names, rows = self._select("SELECT UNIX_TIMESTAMP(%s), UNIX_TIMESTAMP(%s)", (start_date, end_date))
+        if rows[0][0] is None or rows[0][1] is None:  # o MySQL retorna NULL para datas que não consegue converter
+            raise Exception(f"Valor de start_date ({start_date}) ou end_date ({end_date}) é inválido!")
+        start, end = (int(value) * 1_000_000_000 for value in rows[0])
+        starts = dict((time_frame, bucket_start([start], time_frame)[0]) for time_frame in time_frames)
+        ends = dict((time_frame, bucket_end(bucket_start([end], time_frame), time_frame)[0])
+                    for time_frame in time_frames)
+        query = """SELECT CAST(UNIX_TIMESTAMP(cr.time) AS SIGNED) as mts, cr.time, cr.open, cr.close, cr.low, cr.high,
+                  cr.volume FROM candles_raw cr WHERE cr.cid = (SELECT cid FROM coins WHERE symbol = %(symbol)s) 
+                  AND cr.timeframe = %(time_frame)s AND cr.time >= FROM_UNIXTIME(%(start)s) 
+                  AND cr.time < FROM_UNIXTIME(%(end)s) ORDER BY cr.time ASC """
+        args = {'symbol': symbol, 'time_frame': ROLLUP_BASE, 'start': int(min(starts.values()) // 1_000_000_000),
+                'end': int(max(ends.values()) // 1_000_000_000)}
+        columns = self._select_arrays(query, args, dict(CANDLE_DTYPES, mts=np.int64))
+        times = columns.pop("mts") * 1_000_000_000
+        # diferença entre o fuso horário da sessão e UTC de cada candle de 1m
+        offsets = columns.pop("time").view(np.int64) - times
+        base = pd.DataFrame(columns, index=pd.DatetimeIndex(times.view("datetime64[ns]"), name="time"), copy=False)
+        assets = {}
+        for time_frame in time_frames:
+            df_candles = rollup_candles(base.loc[pd.Timestamp(starts[time_frame]):
+                                                 pd.Timestamp(ends[time_frame]) - pd.Timedelta(1)], time_frame)
+            # início de cada candle no fuso da sessão, com a diferença do seu primeiro candle de 1m
+            first = np.searchsorted(times, df_candles.index.values.view(np.int64))
+            df_candles.index = pd.DatetimeIndex((df_candles.index.values.view(np.int64) + offsets[first])
+                                                .view("datetime64[ns]"), name="time")
+            df_candles = df_candles.loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]
+            if df_candles.empty:
+                continue
+            console.debug(f"{len(df_candles)} candles de {time_frame} calculados a partir de {len(base)} de "
+                          f"{ROLLUP_BASE}")
+            assets[time_frame] = Asset(ptype="candlestick", symbol=symbol, time_frame=time_frame,
+                                       description=description, data=df_candles, copy=False)
+        if len(assets) == 0:
+            console.debug("Sem registros no período!")
+        return assets
+
+    @staticmethod
+    def _get_bucket_seconds(time_frame, start_date, end_date, max_points, bucket):
+        r"""Calcula o intervalo de agregação (em segundos) de get_candles, ou None se os candles não precisam ser
+        agregados (intervalo menor ou igual a 'time_frame').
+        """
+        if max_points is None and bucket is None:
+            return None
+        step = util.get_time_frame_seconds(time_frame)
+        if max_points is not None:
+            if max_points <= 0:
+                raise Exception(f"Valor de max_points ({max_points}) é inválido! Deve ser maior que zero.")
+            span = (pd.Timestamp(end_date) - pd.Timestamp(start_date)).total_seconds()
+            seconds = int(np.ceil(span / max_points / step)) * step  # múltiplo de time_frame
+        else:
+            seconds = util.get_time_frame_seconds(bucket)
+        return seconds if seconds > step else None
+
+    def _get_candles_bucket(self, symbol, time_frame, start_date, end_date, seconds) -> Asset:
+        r"""Obtém um Asset com os candles de 'time_frame' agregados no banco em intervalos de 'seconds' segundos
+        (alinhados ao início da época Unix): abertura do primeiro candle, máxima e mínima do intervalo, fechamento do
+        último candle e soma dos volumes. Os candles de abertura e fechamento são buscados pela chave primária.
+        """
+        bucket = util.get_time_frame(seconds)
+        try:
+            console.debug(f"Consultando dados de candlestick (intervalos de {time_frame} agregados em {bucket}) para "
+                          f"{symbol} no período de {start_date} até {end_date}...")
+            description = self._get_description(symbol)
+            if description is None:
+                console.debug("Sem registros no período!")
+                return None
+            query = """SELECT FROM_UNIXTIME(g.bucket * %(seconds)s) as time, f.open, l.close, g.low, g.high, g.volume
+                      FROM (SELECT FLOOR(UNIX_TIMESTAMP(cr.time) / %(seconds)s) as bucket, MIN(cr.time) as firsttime, 
+                            MAX(cr.time) as lasttime, MIN(cr.low) as low, MAX(cr.high) as high, SUM(cr.volume) as volume
+                            FROM candles_raw cr WHERE cr.cid = (SELECT cid FROM coins WHERE symbol = %(symbol)s) 
+                            AND cr.timeframe = %(time_frame)s AND cr.time BETWEEN %(start_date)s AND %(end_date)s 
+                            GROUP BY bucket) g
+                      INNER JOIN candles_raw f ON f.time = g.firsttime AND f.timeframe = %(time_frame)s 
+                      AND f.cid = (SELECT cid FROM coins WHERE symbol = %(symbol)s) 
+                      INNER JOIN candles_raw l ON l.time = g.lasttime AND l.timeframe = %(time_frame)s 
+                      AND l.cid = (SELECT cid FROM coins WHERE symbol = %(symbol)s) 
+                      ORDER BY g.bucket ASC """
+            args = {'symbol': symbol, 'time_frame': time_frame, 'start_date': start_date, 'end_date': end_date,
+                    'seconds': seconds}
+            columns = self._select_arrays(query, args, CANDLE_DTYPES)
+            if len(columns["time"]) == 0:
+                console.debug("Sem registros no período!")
+                return None
+            console.debug(f"{len(columns['time'])} registros retornados")
+            index = pd.DatetimeIndex(columns.pop("time"), name="time")
+            return Asset(ptype="candlestick", symbol=symbol, time_frame=bucket, description=description,
+                         data=pd.DataFrame(columns, index=index, copy=False), copy=False)
+
+        except Exception as e:
+            console.show_error("Erro ao consultar dados de candlestick agregados no banco de dados", e)
+
+    def _select_candles(self, symbol, time_frame, start_date, end_date):
+        r"""Consulta os candles de 'symbol' e 'time_frame' entre 'start_date' e 'end_date' no banco de dados.
+
+           :return: uma tupla com a descrição do símbolo e o DataFrame indexado por time, ou (None, None) se não
+           encontrar registros
+           :rtype: tuple
+           """
+        description = self._get_description(symbol)
+        if description is None:
+            return None, None
+        query = """SELECT cr.time, cr.open, cr.close, cr.low, cr.high, cr.volume FROM candles_raw cr
+                  WHERE cr.cid = (SELECT cid FROM coins WHERE symbol = %(symbol)s) 
+                  AND cr.time BETWEEN %(start_date)s AND %(end_date)s AND cr.timeframe = %(time_frame)s 
+                  ORDER BY cr.time ASC """
+        args = {'symbol': symbol, 'time_frame': time_frame, 'start_date': start_date, 'end_date': end_date}
+        columns = self._select_arrays(query, args, CANDLE_DTYPES)
+        if len(columns["time"]) == 0:
+            return None, None
+        index = pd.DatetimeIndex(columns.pop("time"), name="time")
+        return description, pd.DataFrame(columns, index=index, copy=False)
+
+    def get_candles_bulk(self, symbols, time_frames, start_date, end_date, jobs=1) -> dict:
+        r"""Obtém os Assets de candlestick de vários símbolos e timeframes entre 'start_date' e 'end_date' com poucas
+        consultas: os cids são resolvidos uma única vez e os candles de todos os pares são lidos por uma consulta com
+        'cid IN (...)' e 'timeframe IN (...)', depois separados em um Asset por par. Com o cache ativo (cache_dir)
+        somente os pares que ainda não estão completos no cache são consultados no banco. Com 'rollup' os timeframes
+        maiores que 1m são calculados a partir dos candles de 1m (_get_candles_bulk_rollup).
+
+           :param list symbols: símbolos dos ativos
+           :param list time_frames: períodos de tempo dos candlesticks (1m, 5m, 15m, etc)
+           :param start_date: data inicial dos registros de candles_raw
+           :param end_date: data final dos registros de candles_raw
+           :param int jobs: quantidade de consultas em paralelo (conexões da pool), cada uma com parte dos símbolos
+           :return: dicionário {(símbolo, timeframe): Asset}, sem os pares que não possuem registros no período
+           :rtype: dict
+           """
+        symbols, time_frames = list(dict.fromkeys(symbols)), list(dict.fromkeys(time_frames))
+        try:
+            if self.rollup and any(time_frame != ROLLUP_BASE for time_frame in time_frames):
+                return self._get_candles_bulk_rollup(symbols, time_frames, start_date, end_date, jobs)
+            console.debug(f"Consultando dados de candlestick de {len(symbols)} símbolos e {len(time_frames)} "
+                          f"timeframes no período de {start_date} até {end_date}...")
+            column_names, rows = self._select(f"SELECT cid, symbol, description FROM coins WHERE symbol IN "
+                                              f"({', '.join(['%s'] * len(symbols))})", tuple(symbols))
+            coins = dict((cid, (symbol, description)) for cid, symbol, description in rows)
+            data = {}
+            pending = list(coins)
+            if self.cache is not None:
+                pending = [cid for cid in coins
+                           if any(self.cache.missing(coins[cid][0], time_frame, start_date, end_date)
+                                  for time_frame in time_frames)]
+            if len(pending) > 0:
+                shards = [shard.tolist() for shard in np.array_split(pending, min(max(jobs, 1), len(pending)))]
+                if len(shards) > 1:
+                    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+                        results = list(executor.map(lambda cids: self._select_candles_bulk(
+                            cids, time_frames, start_date, end_date), shards))
+                else:
+                    results = [self._select_candles_bulk(shards[0], time_frames, start_date, end_date)]
+                for result in results:
+                    for (cid, time_frame), df_candles in result.items():
+                        data[(coins[cid][0], time_frame)] = (coins[cid][1], df_candles)
+                if self.cache is not None:
+                    for cid in pending:
+                        symbol, description = coins[cid]
+                        for time_frame in time_frames:
+                            df_candles = data.get((symbol, time_frame), (None, None))[1]
+                            self.cache.store(symbol, time_frame, description, df_candles, start_date, end_date)
+            if self.cache is not None:
+                for symbol, description in coins.values():
+                    for time_frame in time_frames:
+                        description, df_candles = self.cache.get(symbol, time_frame, start_date, end_date)
+                        if df_candles is not None:
+                            data[(symbol, time_frame)] = (description, df_candles)
+            console.debug(f"{sum(len(df) for description, df in data.values())} registros retornados para "
+                          f"{len(data)} pares de símbolo e timeframe")
+            return dict(((symbol, time_frame), Asset(ptype="candlestick", symbol=symbol, time_frame=time_frame,
+                                                     description=description, data=df_candles, copy=False))
+                        for (symbol, time_frame), (description, df_candles) in data.items())
+
+        except Exception as e:
+            console.show_error("Erro ao consultar dados de candlestick no banco de dados", e)
+
+    def _get_candles_bulk_rollup(self, symbols, time_frames, start_date, end_date, jobs):
+        r"""get_candles_bulk com 'rollup': os candles de 1m são consultados em lote e os demais timeframes são
+        calculados a partir dos candles de 1m de cada símbolo (_rollup_candles), com até 'jobs' símbolos em paralelo.
+        """
+        assets = {}
+        if ROLLUP_BASE in time_frames:
+            assets.update(self.get_candles_bulk(symbols, [ROLLUP_BASE], start_date, end_date, jobs) or {})
+        rolled = [time_frame for time_frame in time_frames if time_frame != ROLLUP_BASE]
+        with ThreadPoolExecutor(max_workers=max(min(jobs, len(symbols)), 1)) as executor:
+            results = list(executor.map(lambda symbol: self._rollup_candles(symbol, rolled, start_date, end_date),
+                                        symbols))
+        for symbol, result in zip(symbols, results):
+            for time_frame, asset in result.items():
+                assets[(symbol, time_frame)] = asset
+        return assets
+
+    def _select_candles_bulk(self, cids, time_frames, start_date, end_date):
+        r"""Consulta os candles de todos os pares de 'cids' e 'time_frames' entre 'start_date' e 'end_date' com uma
+        única consulta ordenada por cid, timeframe e time, e separa o resultado nos pontos em que o par muda.
+
+           :return: dicionário {(cid, timeframe): DataFrame indexado por time}, somente com os pares que têm registros
+           :rtype: dict
+           """
+        query = f"""SELECT cr.cid, cr.timeframe, cr.time, cr.open, cr.close, cr.low, cr.high, cr.volume
+                  FROM candles_raw cr WHERE cr.cid IN ({', '.join(['%s'] * len(cids))}) 
+                  AND cr.timeframe IN ({', '.join(['%s'] * len(time_frames))}) AND cr.time BETWEEN %s AND %s 
+                  ORDER BY cr.cid, cr.timeframe, cr.time ASC """
+        columns = self._select_arrays(query, tuple(cids) + tuple(time_frames) + (start_date, end_date),
+                                      dict(CANDLE_DTYPES, cid=np.int64))
+        cid, time_frame = columns.pop("cid"), columns.pop("timeframe")
+        if len(cid) == 0:
+            return {}
+        # posições em que começa um novo par (cid, timeframe), o resultado já vem ordenado pelo par
+        change = np.flatnonzero((cid[1:] != cid[:-1]) | (time_frame[1:] != time_frame[:-1])) + 1
+        starts, ends = np.append(0, change), np.append(change, len(cid))
+        index = pd.DatetimeIndex(columns.pop("time"), name="time")
+        return dict(((int(cid[start]), str(time_frame[start])),
+                     pd.DataFrame(dict((name, values[start:end]) for name, values in columns.items()),
+                                  index=index[start:end], copy=False))
+                    for start, end in zip(starts, ends))
+
     def get_trades(self, symbol, start_date, end_date):
         r"""Obtém um Asset com dados de trades entre 'start_date' e 'end_date',
 
@@ -194,23 +562,23 @@ class Mysql:
           """
         try:
             console.debug(f"Consultando dados de trade para {symbol} no período de {start_date} até {end_date}...")
-            query = f"""SELECT c.description, tr.time, amount, price, type 
-                   FROM trades_raw tr, coins c WHERE c.cid = tr. cid AND c.symbol = %(symbol)s 
+            description = self._get_description(symbol)
+            if description is None:
+                console.debug(f"Símbolo {symbol} não encontrado!")
+                return None
+            query = f"""SELECT tr.time, amount, price, type FROM trades_raw tr
+                   WHERE tr.cid = (SELECT cid FROM coins WHERE symbol = %(symbol)s) 
                    AND tr.time BETWEEN %(start_date)s AND %(end_date)s  
                    ORDER BY tr.time ASC """
             args = {'symbol': symbol, 'start_date': start_date, 'end_date': end_date}
-            column_names, rows = self._select(query, args)
-            df_trade = pd.DataFrame(rows)
-            if df_trade.empty:
+            columns = self._select_arrays(query, args, TRADE_DTYPES)
+            if len(columns["time"]) == 0:
                 console.debug("Sem registros no período!")
                 return None
             else:
-                console.debug(f"{len(df_trade)} registros retornados")
-            df_trade.columns = column_names
-            description = df_trade['description'].head(1)
-            description = description[0]
-            del df_trade['description']
-            df_trade.set_index("time", inplace=True)
+                console.debug(f"{len(columns['time'])} registros retornados")
+            index = pd.DatetimeIndex(columns.pop("time"), name="time")
+            df_trade = pd.DataFrame(columns, index=index, copy=False)
             asset = Asset(ptype="trade", symbol=symbol, time_frame=None, description=description,
                           data=df_trade)
             return asset
@@ -218,6 +586,47 @@ class Mysql:
         except Exception as e:
             console.show_error("Erro ao consultar dados de trade no banco de dados", e)
 
+    def get_trade_bars(self, symbol, start_date, end_date, bar_type="time", size="1m",
+                       chunk_size=SELECT_CHUNK) -> Asset:
+        r"""Obtém um Asset de candlestick com barras agregadas a partir dos trades entre 'start_date' e 'end_date'.
+        Os trades são lidos em blocos de 'chunk_size' e agregados por um BarBuilder, sem carregar todos os trades
+        em memória. O Asset pode ser usado diretamente no BackTest.
+
+          :param str symbol: símbolo do ativo que possui dados de trade
+          :param start_date: data inicial dos registros de trades_raw
+          :param end_date: data final dos registros de trades_raw
+          :param str bar_type: tipo das barras: time, tick, volume ou dollar (bars.BAR_TYPES)
+          :param size: timeframe das barras de tempo (ex.: 1m, 1h) ou limite (número) das demais
+          :param int chunk_size: quantidade de trades lidos por vez
+          :return: um objeto Asset de type='candlestick' ou None se não encontrar registros
+          :rtype: Asset
+          """
+        builder = BarBuilder(bar_type, size)
+        try:
+            console.debug(f"Agregando trades de {symbol} em barras ({builder.get_time_frame()}) no período de "
+                          f"{start_date} até {end_date}...")
+            description = self._get_description(symbol)
+            if description is None:
+                console.debug(f"Símbolo {symbol} não encontrado!")
+                return None
+            query = """SELECT tr.time, price, amount FROM trades_raw tr
+                   WHERE tr.cid = (SELECT cid FROM coins WHERE symbol = %(symbol)s) 
+                   AND tr.time BETWEEN %(start_date)s AND %(end_date)s  
+                   ORDER BY tr.time ASC, tr.tid ASC """
+            args = {'symbol': symbol, 'start_date': start_date, 'end_date': end_date}
+            bars = [builder.update(chunk["time"], chunk["price"], chunk["amount"])
+                    for chunk in self._select_chunks(query, args, TRADE_DTYPES, chunk_size)]
+            df_bars = pd.concat(bars + [builder.finish()])
+            if df_bars.empty:
+                console.debug("Sem registros no período!")
+                return None
+            console.debug(f"{len(df_bars)} barras calculadas")
+            return Asset(ptype="candlestick", symbol=symbol, time_frame=builder.get_time_frame(),
+                         description=description, data=df_bars, copy=False)
+
+        except Exception as e:
+            console.show_error("Erro ao agregar dados de trade do banco de dados", e)
+
     def update(self, asset, days_to_keep=15):
         r"""Obtém um Assset com dados atualizados de candles/trades (dependendo de 'dtype' de 'asset'), Remove os 
         registros que forem anterioes a (end_date - days_to_keep)
@@ -229,25 +638,20 @@ class Mysql:
          """
         if asset.get_type() == "candlestick":
             console.debug(f"Atualizando dados de candlestick de {asset.symbol} com intervalos de {asset.time_frame}...")
-            index = asset.candles.tail(1).index.strftime('%Y-%m-%d %H:%M:%S')[0]  # último indice do DataFrame candles
-            last_date = datetime.strptime(index, '%Y-%m-%d %H:%M:%S')
+            last_date = asset.candles.index[-1].to_pydatetime()  # último indice do DataFrame candles
             start = last_date + timedelta(seconds=30)  # e adicona + 30 segundos
             end = datetime.now()
             updated_asset = self.get_candles(start_date=start, end_date=end, symbol=asset.symbol,
                                              time_frame=asset.time_frame)
-            size_before = len(asset.candles)
             if updated_asset is not None:
-                asset.candles = asset.candles.append(updated_asset.candles)
+                inserted = asset.append_candles(updated_asset.candles)
                 asset.last_update = end
                 asset.updated = True
-                index = asset.candles.tail(1).index.strftime('%Y-%m-%d %H:%M:%S')[0]  # último indice do DataFrame candles
-                last_date = datetime.strptime(index, '%Y-%m-%d %H:%M:%S')
-                size_after = len(asset.candles)
+                last_date = asset.candles.index[-1]  # último indice do DataFrame candles
                 start = last_date - timedelta(days=days_to_keep)  # subtrair "days_to_keep" dias
-                asset.candles = asset.candles.loc[start: last_date, :]
+                removed = asset.remove_candles_before(start)
 
-                console.debug(f"{size_after - len(asset.candles)} registros antigos foram removidos "
-                              f"e {size_after - size_before} novos foram inseridos.")
+                console.debug(f"{removed} registros antigos foram removidos e {inserted} novos foram inseridos.")
             else:
                 console.debug("Não existem novos dados de candlestick para atualizar.")
         return asset
@@ -326,6 +730,15 @@ class Mysql:
             if conn.is_connected():
                 cursor.close()
                 conn.close()
+        column_names, rows = self._select(util.SELECT_COUNT_CANDLE_COVERAGE)
+        if rows[0][0] == 0:
+            self.rebuild_coverage()
+
+    def rebuild_coverage(self):
+        r"""Recria o catálogo candle_coverage a partir da tabela candles_raw. Percorre toda a tabela, então só deve
+        ser usado quando o catálogo estiver vazio ou após inserir candles sem passar pelo coletor."""
+        console.debug("Recriando o catálogo candle_coverage a partir da tabela candles_raw...")
+        self._execute(util.REBUILD_TBL_CANDLE_COVERAGE, None)
 
     def get_candles_days(self, symbol, time_frame, days) -> Asset:
         r"""Obtém um Asset com dados de candlestick dentro do intervalo dos últimos dias (days).
@@ -336,29 +749,23 @@ class Mysql:
            :return: um objeto Asset de type='candlestick' ou None se não encontrar registros
            :rtype: Asset
            """
+        end = None
         try:
-            query = """SELECT DATE_ADD(MAX(cr.time), INTERVAL 1 MINUTE) as lastdate 
-                      FROM candles_raw cr, coins c WHERE c.cid = cr.cid AND c.symbol = %(symbol)s 
-                      AND cr.timeframe = %(time_frame)s"""
+            # o intervalo de candles vem do catálogo candle_coverage, sem percorrer candles_raw
+            query = """SELECT DATE_ADD(cv.maxtime, INTERVAL 1 MINUTE) as lastdate, cv.mintime 
+                      FROM candle_coverage cv WHERE cv.cid = (SELECT cid FROM coins WHERE symbol = %(symbol)s) 
+                      AND cv.timeframe = %(time_frame)s"""
             args = {'symbol': symbol, 'time_frame': time_frame}
             column_names, rows = self._select(query, args)
-            end = None
-            if len(rows) > 0:
-                end = rows[0][0]
-            if end is None:
+            if len(rows) == 0:
                 console.debug("Sem registros no período!")
                 return None
-            args = {'symbol': symbol, 'time_frame': time_frame, "end": end, "days": days}
-            query = """SELECT MIN(t.day) as day FROM (
-                            SELECT DATE_FORMAT(cr.time,'%Y-%m-%d') as day 
-                            FROM candles_raw cr, coins c WHERE c.cid = cr.cid AND c.symbol = %(symbol)s 
-                            AND cr.timeframe = %(time_frame)s 
-                            AND DATE_FORMAT(cr.time,'%Y-%m-%d') < DATE_FORMAT(%(end)s,'%Y-%m-%d')  
-                            GROUP BY DATE_FORMAT(cr.time,'%y-%m-%d') ORDER BY cr.time DESC LIMIT %(days)s ) as t;"""
-            column_names, rows = self._select(query, args)
-            if len(rows) > 0:
+            end, first = rows[0]
+            # os candles são coletados continuamente, então os 'days' dias anteriores ao dia de 'end' têm registros
+            start_day = max(end.date() - timedelta(days=days), first.date())
+            if start_day < end.date():
                 end_hour = datetime.strftime(end, '%H:%M:%S')
-                start = f"{rows[0][0]} {end_hour}"
+                start = f"{start_day} {end_hour}"
             else:
                 end_day = datetime.strftime(end, '%Y-%m-%d')
                 start = f"{end_day} 00:00:00"
@@ -369,4 +776,81 @@ class Mysql:
             print(symbol, time_frame, days, end)
             raise (e)
 
+    def get_executor(self) -> ThreadPoolExecutor:
+        r"""Obtém o ThreadPoolExecutor usado por submit e pelos métodos *_many, com uma thread por conexão da pool.
+        As instâncias que compartilham a pool também compartilham o executor, assim a quantidade de consultas em
+        paralelo nunca passa do tamanho da pool."""
+        with Mysql._pools_lock:
+            if self._pool_key not in Mysql._executors:
+                workers = getattr(self.connection_pool, "pool_size", POOL_SIZE)
+                Mysql._executors[self._pool_key] = ThreadPoolExecutor(max_workers=workers,
+                                                                      thread_name_prefix="mysql")
+            return Mysql._executors[self._pool_key]
+
+    def submit(self, method, *args, **kwargs) -> Future:
+        r"""Executa o método 'method' (ex.: "get_candles") em uma thread do executor e retorna um Future com o
+        resultado. Não deve ser chamado de dentro das threads do executor (ex.: em um callback do Future), pois a
+        thread ficaria esperando outra do mesmo executor.
+
+          :param str method: nome do método de Mysql
+          :return: Future com o retorno do método
+          :rtype: Future
+          """
+        return self.get_executor().submit(getattr(self, method), *args, **kwargs)
+
+    async def run_async(self, method, *args, **kwargs):
+        r"""Versão awaitable de submit, para uso com asyncio (ex.: await data.run_async("get_setup", symbol, tf))."""
+        return await asyncio.wrap_future(self.submit(method, *args, **kwargs))
+
+    def map(self, method, calls) -> list:
+        r"""Executa o método 'method' uma vez para cada dicionário de argumentos de 'calls', em paralelo, e retorna
+        os resultados na mesma ordem.
+
+          :param str method: nome do método de Mysql
+          :param calls: lista de dicionários com os argumentos (nomeados) de cada chamada
+          :return: lista com o retorno de cada chamada
+          :rtype: list
+          """
+        futures = [self.submit(method, **kwargs) for kwargs in calls]
+        return [future.result() for future in futures]
+
+    def get_candles_many(self, symbols, time_frame, start_date, end_date) -> dict:
+        r"""get_candles de vários símbolos em paralelo.
 
+          :return: dicionário {símbolo: Asset ou None}
+          :rtype: dict
+          """
+        symbols = list(dict.fromkeys(symbols))
+        return dict(zip(symbols, self.map("get_candles", [dict(symbol=symbol, time_frame=time_frame,
+                                                               start_date=start_date, end_date=end_date)
+                                                          for symbol in symbols])))
+
+    def get_trades_many(self, symbols, start_date, end_date) -> dict:
+        r"""get_trades de vários símbolos em paralelo.
+
+          :return: dicionário {símbolo: Asset ou None}
+          :rtype: dict
+          """
+        symbols = list(dict.fromkeys(symbols))
+        return dict(zip(symbols, self.map("get_trades", [dict(symbol=symbol, start_date=start_date,
+                                                              end_date=end_date) for symbol in symbols])))
+
+    def get_setups(self, symbols, time_frame) -> dict:
+        r"""get_setup de vários símbolos em paralelo.
+
+          :return: dicionário {símbolo: Setup ou None}
+          :rtype: dict
+          """
+        symbols = list(dict.fromkeys(symbols))
+        return dict(zip(symbols, self.map("get_setup", [dict(symbol=symbol, time_frame=time_frame)
+                                                        for symbol in symbols])))
+
+    def update_many(self, assets, days_to_keep=15) -> list:
+        r"""update de vários Assets em paralelo (ex.: no ciclo de atualização dos ativos acompanhados).
+
+          :param list assets: Assets que serão atualizados
+          :param int days_to_keep: quantidade de dias que devem ser mantidos os registros
+          :return: os Assets atualizados, na mesma ordem
+          :rtype: list
+          """
+        return self.map("update", [dict(asset=asset, days_to_keep=days_to_keep) for asset in assets])
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+u"""
+Description: Serviço de dados compartilhado pelo processo, que agrupa consultas concorrentes iguais ao banco MySQL.
+File name: dataservice.py
+Author: Daniel Tell <daniel.tell@gmail.com>
+Date created: 17/10/2026
+Date last modified: 17/10/2026
+"""
+from datetime import date
+import pandas as pd
+import algotradingpy.utils.config as config
+from algotradingpy.utils.singletonmeta import SingletonMeta
+from algotradingpy.utils.singleflight import SingleFlight
+from algotradingpy.controller.data import Mysql, SELECT_CHUNK
+from algotradingpy.model.asset import Asset
+
+RESULT_TTL = 30.0  # segundos que um resultado fica disponível para novas consultas iguais
+RESULT_CACHE_SIZE = 64  # quantidade máxima de resultados guardados (LRU)
+
+
+class DataService(metaclass=SingletonMeta):
+
+    def __init__(self, backend=None, ttl=RESULT_TTL, max_results=RESULT_CACHE_SIZE):
+        r"""Serviço de dados único no processo (SingletonMeta), com uma só pool de conexões. Consultas iguais (mesmo
+        método, símbolo, timeframe e período) feitas ao mesmo tempo por várias threads são executadas uma única vez e
+        o resultado é entregue a todas; os resultados recentes ficam em um LRU por 'ttl' segundos. Cada chamada
+        recebe o seu próprio Asset, então alterações (ex.: Mysql.update) não afetam as demais.
+
+        Os parâmetros só têm efeito na primeira chamada, as seguintes retornam a mesma instância.
+
+        :param backend: objeto com os métodos de Mysql, ou None para criar um Mysql com os dados do config.json
+        :param float ttl: tempo (segundos) que um resultado fica no LRU, 0 para não guardar resultados
+        :param int max_results: quantidade máxima de resultados no LRU
+        """
+        if backend is None:
+            backend = Mysql(db_host=config.get_db_host(), db_port=config.get_db_port(), db_user=config.get_db_user(),
+                            db_pass=config.get_db_pass(), db_name=config.get_db_name(), rollup=config.get_rollup())
+        self.backend = backend
+        self.flight = SingleFlight(ttl=ttl, max_results=max_results)
+
+    def __getattr__(self, name):
+        r"""Os demais métodos (update, get_setup, insert_setup, etc) são repassados ao backend sem agrupamento."""
+        if name in ("backend", "flight"):
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def get_symbols(self, with_data_only=True):
+        r"""Mysql.get_symbols agrupado, retorna uma cópia do DataFrame de símbolos."""
+        df_symbols = self._do("get_symbols", with_data_only=with_data_only)
+        return df_symbols.copy() if df_symbols is not None else None
+
+    def get_candles(self, symbol, time_frame, start_date, end_date, max_points=None, bucket=None) -> Asset:
+        r"""Mysql.get_candles agrupado, veja Mysql.get_candles."""
+        return _copy(self._do("get_candles", symbol=symbol, time_frame=time_frame, start_date=start_date,
+                              end_date=end_date, max_points=max_points, bucket=bucket))
+
+    def get_candles_days(self, symbol, time_frame, days) -> Asset:
+        r"""Mysql.get_candles_days agrupado, veja Mysql.get_candles_days."""
+        return _copy(self._do("get_candles_days", symbol=symbol, time_frame=time_frame, days=days))
+
+    def get_candles_bulk(self, symbols, time_frames, start_date, end_date, jobs=1) -> dict:
+        r"""Mysql.get_candles_bulk agrupado, veja Mysql.get_candles_bulk."""
+        assets = self._do("get_candles_bulk", symbols=tuple(symbols), time_frames=tuple(time_frames),
+                          start_date=start_date, end_date=end_date, jobs=jobs)
+        return dict((key, _copy(asset)) for key, asset in assets.items()) if assets is not None else None
+
+    def get_trades(self, symbol, start_date, end_date) -> Asset:
+        r"""Mysql.get_trades agrupado, veja Mysql.get_trades."""
+        return _copy(self._do("get_trades", symbol=symbol, start_date=start_date, end_date=end_date))
+
+    def get_trade_bars(self, symbol, start_date, end_date, bar_type="time", size="1m",
+                       chunk_size=SELECT_CHUNK) -> Asset:
+        r"""Mysql.get_trade_bars agrupado, veja Mysql.get_trade_bars."""
+        return _copy(self._do("get_trade_bars", symbol=symbol, start_date=start_date, end_date=end_date,
+                              bar_type=bar_type, size=size, chunk_size=chunk_size))
+
+    def _do(self, method, **kwargs):
+        r"""Executa o método 'method' do backend agrupando as chamadas com os mesmos argumentos."""
+        key = (method,) + tuple((name, _key(value)) for name, value in sorted(kwargs.items()))
+        return self.flight.do(key, getattr(self.backend, method), **kwargs)
+
+
+def _key(value):
+    r"""Converte datas para pd.Timestamp, assim datetime e pd.Timestamp da mesma data geram a mesma chave."""
+    if isinstance(value, date):
+        return pd.Timestamp(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_key(item) for item in value)
+    return value
+
+
+def _copy(asset):
+    r"""Cria um Asset com cópia dos dados de 'asset', para que cada chamada possa alterar o seu Asset."""
+    if asset is None:
+        return None
+    if asset.get_type() == "candlestick":
+        copy = Asset(ptype="candlestick", symbol=asset.symbol, description=asset.description,
+                     time_frame=asset.time_frame, data=asset.candles if asset._candles is not None else None,
+                     copy=True)
+    else:
+        copy = Asset(ptype="trade", symbol=asset.symbol, description=asset.description, time_frame=asset.time_frame,
+                     data=asset.trades.copy())
+    copy.last_update = asset.last_update
+    return copy
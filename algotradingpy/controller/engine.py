@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+u"""
+Description: Módulo com os motores vetorizados (NumPy) que executam as estratégias de backtesting.
+File name: engine.py
+Author: Daniel Tell <daniel.tell@gmail.com>
+Date created: 17/10/2026
+Date last modified: 17/10/2026
+"""
+import copy
+import numpy as np
+# tipos de eventos registrados pelos motores durante a simulação
+from algotradingpy.model.tradelog import BUY, SELL_STOP_LOSS, SELL_STOP_GAIN, TRAILING_STOP, SELL_RSI, BUY_RSI
+from algotradingpy.utils.metrics import day_number
+
+_SEARCH_CHUNK = 64  # tamanho inicial da janela de busca pelos gatilhos de stop
+
+
+class EngineState:
+
+    def __init__(self, start_money):
+        r"""Estado de um motor vetorizado ao fim da última barra processada. Um motor que recebe este estado
+        continua a simulação a partir da barra seguinte, exatamente como se tivesse percorrido todas as barras.
+
+        :param float start_money: saldo inicial da carteira
+        """
+        self.start_money = start_money
+        self.wallet_usd = start_money
+        self.wallet_coins = 0
+        self.price_position = 0
+        self.price_position_real = 0
+        self.total_gains = 0
+        self.total_losses = 0
+        self.buy_and_hold = 0  # quantidade de moedas da estratégia buy and hold
+        self.last_cross = np.nan  # sinal do cruzamento na última barra (estratégias de cruzamento)
+        self.last_balance = 0  # saldo da carteira em USD no fim da última barra
+        self.last_time = None  # timestamp int64 (ns) da última barra
+        self.time_position = None  # timestamp int64 (ns) da última compra/venda
+        self.bars = 0  # quantidade de barras processadas
+
+
+class EngineResult:
+
+    def __init__(self, **kwargs):
+        r"""Resultado numérico de um motor vetorizado, sem dependência de pandas.
+
+        :param kwargs: trade_returns, buy_and_hold_returns, accuracy, balance (saldo em USD de cada barra), position
+        (True nas barras que terminaram em posição comprado), events, raw_bars, raw_prices, raw_actions, price,
+        price_buy, price_sell, state (EngineState ao fim da última barra)
+        """
+        self.__dict__.update(kwargs)
+
+
+def wallet_per_day_bars(times, last_time=None):
+    r"""Retorna as posições das barras cujo saldo é registrado no saldo diário, ou seja, a barra anterior a cada
+    troca de dia. A posição -1 indica a última barra de uma execução anterior ('last_time').
+
+    :param np.ndarray times: timestamps int64 em nanosegundos
+    :param int last_time: timestamp da última barra processada antes de 'times', se a simulação for continuada
+    :return: array com as posições das barras
+    :rtype: np.ndarray
+    """
+    if last_time is not None:
+        return np.flatnonzero(day_number(np.append(last_time, times[:-1])) != day_number(times)) - 1
+    day = day_number(times)
+    return np.flatnonzero(day[1:] != day[:-1])
+
+
+def _find_stop(price_sell, price_position, stop_loss, stop_gain, start):
+    r"""Procura a primeira barra a partir de 'start' onde a variação do preço de venda em relação a 'price_position'
+    ultrapassa o stop loss ou o stop gain. A busca é feita em janelas que dobram de tamanho, assim o custo é
+    proporcional ao tempo em posição e não ao tamanho da série.
+
+    :return: uma tupla (posição da barra, variação %) ou (len(price_sell), None) se nenhum gatilho for atingido
+    :rtype: tuple
+    """
+    n = len(price_sell)
+    size = _SEARCH_CHUNK
+    while start < n:
+        end = min(start + size, n)
+        porc = ((price_sell[start:end] / price_position) * 100) - 100
+        hits = np.flatnonzero((porc < stop_loss) | (porc > stop_gain))
+        if len(hits) > 0:
+            return start + hits[0], porc[hits[0]]
+        start = end
+        size *= 2
+    return n, None
+
+
+def _start(close, start_money, buy_increase, sell_decrease, state):
+    r"""Prepara os preços de compra/venda e o estado inicial (novo ou cópia de 'state') de um motor."""
+    if len(close) == 0:
+        raise ValueError("Não existem barras no período do backtest.")
+    if state is None:
+        state = EngineState(start_money)
+    else:
+        state = copy.copy(state)
+    price_buy = close + (close * buy_increase / 100)  # preço com incremento de 'buy_increase'% ao comprar
+    price_sell = close + (close * sell_decrease / 100)  # preço com decremento de 'sell_decrease'% ao vender
+    if state.buy_and_hold == 0:
+        state.buy_and_hold = start_money / price_buy[0]  # inicializa estrategia buy and hold
+    return price_buy, price_sell, state
+
+
+def _finish(state, close, times, price_buy, price_sell, balance, position, events, real_position, **kwargs):
+    r"""Atualiza o estado com a última barra e calcula o resultado do período sem alterar o estado, assim a posição
+    em aberto não é encerrada se a simulação for continuada.
+
+    :param bool real_position: se True a precisão final compara com o preço real de compra (cruzamento),
+    senão com o preço da última posição (RSI)
+    """
+    state.last_balance = balance[-1]
+    state.last_time = times[-1]
+    state.bars += len(close)
+    for event in events:
+        if event[1] != TRAILING_STOP:
+            state.time_position = times[event[0]]
+
+    total_gains, total_losses = state.total_gains, state.total_losses
+    last_buy, last_sell = price_buy[-1], price_sell[-1]
+    if state.wallet_coins > 0:
+        trade_returns = ((state.wallet_coins * last_sell / state.start_money) * 100) - 100
+        if real_position:
+            gain = last_buy > state.price_position_real  # se o preço subiu depois de comprado
+        else:
+            gain = last_sell > state.price_position
+        if gain:
+            total_gains += 1
+        else:
+            total_losses += 1
+    else:
+        trade_returns = ((state.wallet_usd / state.start_money) * 100) - 100
+        if state.price_position > 0:  # se posicionou pelo menos 1 vez
+            if real_position:
+                loss = last_sell > state.price_position_real  # e o preço subiu depois de vendido
+            else:
+                loss = last_buy > state.price_position
+            if loss:
+                total_losses += 1
+            else:
+                total_gains += 1
+    buy_and_hold_returns = ((state.buy_and_hold * last_sell / state.start_money) * 100) - 100
+    accuracy = 0
+    if total_gains > 0 or total_losses > 0:
+        accuracy = (total_gains / (total_gains + total_losses)) * 100
+
+    return EngineResult(trade_returns=trade_returns, buy_and_hold_returns=buy_and_hold_returns, accuracy=accuracy,
+                        balance=balance, position=position, events=events, price=close[-1], price_buy=last_buy, price_sell=last_sell,
+                        state=state, **kwargs)
+
+
+def crossover_engine(close, cross, times, start_money, buy_increase, sell_decrease, stop_loss, stop_gain,
+                     trailing_stop, state=None):
+    r"""Motor vetorizado da estratégia de cruzamento (MA x MA ou MA x Preço). Reproduz exatamente
+    backtest.trading_crossover, mas percorre apenas as barras onde há compra, venda ou trailing stop.
+
+    :param np.ndarray close: preços de fechamento alinhados com 'cross'
+    :param np.ndarray cross: sinal (1, -1, 0 ou NaN) da diferença entre as médias, já atrasado em um período
+    :param np.ndarray times: timestamps int64 (ns) das barras
+    :param float start_money: saldo inicial da carteira
+    :param float buy_increase: porcentagem a acrescentar no valor de compra do ativo
+    :param float sell_decrease: porcentagem a decrementar no valor de venda do ativo
+    :param float stop_loss: porcentagem de desvalorização que dispara a venda
+    :param float stop_gain: porcentagem de valorização que dispara a venda (ou o trailing stop)
+    :param bool trailing_stop: indica se aplica ou não a técnica de 'stop móvel'
+    :param EngineState state: estado de uma execução anterior para continuar a simulação, ou None para iniciar
+    :return: objeto EngineResult
+    :rtype: EngineResult
+    """
+    n = len(close)
+    price_buy, price_sell, state = _start(close, start_money, buy_increase, sell_decrease, state)
+
+    prev = np.empty_like(cross)
+    prev[0] = state.last_cross if state.bars > 0 else cross[0]
+    prev[1:] = cross[:-1]
+    cross_up = (prev < 0) & (cross > 0)
+    cross_down = (cross < 0) & (prev > 0)
+    up_bars = np.flatnonzero(cross_up)
+    state.last_cross = cross[-1]
+
+    balance = np.empty(n)  # saldo da carteira em USD no fim de cada barra
+    position = np.zeros(n, dtype=bool)  # barras que terminaram em posição comprado
+    in_position = np.zeros(n, dtype=bool)  # barras avaliadas em posição comprado (após a barra de compra)
+    events = []  # (barra, tipo, preço, preço de posição, preço de compra, variação %, variação real %, moedas)
+    bar_buy = -1 if state.wallet_coins > 0 else None  # -1: posição aberta antes da primeira barra
+    usd_start = t = 0
+    while t < n:
+        if bar_buy is None:
+            k = np.searchsorted(up_bars, t)
+            if k == len(up_bars):
+                break
+            bar_buy = up_bars[k]
+            balance[usd_start:bar_buy] = state.wallet_usd
+            state.wallet_coins = state.wallet_usd / price_buy[bar_buy]
+            state.wallet_usd = 0
+            state.price_position = state.price_position_real = price_buy[bar_buy]
+            events.append((bar_buy, BUY, price_buy[bar_buy], 0, 0, 0, 0, state.wallet_coins))
+            t = bar_buy + 1
+
+        bar_sell = n
+        while t < n:
+            bar, porc_price = _find_stop(price_sell, state.price_position, stop_loss, stop_gain, t)
+            if bar == n:
+                break
+            if porc_price < stop_loss:
+                porc_price_real = ((price_sell[bar] / state.price_position_real) * 100) - 100
+                if porc_price_real < 0:
+                    state.total_losses += 1
+                else:
+                    state.total_gains += 1
+                events.append((bar, SELL_STOP_LOSS, price_sell[bar], state.price_position, state.price_position_real,
+                               porc_price, porc_price_real, state.wallet_coins))
+                bar_sell = bar
+                break
+            elif trailing_stop:
+                events.append((bar, TRAILING_STOP, price_buy[bar], state.price_position, state.price_position_real,
+                               porc_price, 0, state.wallet_coins))
+                state.price_position = price_buy[bar]
+                t = bar + 1
+            else:
+                state.total_gains += 1
+                events.append((bar, SELL_STOP_GAIN, price_sell[bar], state.price_position, state.price_position_real,
+                               porc_price, 0, state.wallet_coins))
+                bar_sell = bar
+                break
+
+        hold = max(bar_buy, 0)
+        in_position[bar_buy + 1:bar_sell + 1] = True
+        balance[hold:bar_sell] = state.wallet_coins * price_sell[hold:bar_sell]
+        position[hold:bar_sell] = True
+        if bar_sell == n:  # finalizou o período em posição comprado
+            usd_start = t = n
+            break
+        state.wallet_usd = state.wallet_coins * price_sell[bar_sell]
+        state.wallet_coins = 0
+        state.price_position = price_sell[bar_sell]
+        bar_buy = None
+        usd_start = bar_sell
+        t = bar_sell + 1
+    balance[usd_start:] = state.wallet_usd
+
+    # sinais de cruzamento enquanto comprado, exceto nas barras onde a simulação já inseriu um sinal
+    event_bars = np.array([e[0] for e in events if e[1] != TRAILING_STOP], dtype=np.int64)
+    raw = in_position & (cross_up | cross_down)
+    raw[event_bars] = False
+    raw_bars = np.flatnonzero(raw)
+    raw_actions = np.where(cross_down[raw_bars], -1, 1)
+    raw_prices = np.where(raw_actions == -1, price_sell[raw_bars], price_buy[raw_bars])
+
+    return _finish(state, close, times, price_buy, price_sell, balance, position, events, real_position=True,
+                   raw_bars=raw_bars, raw_prices=raw_prices, raw_actions=raw_actions)
+
+
+def rsi_engine(close, rsi, times, rsi_min, rsi_max, start_money, buy_increase, sell_decrease, state=None):
+    r"""Motor vetorizado das estratégias RSI. Reproduz exatamente backtest.trading_rsi: as barras de sobrecompra
+    (rsi > rsi_max) e sobrevenda (rsi <= rsi_min) são encontradas com máscaras vetorizadas e a lógica sequencial de
+    compra/venda percorre apenas as barras onde o RSI entra em uma dessas faixas.
+
+    :param np.ndarray close: preços de fechamento alinhados com 'rsi'
+    :param np.ndarray rsi: índice de força relativa de cada barra
+    :param np.ndarray times: timestamps int64 (ns) das barras
+    :param float rsi_min: limite inferior (sobrevenda)
+    :param float rsi_max: limite superior (sobrecompra)
+    :param float start_money: saldo inicial da carteira
+    :param float buy_increase: porcentagem a acrescentar no valor de compra do ativo
+    :param float sell_decrease: porcentagem a decrementar no valor de venda do ativo
+    :param EngineState state: estado de uma execução anterior para continuar a simulação, ou None para iniciar
+    :return: objeto EngineResult
+    :rtype: EngineResult
+    """
+    n = len(close)
+    price_buy, price_sell, state = _start(close, start_money, buy_increase, sell_decrease, state)
+
+    above = rsi > rsi_max  # sobrecompra: sinal de venda
+    below = ~above & (rsi <= rsi_min)  # sobrevenda: sinal de compra
+    signal_bars = np.flatnonzero(above | below)
+    signal_actions = np.where(above[signal_bars], -1, 1)
+    signal_prices = np.where(signal_actions == -1, price_sell[signal_bars], price_buy[signal_bars])
+
+    # a posição só muda na primeira barra de cada sequência de sinais iguais, a partir do primeiro sinal
+    # contrário à posição atual (compra se estiver vendido, venda se estiver comprado)
+    starts = np.flatnonzero(np.diff(signal_actions, prepend=0) != 0)
+    first = np.flatnonzero(signal_actions[starts] == (-1 if state.wallet_coins > 0 else 1))
+    transitions = signal_bars[starts[first[0]:]] if len(first) > 0 else signal_bars[:0]
+
+    balance = np.empty(n)
+    position = np.zeros(n, dtype=bool)
+    events = []  # (barra, tipo, preço, preço de posição, preço de compra, variação %, variação real %, moedas)
+    last_bar = 0
+    for bar in transitions.tolist():
+        if state.wallet_coins > 0:  # venda por sobrecompra
+            balance[last_bar:bar] = state.wallet_coins * price_sell[last_bar:bar]
+            position[last_bar:bar] = True
+            porc_price = ((price_sell[bar] / state.price_position) * 100) - 100
+            if porc_price < 0:
+                state.total_losses += 1
+            else:
+                state.total_gains += 1
+            events.append((bar, SELL_RSI, price_sell[bar], state.price_position, state.price_position, porc_price, 0,
+                           state.wallet_coins))
+            state.wallet_usd = state.wallet_coins * price_sell[bar]
+            state.wallet_coins = 0
+            state.price_position = price_sell[bar]
+        else:  # compra por sobrevenda
+            balance[last_bar:bar] = state.wallet_usd
+            state.wallet_coins = state.wallet_usd / price_buy[bar]
+            state.wallet_usd = 0
+            state.price_position = price_buy[bar]
+            events.append((bar, BUY_RSI, price_buy[bar], 0, 0, 0, 0, state.wallet_coins))
+        last_bar = bar
+    if state.wallet_coins > 0:
+        balance[last_bar:] = state.wallet_coins * price_sell[last_bar:]
+        position[last_bar:] = True
+    else:
+        balance[last_bar:] = state.wallet_usd
+
+    return _finish(state, close, times, price_buy, price_sell, balance, position, events, real_position=False,
+                   raw_bars=signal_bars, raw_prices=signal_prices, raw_actions=signal_actions)
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+u"""
+Description: Módulo para otimizar os parâmetros de um Setup executando backtests em lote sobre uma grade de valores.
+File name: optimize.py
+Author: Daniel Tell <daniel.tell@gmail.com>
+Date created: 17/10/2026
+Date last modified: 17/10/2026
+"""
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+import algotradingpy.controller.engine as engine
+import algotradingpy.utils.indicators as indicators
+import algotradingpy.utils.metrics as metrics
+import algotradingpy.utils.util as util
+import algotradingpy.view.console as console
+from algotradingpy.model.asset import Asset
+from algotradingpy.model.setup import Setup
+
+# parâmetros de Setup que podem variar na grade
+GRID_PARAMETERS = ("start_money", "short", "long", "stop_gain", "stop_loss", "trailing_stop", "rsi_min", "rsi_max",
+                   "rsi_period", "buy_increase", "sell_decrease")
+
+# colunas de resultado de cada combinação, após os parâmetros
+RESULT_COLUMNS = ("returns", "accuracy", "buy_and_hold") + metrics.METRICS
+
+_shared = {}  # indicadores pré-calculados, compartilhados com os processos de trabalho
+
+
+def optimize(asset: Asset, strategy, grid, days=None, jobs=1, chunk_size=256) -> pd.DataFrame:
+    r"""Executa um backtest para cada combinação de parâmetros da grade e retorna o ranking dos resultados.
+    Cada período distinto de EMA/SMA/RSI da grade é calculado uma única vez e as combinações são executadas pelos
+    motores vetorizados (engine) em um pool de processos.
+
+    :param Asset asset: ativo com os dados de candlestick
+    :param str strategy: uma das estratégias em util.STRATEGIES
+    :param dict grid: parâmetros de Setup (GRID_PARAMETERS) e a lista de valores de cada um,
+    ex.: {"short": range(3, 20), "long": [20, 50], "stop_loss": [-1, -2]}. Valores únicos são aceitos.
+    :param int days: quantidade de dias do backtest (como em BackTest), ou None para todo o período de 'asset'
+    :param int jobs: número de processos, com jobs=1 as combinações são executadas no processo atual
+    :param int chunk_size: quantidade de combinações enviadas por vez a cada processo
+    :return: DataFrame com os parâmetros e as colunas returns, accuracy, buy_and_hold e as métricas de
+    metrics.METRICS (max_drawdown, sharpe, ...) de cada combinação, ordenado do maior para o menor retorno
+    :rtype: pd.DataFrame
+    """
+    names, combinations = expand_grid(strategy, grid)
+    console.debug(f"Otimizando {strategy} para {asset.symbol} ({asset.time_frame}) com "
+                  f"{len(combinations)} combinações de parâmetros...")
+
+    shared = prepare(asset, strategy, combinations, days)
+    chunks = [combinations[i:i + chunk_size] for i in range(0, len(combinations), chunk_size)]
+    if jobs > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(shared,)) as executor:
+            rows = [row for rows in executor.map(run_combinations, [strategy] * len(chunks), chunks)
+                    for row in rows]
+    else:
+        _init_worker(shared)
+        rows = [row for chunk in chunks for row in run_combinations(strategy, chunk)]
+
+    return rank(rows, names)
+
+
+def expand_grid(strategy, grid):
+    r"""Valida a estratégia e os parâmetros da grade e gera todas as combinações de valores.
+
+    :param str strategy: uma das estratégias em util.STRATEGIES
+    :param dict grid: parâmetros de Setup (GRID_PARAMETERS) e a lista de valores de cada um
+    :return: uma tupla com a lista dos nomes dos parâmetros e a lista de dicionários com cada combinação
+    :rtype: tuple
+    """
+    if strategy not in util.STRATEGIES:
+        raise Exception(f"Valor de strategy é inválido! Valores aceitos: {util.STRATEGIES}")
+    for name in grid:
+        if name not in GRID_PARAMETERS:
+            raise Exception(f"Parâmetro '{name}' da grade é inválido! Valores aceitos: {GRID_PARAMETERS}")
+
+    names = list(grid)
+    values = [list(v) if isinstance(v, (list, tuple, range, np.ndarray)) else [v] for v in grid.values()]
+    return names, [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def rank(rows, names, by="returns") -> pd.DataFrame:
+    r"""Monta o DataFrame das linhas retornadas por run_combinations, ordenado do maior para o menor valor da coluna
+    'by' (desempate pela precisão)."""
+    df_result = pd.DataFrame(data=rows, columns=names + list(RESULT_COLUMNS))
+    df_result.sort_values(by=[by, "accuracy"], ascending=False, kind="mergesort", inplace=True)
+    df_result.reset_index(drop=True, inplace=True)
+    return df_result
+
+
+def prepare(asset: Asset, strategy, combinations, days=None):
+    r"""Calcula uma única vez os indicadores de cada período distinto usado nas combinações, já recortados na
+    janela do backtest.
+
+    :param Asset asset: ativo com os dados de candlestick
+    :param str strategy: uma das estratégias em util.STRATEGIES
+    :param list combinations: lista de dicionários com os parâmetros de cada combinação
+    :param int days: quantidade de dias do backtest, ou None para todo o período de 'asset'
+    :return: dicionário com os arrays que os motores precisam
+    :rtype: dict
+    """
+    candles = asset.candles
+    last = candles.index[-1]
+    end_date = last.strftime("%Y-%m-%d")
+    first_date = candles.index[0].strftime("%Y-%m-%d")
+    start_date = first_date if days is None else (last - timedelta(days=days)).strftime("%Y-%m-%d")
+    shared = {"strategy": strategy}
+    default = Setup(strategy=strategy)
+
+    if util.STRATEGIES[strategy] <= 2:  # MA x MA ou MA x Price
+        close = candles["close"]
+        window = candles.index.slice_indexer(start_date, end_date)
+        shorts = sorted({int(c.get("short", default.short)) for c in combinations})
+        shared["close"] = close.to_numpy(dtype=np.float64)[window]
+        shared["times"] = candles.index[window].values.astype("datetime64[ns]").view(np.int64)
+        ema = indicators.calc_indicator_matrix(close, shorts, "ema")[window]
+        shared["ema"] = dict((p, ema[:, k]) for k, p in enumerate(shorts))
+        if util.STRATEGIES[strategy] == 1:
+            longs = sorted({int(c.get("long", default.long)) for c in combinations})
+            sma = indicators.calc_indicator_matrix(close, longs, "sma")[window]
+            shared["sma"] = dict((p, sma[:, k]) for k, p in enumerate(longs))
+    else:
+        shared["rsi"] = {}
+        shared["thresholds"] = {}
+        for period in {c.get("rsi_period", default.rsi_period) for c in combinations}:
+            rsi = indicators.calc_rsi(values=candles, start_date=first_date, end_date=end_date, period=period)
+            shared["thresholds"][period] = indicators.get_rsi_thresholds(rsi, strategy)
+            rsi = rsi.loc[start_date: end_date]
+            shared["rsi"][period] = rsi.to_numpy(dtype=np.float64)
+            shared["close"] = candles.loc[rsi.index, "close"].to_numpy(dtype=np.float64)
+            shared["times"] = rsi.index.values.astype("datetime64[ns]").view(np.int64)
+    return shared
+
+
+def slice_shared(shared, start, end, thresholds=None):
+    r"""Recorta os arrays de 'shared' (retornado por prepare) nas barras [start, end), sem copiá-los. Assim os
+    indicadores calculados uma única vez sobre todo o histórico são usados em janelas menores.
+
+    :param dict shared: indicadores retornados por prepare
+    :param int start: posição da primeira barra da janela
+    :param int end: posição seguinte à última barra da janela
+    :param dict thresholds: limites de RSI {período: (rsi_min, rsi_max)} a usar nas estratégias 4 a 6, ou None para
+    calculá-los com o RSI da própria janela
+    :return: dicionário com os arrays da janela
+    :rtype: dict
+    """
+    window = {"strategy": shared["strategy"], "close": shared["close"][start:end], "times": shared["times"][start:end]}
+    for name in ("ema", "sma", "rsi"):
+        if name in shared:
+            window[name] = dict((period, values[start:end]) for period, values in shared[name].items())
+    if "rsi" in shared:
+        if thresholds is None:
+            thresholds = dict((period, indicators.get_rsi_thresholds(pd.Series(rsi), shared["strategy"]))
+                              for period, rsi in window["rsi"].items())
+        window["thresholds"] = thresholds
+    return window
+
+
+def run_setup(setup: Setup, shared):
+    r"""Executa o motor vetorizado de 'setup' com os indicadores de 'shared' (retornado por prepare/slice_shared).
+
+    :return: uma tupla com o retorno arredondado como trading_crossover/trading_rsi e o engine.EngineResult
+    :rtype: tuple
+    """
+    strategy = util.STRATEGIES[setup.get_strategy()]
+    close = shared["close"]
+    if strategy <= 2:
+        if strategy == 1:  # MA x MA
+            diff = shared["ema"][setup.short] - shared["sma"][setup.long]
+        else:  # MA x Price
+            diff = close - shared["ema"][setup.short]
+        cross = np.empty_like(diff)
+        cross[0] = np.nan  # sinais atrasados em um período, como em indicators.calc_crossover
+        cross[1:] = np.sign(diff[:-1])
+        res = engine.crossover_engine(close=close, cross=cross, times=shared["times"],
+                                      start_money=setup.start_money, buy_increase=setup.buy_increase,
+                                      sell_decrease=setup.sell_decrease,
+                                      stop_loss=setup.stop_loss, stop_gain=setup.stop_gain,
+                                      trailing_stop=setup.trailing_stop)
+        return float(f"{res.trade_returns:.2f}"), res
+    rsi_min, rsi_max = setup.rsi_min, setup.rsi_max
+    if strategy >= 4:  # limites calculados pelos quartis/discrepantes do RSI
+        rsi_min, rsi_max = shared["thresholds"][setup.rsi_period]
+    res = engine.rsi_engine(close=close, rsi=shared["rsi"][setup.rsi_period], times=shared["times"],
+                            rsi_min=rsi_min, rsi_max=rsi_max, start_money=setup.start_money,
+                            buy_increase=setup.buy_increase, sell_decrease=setup.sell_decrease)
+    return float(f"{res.trade_returns:.3f}"), res
+
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+
+def run_combinations(strategy, combinations, shared=None):
+    r"""Executa um bloco de combinações com os indicadores de 'shared' (ou de _shared, nos processos de trabalho).
+
+    :return: uma lista de linhas (valores dos parâmetros, retorno, precisão, buy and hold e métricas)
+    :rtype: list
+    """
+    if shared is None:
+        shared = _shared
+    rows = []
+    for params in combinations:
+        try:
+            setup = Setup(strategy=strategy, **params)
+            trade_returns, res = run_setup(setup, shared)
+            values = metrics.calc_metrics(res.balance, res.position, shared["times"], setup.start_money)
+            rows.append(list(params.values()) + [trade_returns, res.accuracy, res.buy_and_hold_returns] +
+                        [values[name] for name in metrics.METRICS])
+        except Exception as e:
+            console.show_error(f"Erro ao executar backtest de {strategy} com {params}", e)
+            rows.append(list(params.values()) + [np.nan] * len(RESULT_COLUMNS))
+    return rows
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+u"""
+Description: Módulo para calcular candles de timeframes maiores (5m, 1h, 1D, etc) a partir dos candles de 1m.
+File name: rollup.py
+Author: Daniel Tell <daniel.tell@gmail.com>
+Date created: 17/10/2026
+Date last modified: 17/10/2026
+"""
+import numpy as np
+import pandas as pd
+import algotradingpy.utils.util as util
+
+ROLLUP_BASE = "1m"  # timeframe dos candles usados para calcular os demais
+CANDLE_COLUMNS = ("open", "close", "low", "high", "volume")
+
+
+def bucket_start(times, time_frame):
+    r"""Calcula o início do candle de 'time_frame' de cada timestamp. Como nos candles da Bitfinex, os intervalos de
+    tamanho fixo (minutos, horas, dias e semanas) são alinhados à época Unix (1970-01-01 00:00, uma quinta-feira) e
+    os de mês (1M) ao primeiro dia de cada mês.
+
+    :param np.ndarray times: timestamps int64 (ns)
+    :param str time_frame: timeframe dos candles (5m, 1h, 1D, 7D, 1M, etc)
+    :return: timestamps int64 (ns) do início dos candles
+    :rtype: np.ndarray
+    """
+    times = np.asarray(times, dtype=np.int64)
+    if str(time_frame).endswith("M"):
+        months = int(time_frame[:-1])
+        month = times.view("datetime64[ns]").astype("datetime64[M]").astype(np.int64)
+        return (month - month % months).astype("datetime64[M]").astype("datetime64[ns]").view(np.int64)
+    size = util.get_time_frame_seconds(time_frame) * 1_000_000_000
+    return times - times % size
+
+
+def bucket_end(starts, time_frame):
+    r"""Calcula o início do candle seguinte (fim exclusivo) dos candles de 'time_frame' que começam em 'starts'."""
+    starts = np.asarray(starts, dtype=np.int64)
+    if str(time_frame).endswith("M"):
+        month = starts.view("datetime64[ns]").astype("datetime64[M]") + int(time_frame[:-1])
+        return month.astype("datetime64[ns]").view(np.int64)
+    return starts + util.get_time_frame_seconds(time_frame) * 1_000_000_000
+
+
+def rollup_candles(df_candles, time_frame, complete_only=True, base=ROLLUP_BASE):
+    r"""Agrupa candles de 1m (ou de qualquer timeframe menor) em candles de 'time_frame': abertura do primeiro
+    candle, máxima e mínima do intervalo, fechamento do último candle e soma dos volumes. A Bitfinex não gera candles
+    de 1m sem negociações, então um candle é considerado completo quando existe um candle posterior ao seu intervalo
+    ou quando o seu último minuto está presente.
+
+    :param pd.DataFrame df_candles: candles em ordem crescente indexados por time com as colunas OHLCV
+    :param str time_frame: timeframe dos candles calculados
+    :param bool complete_only: se True o último candle é descartado enquanto estiver incompleto
+    :param str base: timeframe dos candles de 'df_candles'
+    :return: DataFrame indexado por time (início de cada candle) com as colunas OHLCV
+    :rtype: pd.DataFrame
+    """
+    times = df_candles.index.values.astype("datetime64[ns]").view(np.int64)
+    if len(times) == 0:
+        return pd.DataFrame(dict((name, np.empty(0)) for name in CANDLE_COLUMNS),
+                            index=pd.DatetimeIndex([], dtype="datetime64[ns]", name="time"))
+    starts = bucket_start(times, time_frame)
+    first = np.flatnonzero(np.diff(starts, prepend=starts[0] - 1))  # primeira barra de cada candle
+    last = np.append(first[1:] - 1, len(times) - 1)
+    if complete_only:
+        step = util.get_time_frame_seconds(base) * 1_000_000_000
+        if times[-1] + step < bucket_end(starts[-1:], time_frame)[0]:
+            first, last = first[:-1], last[:-1]
+            if len(first) == 0:
+                return rollup_candles(df_candles.iloc[:0], time_frame, base=base)
+    end = last[-1] + 1
+    values = dict((name, df_candles[name].to_numpy(dtype=np.float64)[:end]) for name in CANDLE_COLUMNS)
+    data = {"open": values["open"][first], "close": values["close"][last],
+            "low": np.minimum.reduceat(values["low"], first), "high": np.maximum.reduceat(values["high"], first),
+            "volume": np.add.reduceat(values["volume"], first)}
+    return pd.DataFrame(data, index=pd.DatetimeIndex(starts[first].view("datetime64[ns]"), name="time"))
+
+
+class CandleRollup:
+
+    def __init__(self, time_frame, start=None):
+        r"""Calcula incrementalmente os candles de 'time_frame' conforme novos candles de 1m chegam, guardando somente
+        os candles de 1m do intervalo que ainda está incompleto.
+
+        :param str time_frame: timeframe dos candles calculados
+        :param start: data a partir da qual os candles de 1m são usados (ex.: início do próximo candle que ainda não
+        está no banco), os anteriores são ignorados
+        """
+        self.time_frame = time_frame
+        self.start = pd.Timestamp(start) if start is not None else None
+        self._pending = None  # candles de 1m do candle incompleto
+
+    def update(self, df_candles):
+        r"""Adiciona novos candles de 1m e retorna os candles de 'time_frame' que foram completados.
+
+        :param pd.DataFrame df_candles: candles de 1m em ordem crescente indexados por time com as colunas OHLCV
+        :return: DataFrame com os candles completados (pode ser vazio)
+        :rtype: pd.DataFrame
+        """
+        df_candles = df_candles.loc[:, list(CANDLE_COLUMNS)]
+        if self.start is not None:
+            df_candles = df_candles.loc[self.start:]
+        if self._pending is not None and len(self._pending) > 0:
+            df_candles = pd.concat((self._pending, df_candles.loc[df_candles.index > self._pending.index[-1]]))
+        df_rollup = rollup_candles(df_candles, self.time_frame)
+        if len(df_rollup) > 0:
+            next_start = bucket_end(df_rollup.index.values[-1:].view(np.int64), self.time_frame)[0]
+            df_candles = df_candles.loc[df_candles.index >= pd.Timestamp(next_start)]
+        self._pending = df_candles
+        return df_rollup
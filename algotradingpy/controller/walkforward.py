@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+u"""
+Description: Módulo para análise walk-forward: otimiza o Setup em janelas de treino e avalia na janela seguinte.
+File name: walkforward.py
+Author: Daniel Tell <daniel.tell@gmail.com>
+Date created: 17/10/2026
+Date last modified: 17/10/2026
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import algotradingpy.controller.optimize as optimize
+import algotradingpy.utils.metrics as metrics
+import algotradingpy.view.console as console
+from algotradingpy.model.asset import Asset
+from algotradingpy.model.setup import Setup
+from algotradingpy.model.wfresult import WalkForwardResult
+
+_shared = {}  # indicadores de todo o histórico, compartilhados com os processos de trabalho
+
+
+def walk_forward(asset: Asset, strategy, grid, train_days, test_days, anchored=False, rank_by="returns",
+                 jobs=1) -> WalkForwardResult:
+    r"""Divide os candles de 'asset' em janelas de treino e teste consecutivas. Em cada janela de treino todas as
+    combinações da grade são executadas e a melhor (pela coluna 'rank_by') é avaliada na janela de teste seguinte.
+    Os indicadores são calculados uma única vez sobre todo o histórico e recortados em cada janela. As janelas de
+    teste não se sobrepõem e são encadeadas na curva de capital fora da amostra: cada uma começa com o saldo final
+    da anterior (a posição aberta no fim de uma janela é avaliada pelo preço de venda da última barra).
+
+    :param Asset asset: ativo com os dados de candlestick
+    :param str strategy: uma das estratégias em util.STRATEGIES
+    :param dict grid: parâmetros de Setup (optimize.GRID_PARAMETERS) e a lista de valores de cada um
+    :param int train_days: quantidade de dias de cada janela de treino
+    :param int test_days: quantidade de dias de cada janela de teste (e o deslocamento entre as janelas)
+    :param bool anchored: se True todas as janelas de treino começam no primeiro candle (janela crescente)
+    :param str rank_by: coluna de optimize.RESULT_COLUMNS que escolhe a melhor combinação do treino
+    :param int jobs: número de processos, cada janela é executada por um processo
+    :return: objeto da classe WalkForwardResult
+    :rtype: WalkForwardResult
+    """
+    names, combinations = optimize.expand_grid(strategy, grid)
+    if rank_by not in optimize.RESULT_COLUMNS:
+        raise Exception(f"Valor de rank_by é inválido! Valores aceitos: {optimize.RESULT_COLUMNS}")
+    if train_days <= 0 or test_days <= 0:
+        raise Exception("Os valores de train_days e test_days devem ser maiores que zero!")
+
+    shared = optimize.prepare(asset, strategy, combinations)
+    windows = split_windows(shared["times"], train_days, test_days, anchored)
+    if len(windows) == 0:
+        raise Exception(f"Não existem candles suficientes de {asset.symbol} para uma janela de {train_days} dias de "
+                        f"treino e {test_days} dias de teste!")
+    console.debug(f"Walk-forward de {strategy} para {asset.symbol} ({asset.time_frame}) com {len(windows)} janelas "
+                  f"e {len(combinations)} combinações de parâmetros...")
+
+    args = ([strategy] * len(windows), [names] * len(windows), [combinations] * len(windows), windows,
+            [rank_by] * len(windows))
+    if jobs > 1 and len(windows) > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(shared,)) as executor:
+            results = list(executor.map(_run_window, *args))
+    else:
+        _init_worker(shared)
+        results = list(map(_run_window, *args))
+
+    # encadeia as curvas de capital das janelas de teste
+    start_money = results[0][3]
+    capital = start_money
+    equity = []
+    for row, balance, position, money in results:
+        equity.append(balance * (capital / money))
+        capital = equity[-1][-1]
+    times = shared["times"]
+    return WalkForwardResult(df_windows=pd.DataFrame(data=[row for row, balance, position, money in results]),
+                             equity=np.concatenate(equity),
+                             position=np.concatenate([position for row, balance, position, money in results]),
+                             times=np.concatenate([times[w[2]:w[3]] for w in windows]), start_money=start_money)
+
+
+def split_windows(times, train_days, test_days, anchored=False):
+    r"""Calcula as posições das barras de cada janela de treino e teste.
+
+    :param np.ndarray times: timestamps int64 (ns) das barras, em ordem crescente
+    :param int train_days: quantidade de dias de cada janela de treino
+    :param int test_days: quantidade de dias de cada janela de teste
+    :param bool anchored: se True as janelas de treino começam na primeira barra
+    :return: lista de tuplas (início do treino, fim do treino, início do teste, fim do teste), onde cada fim é a
+    posição seguinte à última barra da janela
+    :rtype: list
+    """
+    windows = []
+    if len(times) == 0:
+        return windows
+    train_ns, test_ns = int(train_days * metrics.NS_PER_DAY), int(test_days * metrics.NS_PER_DAY)
+    test_start = times[0] + train_ns
+    while test_start <= times[-1]:
+        train_start = 0 if anchored else np.searchsorted(times, test_start - train_ns)
+        train_end = np.searchsorted(times, test_start)
+        test_end = np.searchsorted(times, test_start + test_ns)
+        if train_start < train_end < test_end:
+            windows.append((int(train_start), int(train_end), int(train_end), int(test_end)))
+        test_start += test_ns
+    return windows
+
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+
+def _run_window(strategy, names, combinations, window, rank_by):
+    r"""Otimiza a grade na janela de treino e executa a melhor combinação na janela de teste.
+
+    :return: uma tupla com a linha de resultado da janela (dict), o saldo e a posição de cada barra de teste e o
+    saldo inicial da combinação escolhida
+    :rtype: tuple
+    """
+    train_start, train_end, test_start, test_end = window
+    train = optimize.slice_shared(_shared, train_start, train_end)
+    rows = optimize.run_combinations(strategy, combinations, train)
+    column = len(names) + optimize.RESULT_COLUMNS.index(rank_by)
+    accuracy = len(names) + optimize.RESULT_COLUMNS.index("accuracy")
+    # maior valor de 'rank_by' (desempate pela precisão), as combinações com erro (NaN) ficam por último
+    best = np.lexsort((-np.array([row[accuracy] for row in rows], dtype=np.float64),
+                       -np.array([row[column] for row in rows], dtype=np.float64)))[0]
+
+    test = optimize.slice_shared(_shared, test_start, test_end, train.get("thresholds"))
+    setup = Setup(strategy=strategy, **combinations[best])
+    trade_returns, res = optimize.run_setup(setup, test)
+    times = _shared["times"]
+    row = {"train_start": pd.Timestamp(times[train_start]), "train_end": pd.Timestamp(times[train_end - 1]),
+           "test_start": pd.Timestamp(times[test_start]), "test_end": pd.Timestamp(times[test_end - 1])}
+    row.update(combinations[best])
+    row["train_returns"] = rows[best][len(names)]
+    row.update(zip(optimize.RESULT_COLUMNS, [trade_returns, res.accuracy, res.buy_and_hold_returns]))
+    row.update(metrics.calc_metrics(res.balance, res.position, test["times"], setup.start_money))
+    return row, res.balance, res.position, setup.start_money
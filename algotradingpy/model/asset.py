@@ -4,20 +4,21 @@ Description: Classe Modelo para representar um ativo que possui dados de candles
 File name: asset.py
 Author: Daniel Tell <daniel.tell@gmail.com>
 Date created: 02/10/2021
-Date last modified: 30/09/2022
+Date last modified: 17/10/2026
 """
 import pandas as pd
 from datetime import datetime
 import algotradingpy.view.console as console
+from algotradingpy.model.candlebuffer import CandleBuffer
 import json
 
 
 class Asset:
-    candles = pd.DataFrame([])  # dados históricos de candlestck / negociações
+    _candles: CandleBuffer = None  # dados históricos de candlestick, acessados pela propriedade candles
     trades = pd.DataFrame([])  # dados históricos de negociações
     last_update: datetime = None  # datetime da última atualização de candles/trades
 
-    def __init__(self, ptype, symbol, description, time_frame, data):
+    def __init__(self, ptype, symbol, description, time_frame, data, copy=True):
         r"""Construtor de Asset que inicializa os dados de candles/trades dependendo do parâmetro ptype.
 
         :param ptype: tipo de conteúdo em 'data': candlestick ou trade
@@ -25,6 +26,8 @@ class Asset:
         :param description: descrição do símbolo do ativo
         :param time_frame: período de tempo de cada candlestick (1m, 5m, 15m, etc)
         :param data: um DataFrame com os dados
+        :param copy: se False os candles de 'data' não são copiados e o Asset passa a usar os seus arrays (ex.: um
+        DataFrame recém-criado por Mysql, que não é alterado depois)
         """
         self._type = ptype
         self.symbol = symbol
@@ -34,13 +37,39 @@ class Asset:
         self.updated = True
 
         if ptype == "candlestick":
-            self.candles = data
+            self._candles = CandleBuffer(data, copy=copy) if data is not None else None
         elif ptype == "trade":
             self.trades = data
         else:
             console.show_warning(f"Tipo {ptype} para o símbolo {symbol} é inválido!" 
                                  f" São aceitos apenas os tipos \"candlestick\" ou \"trade\".")
 
+    @property
+    def candles(self) -> pd.DataFrame:
+        r"""Dados históricos de candlestick (DataFrame indexado por time, sem cópia do CandleBuffer)."""
+        if self._candles is None:
+            return pd.DataFrame([])
+        return self._candles.frame()
+
+    @candles.setter
+    def candles(self, data):
+        self._candles = CandleBuffer(data) if data is not None else None
+
+    def append_candles(self, df_candles):
+        r"""Insere os candles de 'df_candles' posteriores ao último candle do Asset.
+
+        :return: quantidade de candles inseridos
+        :rtype: int
+        """
+        if self._candles is None:
+            self.candles = df_candles
+            return len(df_candles)
+        return self._candles.append(df_candles)
+
+    def remove_candles_before(self, date):
+        r"""Remove os candles anteriores a 'date' e retorna a quantidade removida."""
+        return self._candles.remove_before(date) if self._candles is not None else 0
+
     def get_type(self):
         return self._type
 
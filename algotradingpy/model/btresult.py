@@ -4,15 +4,18 @@ Description: Classe para modelo que representa o resultado de um backtest.
 File name: btresult.py
 Author: Daniel Tell <daniel.tell@gmail.com>
 Date created: 19/09/2022
-Date last modified: 19/09/2022
+Date last modified: 17/10/2026
 """
 from algotradingpy.model.signal import Signal
-from pandas import DataFrame
+from algotradingpy.model.tradelog import TradeLog
+import algotradingpy.utils.metrics as metrics
+from pandas import DataFrame, Series, DatetimeIndex
 
 
 class BacktestResult:
 
-    def __init__(self, trade_returns, buy_and_hold_returns, accuracy, df_wallet, signal):
+    def __init__(self, trade_returns, buy_and_hold_returns, accuracy, df_wallet, signal, checkpoint=None,
+                 trade_log=None, equity=None, position=None, times=None):
         r"""Construtor de BacktestResult que inicializa os dados .
 
         :param float trade_returns: retorno em % se usar a estrategia trading
@@ -20,6 +23,12 @@ class BacktestResult:
         :param float accuracy: precisão de 0 a 100% da estrategia de trade
         :param DataFrame df_wallet: data frame contendo o saldo na carteira por dia, onde o primeiro registro é o 'start_money'
         :param Signal signal: um objeto contendo todos os sinais de compra/venda durante o back test
+        :param checkpoint: estado dos motores vetorizados ao fim do backtest (backtest.Checkpoint), usado para
+        continuar o backtest com novos candles, ou None
+        :param TradeLog trade_log: operações registradas no backtest, ou None se executado no modo silencioso
+        :param np.ndarray equity: curva de capital, saldo da carteira em USD no fim de cada barra
+        :param np.ndarray position: True nas barras que terminaram em posição comprado
+        :param np.ndarray times: timestamps int64 (ns) das barras
         :rtype: BacktestResult
         """
         self.trade_returns = trade_returns
@@ -27,6 +36,12 @@ class BacktestResult:
         self.accuracy = accuracy
         self.df_wallet = df_wallet
         self.signal = signal
+        self.checkpoint = checkpoint
+        self.trade_log = trade_log
+        self.equity = equity
+        self.position = position
+        self.times = times
+        self._metrics = None
 
     def get_trade_returns(self):
         return self.trade_returns
@@ -42,3 +57,52 @@ class BacktestResult:
 
     def get_signal(self) -> Signal:
         return self.signal
+
+    def get_checkpoint(self):
+        return self.checkpoint
+
+    def get_trade_log(self) -> TradeLog:
+        return self.trade_log
+
+    def get_equity(self, period=None) -> Series:
+        r"""Retorna a curva de capital por barra ou reamostrada pelo saldo da última barra de cada dia/semana.
+
+        :param str period: None (todas as barras), "D" (diário) ou "W" (semanal)
+        :return: série com o saldo em USD indexada pela data das barras
+        :rtype: Series
+        """
+        if period is None:
+            bars = slice(None)
+        else:
+            bars = metrics.period_end_bars(self.times, period)
+        return Series(self.equity[bars], index=DatetimeIndex(self.times[bars].view("datetime64[ns]")), name="balance")
+
+    def get_metrics(self) -> dict:
+        r"""Calcula (uma única vez) as métricas de desempenho da curva de capital: max_drawdown (%), sharpe e sortino
+        (anualizados), exposure (% das barras comprado), trades e profit_factor.
+
+        :return: dicionário com as métricas
+        :rtype: dict
+        """
+        if self._metrics is None:
+            self._metrics = metrics.calc_metrics(self.equity, self.position, self.times,
+                                                 self.df_wallet["balance"].iat[0])
+        return self._metrics
+
+    def get_max_drawdown(self):
+        return self.get_metrics()["max_drawdown"]
+
+    def get_sharpe(self):
+        return self.get_metrics()["sharpe"]
+
+    def get_sortino(self):
+        return self.get_metrics()["sortino"]
+
+    def get_exposure(self):
+        return self.get_metrics()["exposure"]
+
+    def get_trade_count(self):
+        return self.get_metrics()["trades"]
+
+    def get_profit_factor(self):
+        return self.get_metrics()["profit_factor"]
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+u"""
+Description: Classe para armazenar os candles de um Asset em arrays NumPy com inserção e remoção em tempo amortizado.
+File name: candlebuffer.py
+Author: Daniel Tell <daniel.tell@gmail.com>
+Date created: 17/10/2026
+Date last modified: 17/10/2026
+"""
+import numpy as np
+import pandas as pd
+
+MIN_CAPACITY = 1024  # capacidade mínima (em candles) dos arrays alocados
+
+
+class CandleBuffer:
+
+    def __init__(self, df_candles, copy=True):
+        r"""Buffer de candles com um array por coluna e uma janela [início, fim) com os candles válidos. Os novos
+        candles são copiados para o espaço livre no fim dos arrays (que dobram de tamanho quando enchem) e os antigos
+        são removidos apenas avançando o início da janela, assim cada atualização custa O(novos candles). Os arrays
+        nunca são sobrescritos dentro de uma janela já publicada, então os DataFrames retornados por frame()
+        continuam válidos depois de novas inserções e remoções.
+
+        :param pd.DataFrame df_candles: candles iniciais indexados por time
+        :param bool copy: se False os arrays de 'df_candles' são usados sem cópia, para DataFrames que não serão
+        alterados por quem os criou (o buffer nunca escreve dentro dos candles que recebeu)
+        """
+        self.names = list(df_candles.columns)
+        self._time = df_candles.index.values.astype("datetime64[ns]", copy=False).view(np.int64)
+        if copy:
+            self._time = self._time.copy()
+        self._columns = dict((name, df_candles[name].to_numpy(copy=copy)) for name in self.names)
+        self._start = 0
+        self._end = len(self._time)
+        self._frame = None
+
+    def __len__(self):
+        return self._end - self._start
+
+    def frame(self) -> pd.DataFrame:
+        r"""Retorna os candles válidos como um DataFrame indexado por time que compartilha a memória dos arrays
+        (sem cópia). O DataFrame é reaproveitado até a próxima alteração do buffer.
+        """
+        if self._frame is None:
+            window = slice(self._start, self._end)
+            index = pd.DatetimeIndex(self._time[window].view("datetime64[ns]"), name="time", copy=False)
+            self._frame = pd.DataFrame(dict((name, self._columns[name][window]) for name in self.names), index=index,
+                                       copy=False)
+        return self._frame
+
+    def last_time(self):
+        r"""Retorna o pd.Timestamp do último candle, ou None se o buffer estiver vazio."""
+        return pd.Timestamp(self._time[self._end - 1]) if len(self) > 0 else None
+
+    def append(self, df_candles):
+        r"""Insere no fim do buffer os candles de 'df_candles' posteriores ao último candle.
+
+        :param pd.DataFrame df_candles: candles indexados por time, com as mesmas colunas do buffer
+        :return: quantidade de candles inseridos
+        :rtype: int
+        """
+        times = df_candles.index.values.astype("datetime64[ns]").view(np.int64)
+        first = np.searchsorted(times, self._time[self._end - 1], side="right") if len(self) > 0 else 0
+        count = len(times) - first
+        if count <= 0:
+            return 0
+        end = self._end + count
+        if end > len(self._time):
+            # aloca novos arrays com o dobro dos candles válidos, copiando somente a janela atual
+            size = len(self) + count
+            capacity = max(2 * size, MIN_CAPACITY)
+            window = slice(self._start, self._end)
+            self._time = _grow(self._time[window], capacity)
+            self._columns = dict((name, _grow(values[window], capacity)) for name, values in self._columns.items())
+            self._start, self._end, end = 0, size - count, size
+        self._time[self._end:end] = times[first:]
+        for name in self.names:
+            self._columns[name][self._end:end] = df_candles[name].to_numpy()[first:]
+        self._end = end
+        self._frame = None
+        return count
+
+    def remove_before(self, date):
+        r"""Remove do início do buffer os candles anteriores a 'date'.
+
+        :return: quantidade de candles removidos
+        :rtype: int
+        """
+        start = self._start + np.searchsorted(self._time[self._start:self._end], pd.Timestamp(date).value,
+                                              side="left")
+        count = start - self._start
+        if count > 0:
+            self._start = start
+            self._frame = None
+        return int(count)
+
+
+def _grow(values, capacity):
+    r"""Copia 'values' para o início de um novo array de tamanho 'capacity'."""
+    grown = np.empty(capacity, dtype=values.dtype)
+    grown[:len(values)] = values
+    return grown
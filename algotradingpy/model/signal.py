@@ -1,17 +1,43 @@
 
 u"""
 Created on 2022-02-28
-Updated on 2022-02-28
+Updated on 2026-10-17
 
 @author: Daniel Tell
 """
+import numpy as np
+import pandas as pd
 
 
 class Signal:
 
-    def __init__(self):
+    def __init__(self, capacity=64):
+        r"""Armazena os sinais de compra/venda em colunas (arrays NumPy) que só recebem novos registros. Cada sinal é
+        único pela data e estratégia, verificado por um índice hash. As estratégias e observações são guardadas como
+        códigos de uma lista de valores únicos.
+
+        :param int capacity: quantidade inicial de sinais reservada nos arrays (cresce conforme necessário)
+        """
         self.last_id = 0
-        self.signals = []
+        self._size = 0
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._dates = np.empty(capacity, dtype="datetime64[ns]")
+        self._prices = np.empty(capacity, dtype=np.float64)
+        self._actions = np.empty(capacity, dtype=np.int8)
+        self._rsi = np.empty(capacity, dtype=np.float64)  # NaN quando o sinal não tem RSI
+        self._strategies = np.empty(capacity, dtype=np.int32)
+        self._obs = np.empty(capacity, dtype=np.int32)
+        self._strategy_values, self._strategy_codes = [], {}
+        self._obs_values, self._obs_codes = [], {}
+        self._keys = {}  # (data em ns, código da estratégia) -> posição do sinal
+        self._view = []  # sinais já convertidos por get_signals()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def signals(self) -> list:
+        return self.get_signals()
 
     def insert_signal(self, date, price, action, strategy, obs="", rsi=None):
         r"""Insere um sinal na lista com identificador único.
@@ -25,21 +51,157 @@ class Signal:
         :return: True se conseguiu inserir ou False se o registro já existe
         :rtype bool
         """
-        for signal in self.signals:
-            if signal["date"] == date and signal["strategy"] == strategy:
-                return False
+        date = pd.Timestamp(date).value
+        key = (date, self._code(self._strategy_values, self._strategy_codes, strategy))
+        if key in self._keys:
+            return False
+        row = self._keys[key] = self._size
+        self._reserve(row + 1)
         self.last_id += 1
-        signal = {"id": self.last_id,
-                  "date": date,
-                  "price": price,
-                  "action": action,
-                  "strategy": strategy,
-                  "obs": obs,
-                  "rsi": rsi
-                  }
-        self.signals.append(signal)
+        self._ids[row] = self.last_id
+        self._dates[row] = np.datetime64(date, "ns")
+        self._prices[row] = price
+        self._actions[row] = action
+        self._strategies[row] = key[1]
+        self._obs[row] = self._code(self._obs_values, self._obs_codes, obs)
+        self._rsi[row] = np.nan if rsi is None else rsi
+        self._size += 1
 
         return True
 
+    def insert_signals(self, dates, prices, actions, strategy, obs=None, rsi=None):
+        r"""Insere vários sinais de uma vez na ordem recebida, ignorando os que já existem (mesma data e estratégia).
+
+        :param list dates: datas em que os sinais foram detectados
+        :param list prices: preço do ativo no momento de cada sinal
+        :param list actions: compra (1), venda (-1) ou neutro(0) para cada sinal
+        :param str strategy: tipo de estratégia executada no backtest que gerou os sinais
+        :param list obs: observações opcionais de cada sinal
+        :param list rsi: indices RSI de cada sinal, opcional e usado somente quando a estratégia for RSI
+        :return: quantidade de sinais inseridos
+        :rtype int
+        """
+        count = len(dates)
+        if count == 0:
+            return 0
+        obs_codes = np.full(count, self._code(self._obs_values, self._obs_codes, ""), dtype=np.int32)
+        if obs is not None:
+            obs_codes = np.array([self._code(self._obs_values, self._obs_codes, o) for o in obs], dtype=np.int32)
+        rsi = np.full(count, np.nan) if rsi is None else np.array([np.nan if r is None else r for r in rsi],
+                                                                   dtype=np.float64)
+        return self._append(dates=pd.DatetimeIndex(dates).values.astype("datetime64[ns]"),
+                            prices=np.asarray(prices, dtype=np.float64),
+                            actions=np.asarray(actions, dtype=np.int8),
+                            strategies=np.full(count, self._code(self._strategy_values, self._strategy_codes, strategy),
+                                               dtype=np.int32),
+                            obs=obs_codes, rsi=rsi)
+
+    def merge(self, other, start=0):
+        r"""Insere os sinais de outro objeto Signal a partir da posição 'start', ignorando os que já existem.
+
+        :param Signal other: objeto com os sinais a inserir
+        :param int start: posição do primeiro sinal de 'other' a inserir
+        :return: quantidade de sinais inseridos
+        :rtype int
+        """
+        if other._size <= start:
+            return 0
+        rows = slice(start, other._size)
+        strategy_map = np.array([self._code(self._strategy_values, self._strategy_codes, s)
+                                 for s in other._strategy_values], dtype=np.int32)
+        obs_map = np.array([self._code(self._obs_values, self._obs_codes, o) for o in other._obs_values],
+                           dtype=np.int32)
+        return self._append(dates=other._dates[rows], prices=other._prices[rows], actions=other._actions[rows],
+                            strategies=strategy_map[other._strategies[rows]], obs=obs_map[other._obs[rows]],
+                            rsi=other._rsi[rows])
+
     def get_signals(self) -> list:
-        return self.signals
+        r"""Retorna os sinais como uma lista de dicionários (id, date, price, action, strategy, obs, rsi). A lista é
+        montada só para os sinais inseridos desde a última chamada."""
+        start, end = len(self._view), self._size
+        if start < end:
+            rsi = self._rsi[start:end]
+            columns = zip(self._ids[start:end].tolist(), pd.DatetimeIndex(self._dates[start:end]),
+                          self._prices[start:end].tolist(), self._actions[start:end].tolist(),
+                          self._strategies[start:end].tolist(), self._obs[start:end].tolist(),
+                          np.where(np.isnan(rsi), None, rsi).tolist())
+            self._view.extend({"id": signal_id,
+                               "date": date,
+                               "price": price,
+                               "action": action,
+                               "strategy": self._strategy_values[strategy],
+                               "obs": self._obs_values[obs],
+                               "rsi": rsi
+                               } for signal_id, date, price, action, strategy, obs, rsi in columns)
+        return self._view
+
+    def to_dataframe(self) -> pd.DataFrame:
+        r"""Retorna os sinais em um DataFrame cujas colunas usam a memória dos arrays, sem copiá-los (pandas 2+).
+        As colunas strategy e obs são categóricas e rsi é NaN quando o sinal não tem RSI.
+
+        :return: DataFrame com as colunas id, date, price, action, strategy, obs e rsi
+        :rtype: pd.DataFrame
+        """
+        size = self._size
+        return pd.DataFrame({"id": self._ids[:size],
+                             "date": self._dates[:size],
+                             "price": self._prices[:size],
+                             "action": self._actions[:size],
+                             "strategy": pd.Categorical.from_codes(self._strategies[:size],
+                                                                   categories=self._categories(self._strategy_values)),
+                             "obs": pd.Categorical.from_codes(self._obs[:size],
+                                                              categories=self._categories(self._obs_values)),
+                             "rsi": self._rsi[:size]
+                             }, copy=False)
+
+    @staticmethod
+    def _categories(values):
+        return pd.Index(values, dtype=object) if len(values) > 0 else pd.Index([""], dtype=object)
+
+    @staticmethod
+    def _code(values, codes, value):
+        r"""Retorna o código de 'value' na lista de valores únicos, incluindo-o se ainda não existir."""
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def _append(self, dates, prices, actions, strategies, obs, rsi):
+        r"""Insere as colunas de novos sinais, ignorando as datas e estratégias já existentes ou repetidas."""
+        keep = []
+        keys = self._keys
+        size = self._size
+        for i, key in enumerate(zip(dates.view(np.int64).tolist(), strategies.tolist())):
+            if key not in keys:
+                keys[key] = size + len(keep)
+                keep.append(i)
+        count = len(keep)
+        if count == 0:
+            return 0
+        if count < len(dates):
+            dates, prices, actions, strategies, obs, rsi = (column[keep] for column in
+                                                            (dates, prices, actions, strategies, obs, rsi))
+        self._reserve(size + count)
+        end = size + count
+        self._ids[size:end] = np.arange(self.last_id + 1, self.last_id + count + 1)
+        self._dates[size:end] = dates
+        self._prices[size:end] = prices
+        self._actions[size:end] = actions
+        self._strategies[size:end] = strategies
+        self._obs[size:end] = obs
+        self._rsi[size:end] = rsi
+        self.last_id += count
+        self._size = end
+        return count
+
+    def _reserve(self, capacity):
+        r"""Aumenta os arrays (dobrando de tamanho) para caber 'capacity' sinais."""
+        if capacity <= len(self._ids):
+            return
+        capacity = max(capacity, 2 * len(self._ids))
+        for name in ("_ids", "_dates", "_prices", "_actions", "_rsi", "_strategies", "_obs"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
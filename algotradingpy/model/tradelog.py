@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+u"""
+Description: Classe Modelo para registrar as operações de um backtest e gerar o texto do log somente quando pedido.
+File name: tradelog.py
+Author: Daniel Tell <daniel.tell@gmail.com>
+Date created: 17/10/2026
+Date last modified: 17/10/2026
+"""
+import pandas as pd
+import algotradingpy.view.console as console
+
+# Tipos de operações registradas durante a simulação
+BUY = 1  # compra no cruzamento
+SELL_STOP_LOSS = 2  # venda pelo gatilho stop loss
+SELL_STOP_GAIN = 3  # venda pelo gatilho stop gain
+TRAILING_STOP = 4  # atualização do preço de posição pelo trailing stop
+SELL_RSI = 5  # venda por sobrecompra do RSI
+BUY_RSI = 6  # compra por sobrevenda do RSI
+
+
+class TradeLog:
+
+    def __init__(self, start_money=None, time_position=None):
+        r"""Registro das operações de um backtest em tuplas, o texto de cada operação só é montado por render().
+
+        :param float start_money: saldo inicial da carteira, ou None se o backtest continua um anterior
+        :param int time_position: timestamp int64 (ns) da última compra/venda de um backtest anterior
+        """
+        self.start_money = start_money
+        self.time_position = time_position
+        self._batches = []  # (eventos, timestamps das barras ou None, RSI das barras ou None)
+        self._end = None
+
+    def record(self, time, kind, price, position=0, position_real=0, porc=0, porc_real=0, coins=0, rsi=None):
+        r"""Registra uma operação dos backtests em loop.
+
+        :param int time: timestamp int64 (ns) da barra
+        :param int kind: tipo da operação (BUY, SELL_STOP_LOSS, SELL_STOP_GAIN, TRAILING_STOP, SELL_RSI, BUY_RSI)
+        :param float price: preço da operação
+        :param float position: preço da posição (stop) no momento da operação
+        :param float position_real: preço real da compra
+        :param float porc: variação % em relação a 'position'
+        :param float porc_real: variação % em relação a 'position_real'
+        :param float coins: quantidade de moedas da posição
+        :param float rsi: RSI da barra (estratégias RSI)
+        """
+        if not self._batches or self._batches[-1][1] is not None:
+            self._batches.append(([], None, None))
+        self._batches[-1][0].append((time, kind, price, position, position_real, porc, porc_real, coins, rsi))
+
+    def add_events(self, events, times, rsi=None):
+        r"""Registra as operações de um motor vetorizado sem copiá-las.
+
+        :param list events: tuplas (barra, tipo, preço, posição, posição real, variação %, variação real %, moedas)
+        :param np.ndarray times: timestamps int64 (ns) das barras
+        :param np.ndarray rsi: RSI das barras (estratégias RSI)
+        """
+        self._batches.append((events, times, rsi))
+
+    def finish(self, wallet_coins, wallet_usd, price, trade_res, decimals=2):
+        r"""Registra a posição no fim do período.
+
+        :param float wallet_coins: moedas na carteira
+        :param float wallet_usd: saldo em USD na carteira
+        :param float price: último preço de fechamento
+        :param str trade_res: retorno da estratégia já formatado
+        :param int decimals: casas decimais do saldo em USD quando vendido
+        """
+        self._end = (wallet_coins, wallet_usd, price, trade_res, decimals)
+
+    def __len__(self):
+        return sum(len(events) for events, times, rsi in self._batches)
+
+    def render(self) -> list:
+        r"""Monta as mensagens (com cores ANSI) de cada operação registrada.
+
+        :return: lista de strings
+        :rtype: list
+        """
+        lines = []
+        if self.start_money is not None:
+            lines.append("Saldo inicial da carteira \033[1m(USD): {:.2f}\033[m".format(self.start_money))
+        time_position = self.time_position
+        for events, times, rsi_values in self._batches:
+            for event in events:
+                bar, kind, price, position, position_real, porc, porc_real, coins = event[:8]
+                t = int(times[bar]) if times is not None else bar
+                value = rsi_values[bar] if rsi_values is not None else event[8] if len(event) > 8 else None
+                lines.append(_render_event(t, kind, price, position, position_real, porc, porc_real, coins, value,
+                                           time_position))
+                if kind != TRAILING_STOP:
+                    time_position = t
+        if self._end is not None:
+            wallet_coins, wallet_usd, price, trade_res, decimals = self._end
+            if wallet_coins > 0:
+                lines.append("Finalizou período na posição comprado com {:.8f} moedas (\033[1mUSD {:.2f} = {}%\033[m)"
+                             .format(wallet_coins, wallet_coins * price, trade_res))
+            else:
+                lines.append("Finalizou período na posição vendido com \033[1mUSD {:.{}f} = {}%\033[m".format(
+                    wallet_usd, decimals, trade_res))
+        return lines
+
+    def show(self):
+        r"""Imprime o log no console (nível debug)."""
+        for line in self.render():
+            console.debug(line)
+
+
+def _render_event(t, kind, price, position, position_real, porc, porc_real, coins, rsi, time_position):
+    r"""Monta a mensagem de uma operação, com as mesmas mensagens que os backtests imprimiam a cada operação."""
+    time = pd.Timestamp(t).strftime("%d/%m/%Y %H:%M")
+    h = m = 0
+    if time_position is not None:
+        interval = int((t - time_position) // 1_000_000_000)
+        h = interval // 3600
+        m = (interval % 3600) // 60
+    if kind == BUY:
+        if time_position is None:
+            return f"\033[1;34mPrimeira compra em {time} ({coins:.8f} moedas ao preço de {price:.5f} dólares \033[m)"
+        return (f"\033[1;34mPosição de compra em {time}, após {h:02d}h{m:02d}m ({coins:.8f} "
+                f"moedas ao preço de {price:.5f} dólares).\033[m")
+    if kind == SELL_STOP_LOSS:
+        color = 31 if porc_real < 0 else 32  # vermelho ou verde
+        return (f"\033[1;{color}mGatilho Stop Loss atingido em {time}, após {h:02d}h{m:02d}m "
+                f"(stop {position:.5f}, compra {position_real:.5f}, venda {price:.5f}, "
+                f"var. stop {porc:.2f}%, var. real {porc_real:.2f}%).\033[m")
+    if kind == SELL_STOP_GAIN:
+        return (f"\033[1;32mGatilho Stop Gain atingido em {time}, após {h:02d}h{m:02d}m (preço comprado "
+                f"{position:.5f}, preço vendido {price:.5f}, variação de {porc:.2f}%).\033[m")
+    if kind == TRAILING_STOP:
+        return (f"\033[7;32mGatilho Trailing Stop em {time} (preço comprado {position:.5f}, "
+                f"preço atual {price:.5f}, aumento de {porc:.2f}%).\033[m")
+    if kind == SELL_RSI:
+        color = 31 if porc < 0 else 32  # vermelho ou verde
+        return (f"\033[1;{color}mRSI sobrecomprado em {time}, após {h:02d}h{m:02d}m (RSI: {rsi:.2f}, "
+                f"vendido a {price:.5f}, preço de compra {position:.5f}, {porc:.2f}%).\033[m")
+    if time_position is None:  # BUY_RSI
+        return (f"\033[1;34mPrimeira compra, RSI sobrevendido em {time} (RSI: {rsi:.2f}, "
+                f"comprado {coins:.8f} moedas ao preço de {price:.5f} USD \033[m).")
+    return (f"\033[1;34mRSI sobrevendido em {time}, após {h:02d}h{m:02d}m (RSI: {rsi:.2f}, "
+            f"comprado {coins:.8f} moedas ao preço de {price:.5f} USD).\033[m")
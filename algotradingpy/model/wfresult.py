@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+u"""
+Description: Classe para modelo que representa o resultado de uma análise walk-forward.
+File name: wfresult.py
+Author: Daniel Tell <daniel.tell@gmail.com>
+Date created: 17/10/2026
+Date last modified: 17/10/2026
+"""
+import algotradingpy.utils.metrics as metrics
+from pandas import DataFrame, Series, DatetimeIndex
+
+
+class WalkForwardResult:
+
+    def __init__(self, df_windows, equity, position, times, start_money):
+        r"""Construtor de WalkForwardResult com o resultado de cada janela e a curva de capital fora da amostra.
+
+        :param DataFrame df_windows: uma linha por janela com as datas de treino/teste, os parâmetros escolhidos no
+        treino, o retorno de treino (train_returns) e o resultado no teste (returns, accuracy, buy_and_hold e métricas)
+        :param np.ndarray equity: curva de capital das janelas de teste encadeadas, cada janela começando com o saldo
+        final da anterior
+        :param np.ndarray position: True nas barras de teste que terminaram em posição comprado
+        :param np.ndarray times: timestamps int64 (ns) das barras de teste
+        :param float start_money: saldo inicial da carteira
+        :rtype: WalkForwardResult
+        """
+        self.df_windows = df_windows
+        self.equity = equity
+        self.position = position
+        self.times = times
+        self.start_money = start_money
+        self._metrics = None
+
+    def get_windows(self) -> DataFrame:
+        return self.df_windows
+
+    def get_returns(self):
+        r"""Retorno (%) acumulado fora da amostra."""
+        if len(self.equity) == 0:
+            return 0.0
+        return float((self.equity[-1] / self.start_money) * 100 - 100)
+
+    def get_equity(self, period=None) -> Series:
+        r"""Retorna a curva de capital fora da amostra por barra ou reamostrada por dia/semana.
+
+        :param str period: None (todas as barras), "D" (diário) ou "W" (semanal)
+        :return: série com o saldo em USD indexada pela data das barras
+        :rtype: Series
+        """
+        bars = slice(None) if period is None else metrics.period_end_bars(self.times, period)
+        return Series(self.equity[bars], index=DatetimeIndex(self.times[bars].view("datetime64[ns]")), name="balance")
+
+    def get_metrics(self) -> dict:
+        r"""Métricas de desempenho (metrics.calc_metrics) da curva de capital fora da amostra."""
+        if self._metrics is None:
+            self._metrics = metrics.calc_metrics(self.equity, self.position, self.times, self.start_money)
+        return self._metrics
@@ -5,15 +5,22 @@ Description: Classe para realizar testes de simulação com backtest.
 File name: test_backtest.py
 Author: Daniel Tell <daniel.tell@gmail.com>
 Date created: 2021-12-11
-Date last modified: 2022-10-05
+Date last modified: 2026-10-17
 """
 
+import copy
 from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
 from algotradingpy.controller.backtest import BackTest
+from algotradingpy.controller.optimize import optimize
+from algotradingpy.controller.walkforward import walk_forward
 from algotradingpy.model.btresult import BacktestResult
 from algotradingpy.controller.data import Mysql
 from algotradingpy.model.setup import Setup
+from algotradingpy.model.signal import Signal
 import algotradingpy.utils.config as config
+import algotradingpy.utils.indicators as indicators
 import algotradingpy.view.console as console
 import algotradingpy.utils.util as util
 
@@ -28,6 +35,7 @@ stop_gain = 3.0
 trailing_stop = False
 short = 9
 long = 15
+rsi_period = 14
 
 console.log_level = config.get_loglevel()
 
@@ -109,6 +117,203 @@ def test_strategy_rsi_min_max(asset, strategy, test_number):
     console.show("")
 
 
+def test_engines_equal(asset, strategy, test_number):
+    assert strategy in util.STRATEGIES
+
+    console.show(f"TESTE #{test_number}: comparando os motores 'loop' e 'array' com a estratégia {strategy} "
+                 f"para {symbol} ({time_frame})...")
+    setup = Setup(strategy=strategy, start_money=start_money, short=short, long=long, stop_loss=stop_loss,
+                  stop_gain=stop_gain, trailing_stop=trailing_stop, buy_increase=buy_increase,
+                  sell_decrease=sell_decrease)
+    asset.updated = True
+    bt_loop = BackTest(asset, setup, back_test_days, engine="loop").bt_result
+    asset.updated = True
+    bt_array = BackTest(asset, setup, back_test_days, engine="array").bt_result
+
+    assert bt_loop.get_trade_returns() == bt_array.get_trade_returns()
+    assert bt_loop.get_buy_and_hold_returns() == bt_array.get_buy_and_hold_returns()
+    assert bt_loop.get_accuracy() == bt_array.get_accuracy()
+    assert bt_loop.get_df_wallet().equals(bt_array.get_df_wallet())
+    assert bt_loop.get_signal().get_signals() == bt_array.get_signal().get_signals()
+    assert bt_loop.get_trade_log().render() == bt_array.get_trade_log().render()
+    assert bt_loop.get_equity().equals(bt_array.get_equity())
+    assert bt_loop.get_metrics() == bt_array.get_metrics()
+    asset.updated = True
+    bt_silent = BackTest(asset, setup, back_test_days, engine="array", silent=True).bt_result
+    assert bt_silent.get_trade_log() is None and bt_silent.get_trade_returns() == bt_array.get_trade_returns()
+    console.show(f"OK! Os dois motores retornaram o mesmo resultado.")
+    console.show("")
+
+
+def test_optimize(asset, strategy, test_number):
+    assert strategy in util.STRATEGIES
+
+    console.show(f"TESTE #{test_number}: otimizando parâmetros da estratégia {strategy} para {symbol} ({time_frame})...")
+    grid = {"short": [4, 9], "long": [15, 30], "stop_loss": [-1.5, stop_loss], "stop_gain": [1.5, stop_gain],
+            "buy_increase": buy_increase, "sell_decrease": sell_decrease}
+    df_result = optimize(asset, strategy, grid, days=back_test_days, jobs=2, chunk_size=4)
+    assert len(df_result) == 16
+    assert df_result["returns"].is_monotonic_decreasing
+
+    best = df_result.iloc[0]
+    setup = Setup(strategy=strategy, start_money=start_money, short=best["short"], long=best["long"],
+                  stop_loss=best["stop_loss"], stop_gain=best["stop_gain"], buy_increase=buy_increase,
+                  sell_decrease=sell_decrease)
+    asset.updated = True
+    backtest = BackTest(asset, setup, back_test_days)
+    assert backtest.bt_result.get_trade_returns() == best["returns"]
+    assert backtest.bt_result.get_accuracy() == best["accuracy"]
+    console.show(f"OK! Melhor combinação: {best.to_dict()}")
+    console.show("")
+
+
+def test_walk_forward(asset, strategy, test_number):
+    assert strategy in util.STRATEGIES
+
+    console.show(f"TESTE #{test_number}: análise walk-forward da estratégia {strategy} para {symbol} ({time_frame})...")
+    grid = {"short": [4, 9], "long": [15, 30], "stop_loss": [-1.5, stop_loss], "stop_gain": stop_gain,
+            "buy_increase": buy_increase, "sell_decrease": sell_decrease}
+    wf_result = walk_forward(asset, strategy, grid, train_days=4, test_days=2)
+    wf_parallel = walk_forward(asset, strategy, grid, train_days=4, test_days=2, jobs=2)
+    df_windows = wf_result.get_windows()
+    assert len(df_windows) > 0 and df_windows.equals(wf_parallel.get_windows())
+    assert (df_windows["test_start"] > df_windows["train_end"]).all()
+    assert (df_windows["test_start"].iloc[1:].values > df_windows["test_end"].iloc[:-1].values).all()
+    returns = ((df_windows["returns"] / 100 + 1).prod() - 1) * 100  # retornos arredondados de cada janela
+    assert abs(wf_result.get_returns() - returns) < 0.01 * len(df_windows)
+    console.show(f"OK! {len(df_windows)} janelas, retorno fora da amostra de {wf_result.get_returns():.2f}%.")
+    console.show("")
+
+
+def test_incremental_update(asset, strategy, test_number):
+    assert strategy in util.STRATEGIES
+
+    console.show(f"TESTE #{test_number}: comparando o backtest continuado por update() com o backtest completo "
+                 f"da estratégia {strategy} para {symbol} ({time_frame})...")
+    setup = Setup(strategy=strategy, start_money=start_money, short=short, long=long, stop_loss=stop_loss,
+                  stop_gain=stop_gain, trailing_stop=trailing_stop, buy_increase=buy_increase,
+                  sell_decrease=sell_decrease)
+    candles = asset.candles
+    last_day = candles.index[-1].normalize()
+    first = candles.index.searchsorted(last_day)  # os candles novos são do mesmo dia, assim o período não muda
+    assert len(candles) - first >= 2
+    asset_part = copy.copy(asset)
+    asset_part.candles = candles.iloc[:first + 1]
+    asset_part.updated = True
+    backtest = BackTest(asset_part, setup, back_test_days)
+    for end in range(first + 2, len(candles) + 1):
+        asset_part.candles = candles.iloc[:end]
+        asset_part.updated = True
+        assert backtest.update()
+    asset.updated = True
+    bt_full = BackTest(asset, copy.copy(setup), back_test_days).bt_result
+    bt_incremental = backtest.bt_result
+
+    assert bt_full.get_trade_returns() == bt_incremental.get_trade_returns()
+    assert bt_full.get_accuracy() == bt_incremental.get_accuracy()
+    assert bt_full.get_df_wallet().equals(bt_incremental.get_df_wallet())
+    assert bt_full.get_signal().get_signals() == backtest.get_signal().get_signals()
+    assert bt_full.get_equity().equals(bt_incremental.get_equity())
+    # como em Mysql.update, os candles antigos são removidos a cada atualização e o backtest continua sem ser refeito
+    asset_part.candles = candles.iloc[:first + 1]
+    asset_part.updated = True
+    backtest = BackTest(asset_part, copy.copy(setup), back_test_days)
+    full_runs = []
+    run = backtest.run
+    backtest.run = lambda *args: full_runs.append(args) or run(*args)
+    for end in range(first + 2, len(candles) + 1):
+        asset_part.candles = candles.iloc[end - first - 1:end]
+        asset_part.updated = True
+        assert backtest.update()
+    assert full_runs == []
+    assert backtest.bt_result.get_trade_returns() == bt_incremental.get_trade_returns()
+    assert backtest.bt_result.get_df_wallet().equals(bt_incremental.get_df_wallet())
+    assert backtest.bt_result.get_signal().get_signals() == bt_incremental.get_signal().get_signals()
+    assert backtest.bt_result.get_equity().equals(bt_incremental.get_equity())
+    console.show(f"OK! {len(candles) - first - 1} atualizações retornaram o mesmo resultado do backtest completo.")
+    console.show("")
+
+
+def test_indicator_streams(asset, test_number):
+    console.show(f"TESTE #{test_number}: comparando os indicadores incrementais com calc_ema, calc_sma e calc_rsi "
+                 f"para {symbol} ({time_frame})...")
+    close = asset.candles["close"].to_numpy()
+    half = len(close) // 2
+    ema = indicators.calc_ema(asset.candles, short)["close"].to_numpy()
+    sma = indicators.calc_sma(asset.candles, long)["close"].to_numpy()
+    rsi = indicators.calc_rsi(asset.candles, asset.candles.index[0], asset.candles.index[-1], rsi_period).to_numpy()
+    ema_stream = indicators.EmaStream(short, history=close[:half])
+    sma_stream = indicators.SmaStream(long, history=close[:half])
+    rsi_stream = indicators.RsiStream(rsi_period, history=close[:half])
+    for i in range(half, len(close)):
+        assert ema_stream.update(close[i]) == ema[i]
+        assert abs(sma_stream.update(close[i]) - sma[i]) < 1e-9
+        assert abs(rsi_stream.update(close[i]) - rsi[i - 1]) < 1e-9
+    # com valores NaN a média incremental segue o decaimento dos pesos do ewm do pandas (ignore_na=False)
+    gaps = close.copy()
+    gaps[3::7] = gaps[4::7] = np.nan
+    ema = indicators.calc_ema(pd.Series(gaps), short).to_numpy()
+    ema_stream = indicators.EmaStream(short, history=gaps[:half])
+    assert np.allclose([ema_stream.update(value) for value in gaps[half:]], ema[half:], rtol=1e-12, equal_nan=True)
+    assert np.allclose(indicators.EmaStream(short, history=gaps[:half + 4]).update(gaps[half + 4:]), ema[half + 4:],
+                       rtol=1e-12, equal_nan=True)
+    console.show(f"OK! {len(close) - half} candles atualizados com os mesmos valores dos cálculos completos.")
+    console.show("")
+
+
+def test_indicator_matrix(asset, test_number):
+    console.show(f"TESTE #{test_number}: comparando a matriz de indicadores com calc_ema e calc_sma "
+                 f"para {symbol} ({time_frame})...")
+    close = asset.candles["close"]
+    periods = list(range(3, 31))
+    ema = indicators.calc_indicator_matrix(close, periods, "ema")
+    sma = indicators.calc_indicator_matrix(close, periods, "sma", dtype=np.float32)
+    assert ema.shape == sma.shape == (len(close), len(periods)) and sma.dtype == np.float32
+    for k, period in enumerate(periods):
+        assert np.allclose(ema[:, k], indicators.calc_ema(close, period), rtol=1e-9)
+        assert np.allclose(sma[:, k], indicators.calc_sma(close, period), rtol=1e-5, equal_nan=True)
+    console.show(f"OK! {len(periods)} períodos calculados com os mesmos valores.")
+    console.show("")
+
+
+def test_signal_store(test_number):
+    console.show(f"TESTE #{test_number}: verificando a inserção, a junção e a conversão dos sinais...")
+    dates = pd.date_range("2026-10-01", periods=4, freq="15min")
+    signal = Signal(capacity=2)
+    assert signal.insert_signal(dates[0], 1.0, 1, "RSI_Min_Max", obs="compra", rsi=25.0)
+    assert not signal.insert_signal(dates[0], 2.0, -1, "RSI_Min_Max")  # mesma data e estratégia
+    assert signal.insert_signal(dates[0], 2.0, -1, "MAxMA")
+    # repetidos no próprio lote e já existentes são ignorados
+    assert signal.insert_signals([dates[0], dates[1], dates[1], dates[2]], [1.0, 1.1, 1.2, 1.3], [1, -1, 1, 1],
+                                 "RSI_Min_Max", obs=["", "venda", "", ""], rsi=[20.0, 75.0, None, None]) == 2
+    assert len(signal) == 4 and signal.last_id == 4
+    assert [s["price"] for s in signal.get_signals()] == [1.0, 2.0, 1.1, 1.3]
+
+    # outro objeto com as estratégias e observações em outra ordem (outros códigos)
+    other = Signal()
+    other.insert_signal(dates[3], 3.0, -1, "MAxMA", obs="venda")
+    other.insert_signal(dates[1], 3.1, 1, "RSI_AVG", obs="nova")
+    other.insert_signal(dates[1], 3.2, 1, "RSI_Min_Max", obs="compra", rsi=30.0)  # já existe em signal
+    other.insert_signal(dates[3], 3.3, 1, "RSI_Min_Max", rsi=28.0)
+    assert signal.merge(other, start=1) == 2
+    merged = signal.get_signals()[4:]
+    assert [(s["date"], s["strategy"], s["obs"], s["rsi"]) for s in merged] == [
+        (dates[1], "RSI_AVG", "nova", None), (dates[3], "RSI_Min_Max", "", 28.0)]
+    assert signal.merge(other) == 1 and signal.get_signals()[-1]["strategy"] == "MAxMA"
+
+    df_signals = signal.to_dataframe()
+    assert isinstance(df_signals["strategy"].dtype, pd.CategoricalDtype)
+    assert isinstance(df_signals["obs"].dtype, pd.CategoricalDtype)
+    expected = pd.DataFrame(signal.get_signals())
+    assert (df_signals["id"] == expected["id"]).all() and (df_signals["date"] == expected["date"]).all()
+    assert df_signals["strategy"].astype(object).tolist() == expected["strategy"].tolist()
+    assert df_signals["obs"].astype(object).tolist() == expected["obs"].tolist()
+    assert df_signals["rsi"].isna().tolist() == expected["rsi"].isna().tolist()
+    assert df_signals["rsi"].dropna().tolist() == expected["rsi"].dropna().tolist()
+    console.show(f"OK! {len(signal)} sinais sem repetição de data e estratégia.")
+    console.show("")
+
+
 def test_backtest_not_changed(test_number):
     asset_xrp = data.get_candles(symbol="xrpusd", time_frame="15m", start_date="2020-09-25", end_date="2020-09-30")
     console.show(f"TESTE #{test_number}: validando se todas funções de backtesting não foram modificadas "
@@ -181,6 +386,19 @@ if __name__ == "__main__":
     test_strategy_rsi_min_max(asset, "RSI_AVG", 8)
     asset.updated = True
     test_updated_signal(asset, "MAxMA", 9)
+    test_engines_equal(asset, "MAxMA", 10)
+    test_engines_equal(asset, "MAxPrice", 11)
+    test_engines_equal(asset, "RSI_Min_Max", 12)
+    test_engines_equal(asset, "RSI_Quartiles", 13)
+    test_engines_equal(asset, "RSI_Outliers", 14)
+    test_engines_equal(asset, "RSI_AVG", 15)
+    test_optimize(asset, "MAxMA", 16)
+    test_incremental_update(asset, "MAxMA", 17)
+    test_incremental_update(asset, "RSI_Min_Max", 18)
+    test_indicator_streams(asset, 19)
+    test_indicator_matrix(asset, 20)
+    test_walk_forward(asset, "MAxMA", 21)
+    test_signal_store(22)
 
 
 
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+u"""
+Created on 2026-10-17
+Updated on 2026-10-17
+
+@author: Daniel Tell
+"""
+import asyncio
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import algotradingpy.utils.util as util
+from algotradingpy.controller.collect import DataCollection
+from algotradingpy.utils.ratelimit import RateLimiter, TokenBucket
+
+symbols = {'btcusd': 'Bitcoin/US Dólar', 'ethusd': 'Etherium/US Dólar', 'xrpusd': 'Ripple/US Dólar'}
+time_frames = ['1m', '5m', '15m', '1h']
+concurrency = 4
+delay = 0.1  # segundos de cada resposta do servidor falso
+
+
+class FakeBitfinex(BaseHTTPRequestHandler):
+    # Servidor HTTP local que responde como a API v2 da Bitfinex (trades e candles) e registra os requests
+    requests = []
+    throttle = 0  # quantidade de requests de trades respondidos com HTTP 429
+    fail = 0  # quantidade de requests respondidos com HTTP 500
+    trade_step = 1000  # milissegundos entre os trades
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with FakeBitfinex.lock:
+            FakeBitfinex.active += 1
+            FakeBitfinex.max_active = max(FakeBitfinex.max_active, FakeBitfinex.active)
+        try:
+            url = urlparse(self.path)
+            if '/trades/' in url.path and FakeBitfinex.throttle > 0:
+                FakeBitfinex.throttle -= 1
+                body = b'["error",11010,"ratelimit: error"]'
+                self.send_response(429)
+                self.send_header('Retry-After', '0')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if FakeBitfinex.fail > 0:
+                FakeBitfinex.fail -= 1
+                self.send_response(500)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            query = parse_qs(url.query)
+            start, limit = int(float(query['start'][0])), int(query['limit'][0])
+            # start e end inclusivos, como na API
+            end = min(int(float(query['end'][0])) + 1, int(time.time() * 1000))
+            if '/trades/' in url.path:
+                step = FakeBitfinex.trade_step
+                times = range(-(-start // step) * step, end, step)[:limit]
+                data = [[mts // step, mts, 0.5 if mts % 2000 else -0.5, 100.0] for mts in times]
+            else:
+                step = util.get_time_frame_seconds(url.path.split(':')[1]) * 1000
+                times = range(-(-start // step) * step, end, step)[:limit]
+                data = [[mts, 100.0, 101.0, 102.0, 99.0, 10.0] for mts in times]
+            with FakeBitfinex.lock:
+                FakeBitfinex.requests.append((url.path, start))
+            time.sleep(delay)
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with FakeBitfinex.lock:
+                FakeBitfinex.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeCollection(DataCollection):
+
+    def __init__(self, past):
+        # Coletor sem banco de dados: os registros da API são guardados em 'written'
+        self.symbols = dict(symbols)
+        self.api_time_frames = time_frames
+        self.api_limit = 100
+        self.interval = 0
+        self.concurrency = concurrency
+        self.dict_cid_symbol = dict((symbol, cid) for cid, symbol in enumerate(symbols, 1))
+        self.dict_last_trades = dict((symbol, past) for symbol in symbols)
+        self.dict_time_candles = dict((symbol + time_frame, past) for symbol in symbols for time_frame in time_frames)
+        self.dict_next_candles = {}
+        self.limiter = RateLimiter({'trades': 6000, 'candles': 6000})
+        self.start_date = datetime.datetime.fromtimestamp(past).strftime('%Y-%m-%d %H:%M:%S')
+        self.written = []
+        self.times = {}  # (símbolo, timeframe ou trades) -> timestamps gravados
+        self.windows = {}  # tabela backfill: (cid, timeframe, início) -> [fim, concluída]
+
+    def write_trades(self, cid, symbol, description, last_in_trade, trades):
+        self.written.append((symbol, 'trades', trades[-1][1]))
+        self.times.setdefault((symbol, 'trades'), []).extend(trade[1] for trade in trades)
+        self.dict_last_trades[symbol] = trades[-1][1] / 1000
+
+    def write_candles(self, cid, symbol, description, time_frame, last_in_candle, candles):
+        self.written.append((symbol, time_frame, candles[-1][0]))
+        self.times.setdefault((symbol, time_frame), []).extend(candle[0] for candle in candles)
+        self.dict_time_candles[symbol + time_frame] = candles[-1][0] / 1000
+
+    def plan_backfill(self, windows):
+        for cid, kind, start, end in windows:
+            window = self.windows.setdefault((cid, kind, start), [end, False])
+            if end > window[0]:
+                self.windows[(cid, kind, start)] = [end, False]
+
+    def get_pending_backfill(self):
+        return sorted((key + (end,) for key, (end, done) in self.windows.items() if not done), key=lambda w: w[2])
+
+    def write_backfill_done(self, cid, kind, start, records):
+        self.windows[(cid, kind, start)][1] = True
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBitfinex)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    util.API_GET_TRADES_V2 = base + '/v2/trades/t{}/hist?limit={}&start={}&end={}&sort=1'
+    util.API_GET_CANDLES = base + '/v2/candles/trade:{}:t{}/hist?limit={}&start={}&end={}&sort=1'
+    return server
+
+
+def test_collect_async():
+    server = start_server()
+    try:
+        past = int(time.time()) - 86400
+        collector = FakeCollection(past)
+        started = time.monotonic()
+        asyncio.run(collector.collect_async(sweeps=2))
+        elapsed = time.monotonic() - started
+        assert FakeBitfinex.max_active == concurrency
+        # sequencialmente seriam len(requests) * delay segundos
+        assert elapsed < len(FakeBitfinex.requests) * delay / 2
+        assert sum(1 for path, start in FakeBitfinex.requests if '/trades/' in path) == 2 * len(symbols)
+        now = int(time.time() * 1000)
+        for symbol in symbols:
+            for time_frame in time_frames:
+                step = util.get_time_frame_seconds(time_frame) * 1000
+                starts = [start for path, start in FakeBitfinex.requests
+                          if path.endswith(f':{time_frame}:t{symbol.upper()}/hist')]
+                last = [mts for written, written_tf, mts in collector.written
+                        if (written, written_tf) == (symbol, time_frame)]
+                # requests seguidos até o último candle fechado, cada um continuando do último candle do anterior, e
+                # nenhum request na segunda varredura, pois o candle atual ainda não fechou
+                assert starts == [past * 1000 + 1] + [mts + 1 for mts in last[:-1]]
+                assert last[-1] >= (now // step - 2) * step
+                due = collector.dict_next_candles[symbol + time_frame]
+                assert due > now / 1000 - 60 and round((due - util.API_CLOSE_DELAY) * 1000) % step == 0
+    finally:
+        server.shutdown()
+
+
+def test_collect_429():
+    server = start_server()
+    try:
+        FakeBitfinex.requests.clear()
+        FakeBitfinex.throttle = 2
+        collector = FakeCollection(int(time.time()) - 3600)
+        asyncio.run(collector.collect_async(sweeps=1))
+        stats = collector.limiter.stats()
+        assert stats['trades']['throttled'] == 2 and stats['candles']['throttled'] == 0
+        # os requests de trades foram repetidos depois do Retry-After
+        assert set(symbol for symbol, kind, mts in collector.written if kind == 'trades') == set(symbols)
+    finally:
+        server.shutdown()
+
+
+def test_backfill():
+    server = start_server()
+    try:
+        FakeBitfinex.trade_step = 600_000
+        past = int(time.time()) - 6 * 3600
+        collector = FakeCollection(past)
+        # os requests que falharem deixam as suas janelas pendentes
+        FakeBitfinex.requests.clear()
+        FakeBitfinex.fail = 5
+        asyncio.run(collector.backfill_async())
+        windows = len(collector.windows)
+        assert len(collector.get_pending_backfill()) == 5
+        assert len(FakeBitfinex.requests) == windows - 5
+        # a nova execução (ex.: após uma falha do processo) busca somente as janelas pendentes
+        FakeBitfinex.requests.clear()
+        asyncio.run(collector.backfill_async())
+        assert len(collector.get_pending_backfill()) == 0
+        # além das pendentes, somente a última janela de cada símbolo e timeframe pode ter avançado até agora
+        trailing = len(symbols) * (len(time_frames) + 1)
+        assert len(FakeBitfinex.requests) <= 5 + trailing + len(collector.windows) - windows
+        for symbol in symbols:
+            for kind in ['trades'] + time_frames:
+                step = FakeBitfinex.trade_step if kind == 'trades' else util.get_time_frame_seconds(kind) * 1000
+                # registros repetidos das janelas que avançaram são ignorados pelo INSERT IGNORE
+                times = sorted(set(collector.times[(symbol, kind)]))
+                assert times[0] == -(-past * 1000 // step) * step
+                assert times == list(range(times[0], times[-1] + 1, step))
+                assert times[-1] >= (int(time.time() * 1000) // step - 2) * step
+    finally:
+        FakeBitfinex.trade_step = 1000
+        server.shutdown()
+
+
+def test_backfill_write_error():
+    server = start_server()
+    try:
+        FakeBitfinex.trade_step = 600_000
+        past = int(time.time()) - 6 * 3600
+        collector = FakeCollection(past)
+        write_candles = collector.write_candles
+        failed = []
+
+        def fail_once(cid, symbol, description, time_frame, last_in_candle, candles):
+            # o primeiro lote de candles de 1h falha ao gravar
+            if time_frame == '1h' and not failed:
+                failed.append((cid, time_frame, last_in_candle))
+                raise Exception('Falha ao gravar')
+            write_candles(cid, symbol, description, time_frame, last_in_candle, candles)
+
+        collector.write_candles = fail_once
+        collector.reconnect = lambda: None
+        asyncio.run(collector.backfill_async())
+        pending = collector.get_pending_backfill()
+        assert len(pending) == 1 and pending[0][:2] == failed[0][:2]
+        # a janela pendente é buscada e gravada na nova execução
+        asyncio.run(collector.backfill_async())
+        assert len(collector.get_pending_backfill()) == 0
+        assert all(len(collector.times.get((symbol, '1h'), [])) > 0 for symbol in symbols)
+    finally:
+        FakeBitfinex.trade_step = 1000
+        server.shutdown()
+
+
+def test_rate_limit():
+    # nenhuma janela de 1 segundo pode ter mais que 'limit' requests, mesmo com várias threads
+    limit = 20
+    bucket = TokenBucket(limit, window=1.0)
+    moments = []
+    lock = threading.Lock()
+
+    def request():
+        bucket.acquire()
+        with lock:
+            moments.append(time.monotonic())
+
+    threads = [threading.Thread(target=request) for _ in range(2 * limit)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    moments.sort()
+    assert all(sum(1 for moment in moments if first <= moment < first + 1.0) <= limit for first in moments)
+    assert moments[-1] - moments[0] < 2.5
+    assert bucket.stats()['requests'] == 2 * limit
+
+
+if __name__ == '__main__':
+    test_collect_async()
+    test_collect_429()
+    test_backfill()
+    test_backfill_write_error()
+    test_rate_limit()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+u"""
+Created on 2026-10-17
+Updated on 2026-10-17
+
+@author: Daniel Tell
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from algotradingpy.controller.dataservice import DataService
+from algotradingpy.model.asset import Asset
+from algotradingpy.utils.singletonmeta import SingletonMeta
+
+threads = 16
+start_date = datetime(2026, 10, 1)
+end_date = datetime(2026, 10, 2)
+
+
+class FakeBackend:
+
+    def __init__(self, delay=0.2):
+        r"""Backend sem banco de dados que conta as consultas e demora 'delay' segundos em cada uma."""
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_candles(self, symbol, time_frame, start_date, end_date, max_points=None, bucket=None):
+        with self.lock:
+            self.calls.append((symbol, time_frame, start_date, end_date))
+        time.sleep(self.delay)
+        if symbol == 'error':
+            raise Exception("Falha na consulta")
+        index = pd.date_range(start_date, end_date, freq='15min', name='time')
+        data = dict((name, np.arange(len(index), dtype=np.float64)) for name in ('open', 'close', 'low', 'high',
+                                                                                 'volume'))
+        return Asset(ptype='candlestick', symbol=symbol, description=symbol, time_frame=time_frame,
+                     data=pd.DataFrame(data, index=index))
+
+
+def new_service(ttl=30.0):
+    SingletonMeta._instances.pop(DataService, None)
+    return DataService(backend=FakeBackend(), ttl=ttl)
+
+
+def test_single_flight():
+    service = new_service()
+    assert DataService() is service
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        assets = list(executor.map(lambda i: service.get_candles('xrpusd', '15m', start_date, end_date),
+                                   range(threads)))
+    assert len(service.backend.calls) == 1
+    assert len(set(id(asset) for asset in assets)) == threads
+    assert all(asset.candles.equals(assets[0].candles) for asset in assets)
+    # o resultado recente vem do LRU, inclusive com as datas em outro tipo
+    service.get_candles('xrpusd', '15m', pd.Timestamp(start_date), pd.Timestamp(end_date))
+    assert len(service.backend.calls) == 1
+    service.get_candles('btcusd', '15m', start_date, end_date)
+    assert len(service.backend.calls) == 2
+
+
+def test_single_flight_error():
+    service = new_service(ttl=0)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [executor.submit(service.get_candles, 'error', '15m', start_date, end_date) for _ in range(threads)]
+    assert all(future.exception() is not None for future in futures)
+    assert len(service.backend.calls) == 1
+    service.get_candles('xrpusd', '15m', start_date, end_date)
+    service.get_candles('xrpusd', '15m', start_date, end_date)
+    assert len(service.backend.calls) == 3
+
+
+if __name__ == '__main__':
+    test_single_flight()
+    test_single_flight_error()
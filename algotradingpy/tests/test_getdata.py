@@ -2,11 +2,14 @@
 # -*- coding: utf-8 -*-
 u"""
 Created on 2021-12-11
-Updated on 2021-12-11
+Updated on 2026-10-17
 
 @author: Daniel Tell
 """
+import tempfile
 from algotradingpy.controller.data import Mysql
+from algotradingpy.controller.rollup import rollup_candles
+from algotradingpy.controller.bars import trade_bars
 import algotradingpy.utils.config as config
 import algotradingpy.view.console as console
 
@@ -16,14 +19,112 @@ time_frame = '15m'
 console.log_level = config.get_loglevel()
 
 
+def get_data(**kwargs):
+    return Mysql(db_host=config.get_db_host(), db_port=config.get_db_port(), db_user=config.get_db_user(),
+                 db_pass=config.get_db_pass(), db_name=config.get_db_name(), **kwargs)
+
+
+def get_period(data, days=back_test_days):
+    asset = data.get_candles_days(symbol=symbol, time_frame=time_frame, days=days)
+    assert asset is not None
+    return asset, asset.candles.index[0], asset.candles.index[-1]
+
+
 def test_run(main=False):
-    data = Mysql(db_host=config.get_db_host(), db_port=config.get_db_port(), db_user=config.get_db_user(),
-                 db_pass=config.get_db_pass(), db_name=config.get_db_name())
+    data = get_data()
     asset = data.get_candles_days(symbol=symbol, time_frame=time_frame, days=7)
     assert asset is not None
     #console.debug(f'Dados da moeda {asset.description}')
     #console.debug(asset.get_json_data())
 
 
+def test_cache():
+    cache_dir = tempfile.mkdtemp()
+    data = get_data(cache_dir=cache_dir)
+    asset, start, end = get_period(data)
+    assert data.cache.missing(symbol, time_frame, start, end) == []
+    cached = get_data(cache_dir=cache_dir)
+    assert cached.get_candles(symbol=symbol, time_frame=time_frame, start_date=start, end_date=end).candles.equals(
+        data.get_candles(symbol=symbol, time_frame=time_frame, start_date=start, end_date=end).candles)
+
+
+def test_candles_bulk():
+    data = get_data()
+    asset, start, end = get_period(data)
+    assets = data.get_candles_bulk(symbols=[symbol, 'btcusd'], time_frames=[time_frame, '1h'], start_date=start,
+                                   end_date=end, jobs=2)
+    assert assets[(symbol, time_frame)].candles.equals(asset.candles)
+    for (bulk_symbol, bulk_time_frame), bulk_asset in assets.items():
+        single = data.get_candles(symbol=bulk_symbol, time_frame=bulk_time_frame, start_date=start, end_date=end)
+        assert bulk_asset.candles.equals(single.candles)
+
+
+def test_candles_bucket():
+    data = get_data()
+    asset, start, end = get_period(data)
+    bucket = data.get_candles(symbol=symbol, time_frame=time_frame, start_date=start, end_date=end, bucket='1h')
+    expected = asset.candles.resample('1h').agg({'open': 'first', 'close': 'last', 'low': 'min', 'high': 'max',
+                                                 'volume': 'sum'}).dropna()
+    assert bucket.time_frame == '1h'
+    assert (bucket.candles.index == expected.index).all()
+    prices = ['open', 'close', 'low', 'high']
+    assert (bucket.candles[prices] - expected[prices]).abs().max().max() < 1e-6
+    limited = data.get_candles(symbol=symbol, time_frame=time_frame, start_date=start, end_date=end, max_points=50)
+    assert len(limited.candles) <= 50
+
+
+def test_rollup():
+    data = get_data()
+    asset, start, end = get_period(data)
+    stored = data.get_candles(symbol=symbol, time_frame='1h', start_date=start, end_date=end)
+    calculated = rollup_candles(asset.candles, '1h', base=time_frame)
+    calculated = calculated.loc[stored.candles.index[0]:stored.candles.index[-1]]
+    assert (calculated.index == stored.candles.index).all()
+    prices = ['open', 'close', 'low', 'high']
+    assert ((calculated[prices] / stored.candles[prices] - 1).abs().max().max()) < 1e-5
+    # com rollup=True os candles são calculados a partir de 1m e alinhados em UTC como os da Bitfinex, inclusive 1D
+    rolled = get_data(rollup=True)
+    for rollup_time_frame in ('1h', '1D'):
+        stored = data.get_candles(symbol=symbol, time_frame=rollup_time_frame, start_date=start, end_date=end)
+        calculated = rolled.get_candles(symbol=symbol, time_frame=rollup_time_frame, start_date=start, end_date=end)
+        assert len(calculated.candles) > 0
+        assert calculated.candles.index.isin(stored.candles.index).all()
+        expected = stored.candles.loc[calculated.candles.index, prices]
+        assert ((calculated.candles[prices] / expected - 1).abs().max().max()) < 1e-5
+        bulk = rolled.get_candles_bulk(symbols=[symbol], time_frames=[rollup_time_frame], start_date=start,
+                                       end_date=end)
+        assert bulk[(symbol, rollup_time_frame)].candles.equals(calculated.candles)
+
+
+def test_trade_bars():
+    data = get_data()
+    asset, start, end = get_period(data, days=1)
+    trades = data.get_trades(symbol=symbol, start_date=start, end_date=end)
+    assert trades is not None
+    for bar_type, size in (('time', '5m'), ('tick', 100), ('volume', 10000)):
+        bars = data.get_trade_bars(symbol=symbol, start_date=start, end_date=end, bar_type=bar_type, size=size,
+                                   chunk_size=1000)
+        assert bars.candles.equals(trade_bars(trades.trades, bar_type, size))
+
+
+def test_concurrent():
+    data = get_data()
+    asset, start, end = get_period(data)
+    symbols = data.get_symbols()['symbol'].tolist()
+    assets = data.get_candles_many(symbols=symbols, time_frame=time_frame, start_date=start, end_date=end)
+    assert list(assets) == symbols
+    assert assets[symbol].candles.equals(asset.candles)
+    setups = data.get_setups(symbols=symbols, time_frame=time_frame)
+    assert list(setups) == symbols
+    updated = data.update_many([assets[symbol]])
+    assert updated[0] is assets[symbol]
+
+
 if __name__ == '__main__':
     test_run(main=True)
+    test_cache()
+    test_candles_bulk()
+    test_candles_bucket()
+    test_rollup()
+    test_trade_bars()
+    test_concurrent()
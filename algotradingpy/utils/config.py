@@ -5,7 +5,7 @@ Description: Módulo para tratar as configurações
 File name: config.py
 Author: Daniel Tell <daniel.tell@gmail.com>
 Created on 2022-09-18
-Updated on 2022-09-18
+Updated on 2026-10-17
 """
 
 import os
@@ -36,7 +36,9 @@ config_example = '''{
       "timeframes": ["1m", "5m", "15m", "30m", "1h", "3h", "6h", "12h", "1D", "7D", "14D", "1M"],
       "limit": 5000,
       "interval": 10,
-      "past": "2022-01-01 00:00:00"
+      "past": "2022-01-01 00:00:00",
+      "rollup": false,
+      "concurrency": 4
    },
    "Banco":{
       "host":"",
@@ -97,6 +99,21 @@ def get_limit():
     return __get_config('Coleta', 'limit')
 
 
+def get_rollup() -> bool:
+    r"""Se True o coletor busca na API somente candles de 1m e calcula os demais timeframes localmente."""
+    return util.convert_bool(__get_config('Coleta', 'rollup', False))
+
+
+def get_concurrency() -> int:
+    r"""Quantidade máxima de requests simultâneos à API no modo assíncrono do coletor (--get-data --async)."""
+    try:
+        return max(int(__get_config('Coleta', 'concurrency', 4)), 1)
+    except:
+        console.show_error("Valor {} em 'concurrency' na configuração deve ser um número. Por favor corrija.".
+                           format(__get_config('Coleta', 'concurrency', 4)))
+        return 1
+
+
 def get_interval() -> int:
     try:
         return int(__get_config('Coleta', 'interval'))
@@ -129,11 +146,13 @@ def get_db_name():
     return __get_config('Banco', 'database')
 
 
-def __get_config(section, subsection) :
+def __get_config(section, subsection, default=None):
     if config is None:
         set_file(file)
     try:
         return config[section][subsection]
     except Exception as e:
+        if default is not None and isinstance(e, KeyError):
+            return default  # opção ausente em arquivos de configuração antigos
         console.show_error(f"Erro ao carregar configuração de '{section}': '{subsection}'", e)
         return ""
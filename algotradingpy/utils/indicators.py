@@ -1,6 +1,6 @@
 u"""
 Created on 2021-10-23
-Updated on 2021-11-12
+Updated on 2026-10-17
 
 @author: Daniel Tell
 """
@@ -48,6 +48,22 @@ def calc_rsi(values, start_date, end_date, period):
       :return: uma Serie contendo os valores de IFR
       :rtype: pd.Series
       """
+    roll_up, roll_down = calc_rsi_averages(values, start_date, end_date, period)
+    rsi = calc_rsi_from_averages(roll_up, roll_down)
+    rsi = rsi.loc[start_date: end_date]
+    return rsi
+
+
+def calc_rsi_averages(values, start_date, end_date, period):
+    r""" Calcula as médias móveis exponenciais dos ganhos (up) e das perdas (down) usadas no IFR/RSI.
+
+      :param pd.DataFrame values: valores de preços de fechamento (close) do candle no período de start_date a end_date
+      :param str start_date: data inicial dos registros de values
+      :param str end_date: data final dos registros de values
+      :param int period: periodos que serão utilizados para calcular o IFR
+      :return: uma tupla com as Series das médias dos ganhos e das perdas
+      :rtype: tuple
+      """
     df_tmp = values.loc[start_date: end_date, :]
     close = df_tmp['close']
     delta = close.diff()  # Obtendo a diferença de preço no fechamento do candle
@@ -57,10 +73,283 @@ def calc_rsi(values, start_date, end_date, period):
     down[down > 0] = 0  # Faz as séries dos ganhos negativos (down)
     roll_up = up.ewm(span=int(period), adjust=False).mean()  # Calculando a média móvel exponencial (EMA)
     roll_down = down.abs().ewm(span=int(period), adjust=False).mean()
+    return roll_up, roll_down
+
+
+def calc_rsi_from_averages(roll_up, roll_down):
+    r""" Calcula o IFR/RSI a partir das médias dos ganhos e das perdas (Series ou arrays)."""
     rs = roll_up / roll_down  # Calcule a RSI com base na EMA
-    rsi = 100.0 - (100.0 / (1.0 + rs))
-    rsi = rsi.loc[start_date: end_date]
-    return rsi
+    return 100.0 - (100.0 / (1.0 + rs))
+
+
+def ewm_continue(last, values, period):
+    r""" Continua uma média móvel exponencial (span=period, adjust=False) a partir do seu último valor,
+    produzindo os mesmos valores que o cálculo sobre a série completa.
+
+      :param float last: último valor da média móvel
+      :param np.ndarray values: novos valores da série
+      :param int period: periodos da média móvel
+      :return: array com a média móvel de cada novo valor
+      :rtype: np.ndarray
+      """
+    series = pd.Series(np.append(last, values))
+    return series.ewm(span=int(period), adjust=False).mean().to_numpy()[1:]
+
+
+class EmaStream:
+
+    def __init__(self, period, history=None, last=None):
+        r"""Média móvel exponencial incremental (span=period, adjust=False), com custo O(1) por candle e os mesmos
+        valores de calc_ema. Como no ewm do pandas (ignore_na=False), um valor NaN mantém a média anterior, mas
+        continua contando no decaimento dos pesos, assim o próximo valor recebe um peso maior.
+
+        :param int period: periodos da média móvel
+        :param history: valores históricos para inicializar a média (array, lista ou pd.Series), opcional
+        :param float last: último valor de uma média já calculada, usado no lugar de 'history', opcional
+        """
+        self.period = int(period)
+        self.alpha = 2.0 / (self.period + 1.0)
+        self._decay = 1.0 - self.alpha
+        self.value = np.nan if last is None else float(last)
+        self._missing = 0  # valores NaN recebidos desde o último valor válido
+        if history is not None:
+            self.update(history)
+
+    def update(self, values):
+        r"""Atualiza a média com um novo valor ou com um lote de valores.
+
+        :param values: um valor (float) ou um lote de valores (array, lista ou pd.Series)
+        :return: a média no novo valor (float) ou um array com a média de cada valor do lote
+        :rtype: float or np.ndarray
+        """
+        if np.ndim(values) == 0:
+            value = float(values)
+            if np.isnan(self.value):
+                self.value = value
+            elif np.isnan(value):
+                self._missing += 1
+            else:
+                if self.value != value:  # mesma fórmula do ewm do pandas
+                    decay = self._decay ** (self._missing + 1)
+                    self.value = ((decay * self.value) + (self.alpha * value)) / (decay + self.alpha)
+                self._missing = 0
+            return self.value
+
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return values
+        if np.isnan(self.value):
+            ema = pd.Series(values).ewm(span=self.period, adjust=False).mean().to_numpy()
+        else:  # os NaN pendentes são repetidos antes do lote para manter o decaimento dos pesos
+            missing = np.full(self._missing, np.nan)
+            ema = ewm_continue(self.value, np.append(missing, values), self.period)[self._missing:]
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid) > 0:
+            self._missing = len(values) - 1 - valid[-1]
+        elif not np.isnan(self.value):
+            self._missing += len(values)
+        self.value = ema[-1]
+        return ema
+
+
+class SmaStream:
+
+    def __init__(self, period, history=None):
+        r"""Média móvel simples incremental com janela de 'period' valores, com custo O(1) por candle e os mesmos
+        valores de calc_sma (NaN até completar a janela).
+
+        :param int period: periodos da média móvel
+        :param history: valores históricos para inicializar a média (array, lista ou pd.Series), opcional
+        """
+        self.period = int(period)
+        self.value = np.nan
+        self._window = np.zeros(self.period)  # buffer circular com os últimos 'period' valores
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+        if history is not None:
+            self.update(np.asarray(history, dtype=np.float64)[-self.period:])
+
+    def update(self, values):
+        r"""Atualiza a média com um novo valor ou com um lote de valores.
+
+        :param values: um valor (float) ou um lote de valores (array, lista ou pd.Series)
+        :return: a média no novo valor (float) ou um array com a média de cada valor do lote
+        :rtype: float or np.ndarray
+        """
+        if np.ndim(values) == 0:
+            value = float(values)
+            self._sum += value - self._window[self._pos]
+            self._window[self._pos] = value
+            self._pos = (self._pos + 1) % self.period
+            self._count += 1
+            if self._pos == 0:  # a cada volta do buffer refaz a soma para não acumular erro de arredondamento
+                self._sum = self._window.sum()
+            self.value = self._sum / self.period if self._count >= self.period else np.nan
+            return self.value
+
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return values
+        # janela anterior (em ordem cronológica) seguida do lote, assim o rolling do pandas faz o cálculo vetorizado
+        size = min(self._count, self.period - 1)
+        previous = np.roll(self._window, -self._pos)[self.period - size:]
+        sma = pd.Series(np.append(previous, values)).rolling(window=self.period).mean().to_numpy()[size:]
+        tail = values[-self.period:]
+        for value in tail:  # no máximo 'period' valores para atualizar o buffer
+            self._window[self._pos] = value
+            self._pos = (self._pos + 1) % self.period
+        self._count += len(values)
+        self._sum = self._window.sum()
+        self.value = sma[-1]
+        return sma
+
+
+class RsiStream:
+
+    def __init__(self, period, history=None, last_close=None, roll_up=None, roll_down=None):
+        r"""Índice de força relativa (IFR/RSI) incremental, com custo O(1) por candle e os mesmos valores de
+        calc_rsi. O primeiro preço apenas inicializa o estado e retorna NaN.
+
+        :param int period: periodos que serão utilizados para calcular o IFR
+        :param history: preços de fechamento históricos para inicializar o estado (array, lista ou pd.Series), opcional
+        :param float last_close: último preço de fechamento de um RSI já calculado, opcional
+        :param float roll_up: última média dos ganhos de um RSI já calculado (ver calc_rsi_averages), opcional
+        :param float roll_down: última média das perdas de um RSI já calculado (ver calc_rsi_averages), opcional
+        """
+        self.period = int(period)
+        self.last_close = np.nan if last_close is None else float(last_close)
+        self.up = EmaStream(self.period, last=roll_up)
+        self.down = EmaStream(self.period, last=roll_down)
+        self.value = np.nan
+        if roll_up is not None and roll_down is not None:
+            self.value = float(calc_rsi_from_averages(np.float64(roll_up), np.float64(roll_down)))
+        if history is not None:
+            self.update(history)
+
+    def update(self, values):
+        r"""Atualiza o RSI com um novo preço de fechamento ou com um lote de preços.
+
+        :param values: um preço (float) ou um lote de preços (array, lista ou pd.Series)
+        :return: o RSI no novo preço (float) ou um array com o RSI de cada preço do lote
+        :rtype: float or np.ndarray
+        """
+        if np.ndim(values) == 0:
+            value = float(values)
+            if np.isnan(self.last_close):  # o primeiro preço não tem variação
+                self.last_close = value
+                return np.nan
+            delta = value - self.last_close
+            self.last_close = value
+            up = self.up.update(delta if delta > 0 else 0.0)
+            down = self.down.update(-delta if delta < 0 else 0.0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.value = float(calc_rsi_from_averages(np.float64(up), np.float64(down)))
+            return self.value
+
+        values = np.asarray(values, dtype=np.float64)
+        rsi = np.full(len(values), np.nan)
+        if len(values) == 0:
+            return rsi
+        start = 0
+        if np.isnan(self.last_close):  # o primeiro preço não tem variação
+            self.last_close = values[0]
+            start = 1
+        if start < len(values):
+            delta = np.diff(np.append(self.last_close, values[start:]))
+            up = self.up.update(np.where(delta < 0, 0, delta))
+            down = self.down.update(np.abs(np.where(delta > 0, 0, delta)))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rsi[start:] = calc_rsi_from_averages(up, down)
+            self.last_close = values[-1]
+            self.value = rsi[-1]
+        return rsi
+
+
+INDICATORS = ("ema", "sma", "rsi")  # indicadores aceitos por calc_indicator_matrix
+_MATRIX_BLOCK = 64  # barras por bloco na recursão da EMA em calc_indicator_matrix
+_MATRIX_CHUNK = 1024  # blocos processados por vez, limita a memória temporária
+
+
+def calc_indicator_matrix(close, periods, indicator="ema", dtype=np.float64):
+    r"""Calcula um indicador para vários períodos de uma vez sobre a mesma série de preços, sem criar um DataFrame
+    por período. Os valores são os mesmos de calc_ema, calc_sma e calc_rsi (a menos de arredondamento): a EMA é
+    resolvida em blocos de barras com multiplicação de matrizes para todos os períodos, a SMA usa uma única soma
+    acumulada e o RSI aplica a EMA às séries de ganhos e perdas.
+
+    :param close: preços de fechamento (array, lista ou pd.Series), sem valores NaN
+    :param list periods: lista com os períodos do indicador
+    :param str indicator: um dos valores em INDICATORS: "ema", "sma" ou "rsi"
+    :param dtype: tipo do array retornado, np.float64 (padrão) ou np.float32 para usar metade da memória
+    :return: array (barras x períodos) onde a coluna k é o indicador com periods[k]. Na SMA as primeiras
+    periods[k] - 1 linhas são NaN e no RSI a primeira linha é NaN (não há variação de preço).
+    :rtype: np.ndarray
+    """
+    if indicator not in INDICATORS:
+        raise Exception(f"Valor de indicator é inválido! Valores aceitos: {INDICATORS}")
+    close = np.asarray(close, dtype=np.float64)
+    periods = np.asarray(periods, dtype=np.float64)
+    result = np.empty((len(close), len(periods)), dtype=dtype, order="F")  # colunas contíguas
+    if len(close) == 0 or len(periods) == 0:
+        return result
+
+    if indicator == "ema":
+        _ema_matrix(close, periods, result)
+    elif indicator == "sma":
+        base = close[0]  # soma acumulada dos desvios em relação ao primeiro preço para reduzir o erro numérico
+        cumsum = np.concatenate(([0.0], np.cumsum(close - base)))
+        for k, period in enumerate(periods.astype(np.int64).tolist()):
+            result[:period - 1, k] = np.nan
+            column = result[period - 1:, k]
+            np.subtract(cumsum[period:], cumsum[:-period], out=column, casting="same_kind")
+            column /= period
+            column += base
+    else:
+        delta = np.diff(close)
+        up = np.empty((len(delta), len(periods)), order="F")
+        down = np.empty((len(delta), len(periods)), order="F")
+        _ema_matrix(np.where(delta < 0, 0, delta), periods, up)
+        _ema_matrix(np.abs(np.where(delta > 0, 0, delta)), periods, down)
+        result[0] = np.nan
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result[1:] = calc_rsi_from_averages(up, down)
+    return result
+
+
+def _ema_matrix(values, periods, out):
+    r"""Escreve em 'out' a EMA (span=period, adjust=False) de 'values' para cada período.
+    Dentro de um bloco de B barras, ema[t0 + j] = decay^(j + 1) * ema[t0 - 1] + sum(alpha * decay^(j - i) * x[t0 + i]),
+    a soma de todos os blocos é um único produto de matrizes e só o valor inicial de cada bloco é propagado em
+    sequência (um passo por bloco)."""
+    n, size, count = len(values), _MATRIX_BLOCK, len(periods)
+    if n == 0:
+        return
+    alpha = 2.0 / (periods + 1.0)
+    decay = 1.0 - alpha
+    j = np.arange(size)
+    lags = j[:, None] - j[None, :]  # j - i
+    kernel = np.where(lags >= 0, alpha[:, None, None] * decay[:, None, None] ** np.maximum(lags, 0), 0.0)  # (p, j, i)
+    kernel = kernel.transpose(2, 0, 1).reshape(size, count * size)  # (i, p * j)
+    powers = decay[:, None] ** (j + 1.0)  # (p, j)
+
+    blocks = -(-n // size)
+    padded = np.zeros(blocks * size)
+    padded[:n] = values
+    padded = padded.reshape(blocks, size)
+    columns = out.T  # (p, barras)
+    last = np.full(count, values[0])  # ema[-1] = x[0] resulta em ema[0] = x[0], como no pandas
+    for first in range(0, blocks, _MATRIX_CHUNK):
+        chunk = (padded[first:first + _MATRIX_CHUNK] @ kernel).reshape(-1, count, size)  # (b, p, j)
+        carry = np.empty((len(chunk), count))  # ema[t0 - 1] de cada bloco
+        for b in range(len(chunk)):  # propaga o último valor de cada bloco para o seguinte
+            carry[b] = last
+            last = powers[:, -1] * last + chunk[b, :, -1]
+        start = first * size
+        end = min(start + len(chunk) * size, n)
+        for k in range(count):
+            column = np.multiply.outer(carry[:, k], powers[k])
+            column += chunk[:, k, :]
+            columns[k, start:end] = column.ravel()[:end - start]
 
 
 def get_rsi_thresholds(rsi, strategy):
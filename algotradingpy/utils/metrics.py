@@ -0,0 +1,138 @@
+u"""
+Created on 2026-10-17
+Updated on 2026-10-17
+
+@author: Daniel Tell
+"""
+
+import numpy as np
+
+NS_PER_DAY = 86_400_000_000_000  # nanosegundos em um dia
+DAYS_PER_YEAR = 365  # o mercado de criptomoedas opera todos os dias
+METRICS = ("max_drawdown", "sharpe", "sortino", "exposure", "trades", "profit_factor")  # chaves de calc_metrics
+PERIODS = ("D", "W")  # agrupamentos aceitos por period_end_bars: diário e semanal (semanas iniciando na segunda)
+
+
+def day_number(times):
+    r"""Número do dia (desde 1970-01-01) de timestamps int64 em nanosegundos."""
+    return times // NS_PER_DAY
+
+
+def period_end_bars(times, period="D"):
+    r"""Retorna as posições da última barra de cada dia ou semana, usadas para reamostrar a curva de capital sem
+    passar pelo pandas.
+
+    :param np.ndarray times: timestamps int64 (ns) das barras, em ordem crescente
+    :param str period: "D" (diário) ou "W" (semanal)
+    :return: array com as posições das barras
+    :rtype: np.ndarray
+    """
+    if period not in PERIODS:
+        raise Exception(f"Valor de period é inválido! Valores aceitos: {PERIODS}")
+    if len(times) == 0:
+        return np.empty(0, dtype=np.int64)
+    key = day_number(times)
+    if period == "W":
+        key = (key + 3) // 7  # 1970-01-01 foi uma quinta-feira
+    return np.append(np.flatnonzero(key[1:] != key[:-1]), len(times) - 1)
+
+
+def periods_per_year(times):
+    r"""Quantidade de barras por ano, estimada pela mediana do intervalo entre as barras."""
+    if len(times) < 2:
+        return np.nan
+    return DAYS_PER_YEAR * NS_PER_DAY / np.median(np.diff(times))
+
+
+def bar_returns(equity, start_money):
+    r"""Retorno de cada barra da curva de capital, a primeira em relação ao saldo inicial."""
+    previous = np.empty_like(equity)
+    previous[0] = start_money
+    previous[1:] = equity[:-1]
+    return equity / previous - 1
+
+
+def max_drawdown(equity, start_money):
+    r"""Maior queda (%) da curva de capital em relação ao maior saldo anterior, ex.: -12.5 para uma queda de 12,5%."""
+    if len(equity) == 0:
+        return 0.0
+    peak = np.maximum.accumulate(np.maximum(equity, start_money))
+    return float(np.min(equity / peak - 1) * 100)
+
+
+def sharpe(equity, times, start_money):
+    r"""Índice de Sharpe anualizado dos retornos por barra (taxa livre de risco igual a zero)."""
+    returns = bar_returns(equity, start_money)
+    if len(returns) < 2:
+        return np.nan
+    std = np.std(returns, ddof=1)
+    if std == 0:
+        return np.nan
+    return float(np.mean(returns) / std * np.sqrt(periods_per_year(times)))
+
+
+def sortino(equity, times, start_money):
+    r"""Índice de Sortino anualizado: como o Sharpe, mas considera só o desvio dos retornos negativos."""
+    returns = bar_returns(equity, start_money)
+    if len(returns) < 2:
+        return np.nan
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    if downside == 0:
+        return np.nan
+    return float(np.mean(returns) / downside * np.sqrt(periods_per_year(times)))
+
+
+def exposure(position):
+    r"""Porcentagem das barras em posição comprado."""
+    if len(position) == 0:
+        return 0.0
+    return float(np.count_nonzero(position) / len(position) * 100)
+
+
+def trade_results(equity, position, start_money):
+    r"""Resultado em USD de cada operação (compra até a venda), a última marcada a mercado se ainda estiver aberta.
+
+    :param np.ndarray equity: saldo da carteira em USD no fim de cada barra
+    :param np.ndarray position: True nas barras em que a carteira terminou comprada
+    :param float start_money: saldo inicial da carteira
+    :return: array com o lucro/prejuízo de cada operação
+    :rtype: np.ndarray
+    """
+    if len(position) == 0:
+        return np.empty(0)
+    held = position.astype(np.int8)
+    change = np.diff(held, prepend=0)
+    entries = np.flatnonzero(change == 1)
+    exits = np.flatnonzero(change == -1)  # barra da venda, o saldo já está em USD
+    if len(exits) < len(entries):
+        exits = np.append(exits, len(equity) - 1)
+    before = np.where(entries > 0, equity[np.maximum(entries - 1, 0)], start_money)  # saldo antes da compra
+    return equity[exits] - before
+
+
+def profit_factor(results):
+    r"""Soma dos lucros dividida pela soma dos prejuízos das operações (inf se não houve prejuízo)."""
+    gains = results[results > 0].sum()
+    losses = -results[results < 0].sum()
+    if losses == 0:
+        return np.inf if gains > 0 else np.nan
+    return float(gains / losses)
+
+
+def calc_metrics(equity, position, times, start_money) -> dict:
+    r"""Calcula as métricas de desempenho de uma curva de capital por barra.
+
+    :param np.ndarray equity: saldo da carteira em USD no fim de cada barra
+    :param np.ndarray position: True nas barras em que a carteira terminou comprada
+    :param np.ndarray times: timestamps int64 (ns) das barras
+    :param float start_money: saldo inicial da carteira
+    :return: dicionário com max_drawdown, sharpe, sortino, exposure, trades e profit_factor
+    :rtype: dict
+    """
+    results = trade_results(equity, position, start_money)
+    return {"max_drawdown": max_drawdown(equity, start_money),
+            "sharpe": sharpe(equity, times, start_money),
+            "sortino": sortino(equity, times, start_money),
+            "exposure": exposure(position),
+            "trades": len(results),
+            "profit_factor": profit_factor(results)}
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+u"""
+Created on 2026-10-17
+Updated on 2026-10-17
+
+@author: Daniel Tell
+"""
+import random
+import threading
+import time
+from collections import deque
+
+BACKOFF_BASE = 2.0  # segundos de espera após o primeiro HTTP 429 sem Retry-After
+BACKOFF_MAX = 120.0  # espera máxima do backoff exponencial
+
+
+class TokenBucket:
+
+    def __init__(self, limit, window=60.0, burst=None):
+        r"""Balde de tokens para no máximo 'limit' requests em qualquer janela de 'window' segundos: o balde guarda
+        até 'burst' tokens e é reabastecido a (limit - burst) / window tokens por segundo, assim mesmo uma rajada com
+        o balde cheio seguida de requests contínuos não passa do limite. Com HTTP 429 o balde fica parado (stall)
+        pelo tempo de Retry-After ou de um backoff exponencial com jitter.
+
+        :param int limit: quantidade de requests permitidos por janela
+        :param float window: tamanho da janela em segundos
+        :param int burst: tokens do balde cheio (requests seguidos sem espera), padrão limit // 5
+        """
+        self.limit = limit
+        self.window = window
+        self.burst = max(1, min(burst if burst is not None else limit // 5, limit - 1)) if limit > 1 else 1
+        self.rate = max(limit - self.burst, 1) / window  # tokens por segundo
+        self.requests = 0  # requests liberados
+        self.throttled = 0  # respostas de limite excedido (HTTP 429)
+        self.waited = 0.0  # soma das esperas (segundos)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._stalled_until = 0.0
+        self._failures = 0  # 429 seguidos, expoente do backoff
+        self._history = deque()  # momentos dos requests da última janela, para a utilização
+        self._lock = threading.Lock()
+
+    def delay(self):
+        r"""Segundos até o próximo token, sem consumi-lo."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return max(self._stalled_until - now, (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0, 0.0)
+
+    def reserve(self):
+        r"""Consome um token e retorna quantos segundos o request deve esperar antes de ser feito. Os tokens podem
+        ficar negativos, assim requests concorrentes recebem esperas sucessivas."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(self._stalled_until - now, -self._tokens / self.rate if self._tokens < 0 else 0.0, 0.0)
+            self.requests += 1
+            self.waited += wait
+            self._history.append(now + wait)
+            return wait
+
+    def acquire(self):
+        r"""Espera (bloqueando a thread) até o request poder ser feito e retorna o tempo de espera."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def backoff(self, retry_after=None):
+        r"""Registra um HTTP 429 e para o balde por 'retry_after' segundos (cabeçalho Retry-After) ou por um backoff
+        exponencial (BACKOFF_BASE * 2^(429 seguidos - 1), até BACKOFF_MAX), com jitter para que os requests parados
+        não voltem todos juntos.
+
+        :return: segundos de espera
+        :rtype: float
+        """
+        with self._lock:
+            self.throttled += 1
+            self._failures += 1
+            try:
+                delay = float(retry_after) + random.uniform(0, 1)
+            except (TypeError, ValueError):
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self._failures - 1))
+                delay = random.uniform(delay / 2, delay)
+            now = time.monotonic()
+            self._stalled_until = max(self._stalled_until, now + delay)
+            self._tokens = min(self._tokens, 0.0)
+            return delay
+
+    def success(self):
+        r"""Registra uma resposta que não foi limitada, reiniciando o backoff."""
+        with self._lock:
+            self._failures = 0
+
+    def stats(self):
+        r"""Dicionário com requests, throttled (429), waited (segundos de espera), last_window (requests na última
+        janela) e utilization (last_window / limit)."""
+        with self._lock:
+            now = time.monotonic()
+            while self._history and self._history[0] <= now - self.window:
+                self._history.popleft()
+            last_window = sum(1 for moment in self._history if moment <= now)
+            return {"requests": self.requests, "throttled": self.throttled, "waited": round(self.waited, 3),
+                    "last_window": last_window, "utilization": round(last_window / self.limit, 3)}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateLimiter:
+
+    def __init__(self, limits, window=60.0):
+        r"""Um TokenBucket por endpoint, compartilhado por todas as threads que fazem requests.
+
+        :param dict limits: endpoint -> quantidade de requests permitidos por janela
+        :param float window: tamanho da janela em segundos
+        """
+        self.buckets = dict((endpoint, TokenBucket(limit, window)) for endpoint, limit in limits.items())
+
+    def __getitem__(self, endpoint) -> TokenBucket:
+        if endpoint not in self.buckets:
+            raise Exception(f"Valor de endpoint '{endpoint}' é inválido! Valores aceitos: {list(self.buckets)}")
+        return self.buckets[endpoint]
+
+    def stats(self):
+        r"""Estatísticas (TokenBucket.stats) de cada endpoint."""
+        return dict((endpoint, bucket.stats()) for endpoint, bucket in self.buckets.items())
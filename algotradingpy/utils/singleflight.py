@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+u"""
+Created on 2026-10-17
+Updated on 2026-10-17
+
+@author: Daniel Tell
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+_MISSING = object()  # marcador de resultado ausente (ou expirado) no LRU
+
+
+class SingleFlight:
+
+    def __init__(self, ttl=0.0, max_results=0):
+        r"""Agrupa chamadas concorrentes com a mesma chave em uma única execução: a primeira thread executa a função e
+        as demais esperam e recebem o mesmo resultado. Os resultados recentes ficam em um LRU por 'ttl' segundos,
+        então chamadas repetidas logo em seguida também não executam a função de novo.
+
+        :param float ttl: tempo (segundos) que um resultado fica no LRU, 0 para não guardar resultados
+        :param int max_results: quantidade máxima de resultados no LRU, os usados há mais tempo são descartados
+        """
+        self.ttl = ttl
+        self.max_results = max_results
+        self.calls = 0  # execuções da função
+        self.shared = 0  # chamadas que esperaram uma execução em andamento
+        self.hits = 0  # chamadas atendidas pelo LRU
+        self._lock = threading.Lock()
+        self._in_flight = {}  # chave -> Future da execução em andamento
+        self._results = OrderedDict()  # chave -> (expiração, resultado), do usado há mais tempo ao mais recente
+
+    def do(self, key, function, *args, **kwargs):
+        r"""Executa function(*args, **kwargs), ou retorna o resultado da execução em andamento (ou recente) com a
+        mesma chave. Exceções da execução são repassadas a todas as chamadas que a esperavam e não ficam no LRU.
+
+        :param key: chave (hashable) que identifica a chamada
+        :param function: função executada
+        :return: resultado da função, o mesmo objeto para todas as chamadas agrupadas
+        """
+        leader = False
+        with self._lock:
+            result = self._get_result(key)
+            if result is not _MISSING:
+                self.hits += 1
+                return result
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.shared += 1
+            else:
+                future = self._in_flight[key] = Future()
+                self.calls += 1
+                leader = True
+        if not leader:
+            return future.result()
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            self._set_result(key, result)
+        future.set_result(result)
+        return result
+
+    def clear(self):
+        r"""Descarta os resultados do LRU (as execuções em andamento não são afetadas)."""
+        with self._lock:
+            self._results.clear()
+
+    def _get_result(self, key):
+        r"""Resultado de 'key' no LRU, ou _MISSING se não existir ou estiver expirado."""
+        entry = self._results.get(key)
+        if entry is None:
+            return _MISSING
+        if entry[0] <= time.monotonic():
+            del self._results[key]
+            return _MISSING
+        self._results.move_to_end(key)
+        return entry[1]
+
+    def _set_result(self, key, result):
+        r"""Guarda 'result' no LRU, a não ser que seja None (consultas que falharam retornam None)."""
+        if self.ttl <= 0 or self.max_results <= 0 or result is None:
+            return
+        self._results[key] = (time.monotonic() + self.ttl, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
@@ -4,7 +4,7 @@ Description: módulo com constantes e métodos úteis para ser utilizado em toda
 File name: util.py
 Author: Daniel Tell <daniel.tell@gmail.com>
 Date created: 03/10/2021
-Date last modified: 30/09/2022
+Date last modified: 17/10/2026
 """
 
 import math
@@ -64,8 +64,33 @@ CREATE_TBL_SETUPS = '''CREATE TABLE IF NOT EXISTS setups(
     PRIMARY KEY (id)
     )ENGINE=InnoDB;'''
 
+# Catálogo com o intervalo de tempo e a quantidade de candles de cada símbolo e timeframe em candles_raw, mantido pelo
+# coletor a cada inserção para que as consultas de símbolos e datas não precisem percorrer toda a tabela candles_raw
+CREATE_TBL_CANDLE_COVERAGE = '''CREATE TABLE IF NOT EXISTS candle_coverage(
+    cid SMALLINT NOT NULL COMMENT 'Chave do symbol na tabela coins',
+    timeframe ENUM('1m', '5m', '15m', '30m', '1h', '3h', '6h', '12h', '1D', '7D', '14D', '1M') CHARACTER SET latin1 COLLATE latin1_general_cs NOT NULL,
+    mintime timestamp NOT NULL COMMENT 'Data e hora do primeiro candle em candles_raw',
+    maxtime timestamp NOT NULL COMMENT 'Data e hora do último candle em candles_raw',
+    candles INT UNSIGNED NOT NULL COMMENT 'Quantidade de candles em candles_raw',
+    lastday DATE NOT NULL COMMENT 'Dia do último candle em candles_raw',
+    PRIMARY KEY (cid, timeframe)
+    ) ENGINE=MyISAM;'''
+
+# Janelas da carga histórica (--backfill): uma linha por símbolo, timeframe (ou 'trades') e início da janela, marcada
+# como concluída (done_at) depois que todos os registros da janela foram gravados, para continuar após uma falha
+CREATE_TBL_BACKFILL = '''CREATE TABLE IF NOT EXISTS backfill(
+    cid SMALLINT NOT NULL COMMENT 'Chave do symbol na tabela coins',
+    timeframe VARCHAR(6) NOT NULL COMMENT 'Timeframe dos candles ou trades',
+    starttime timestamp NOT NULL COMMENT 'Início da janela',
+    endtime timestamp NOT NULL COMMENT 'Fim (exclusivo) da janela',
+    records INT UNSIGNED NOT NULL DEFAULT 0 COMMENT 'Quantidade de registros recebidos da API na janela',
+    done_at timestamp NULL DEFAULT NULL COMMENT 'Data e hora em que a janela foi concluída',
+    PRIMARY KEY (cid, timeframe, starttime)
+    ) ENGINE=MyISAM;'''
+
 CREATE_TABLES = {"coins": CREATE_TBL_COINS, "candles_raw": CREATE_TBL_CANDLES_RAW, "trades_raw" : CREATE_TBL_TRADES_RAW,
-                 "setups": CREATE_TBL_SETUPS}
+                 "setups": CREATE_TBL_SETUPS, "candle_coverage": CREATE_TBL_CANDLE_COVERAGE,
+                 "backfill": CREATE_TBL_BACKFILL}
 
 # Número máximo de registros
 API_TIME_FRAMES = ('1m', '5m', '15m', '30m', '1h', '3h', '6h', '12h', '1D', '1W', '14D', '1M')
@@ -73,28 +98,68 @@ API_GET_SYMBOLS = 'https://api.bitfinex.com/v1/symbols'
 API_GET_TRADES_V1 = 'https://api.bitfinex.com/v1/trades/{}?limit_trades={}&type=buy&timestamp={}'
 API_GET_TRADES_V2 = 'https://api-pub.bitfinex.com/v2/trades/t{}/hist?limit={}&start={}&end={}&sort=1'
 API_GET_CANDLES = 'https://api.bitfinex.com/v2/candles/trade:{}:t{}/hist?limit={}&start={}&end={}&sort=1'
+API_TIMEOUT = 30  # segundos de espera pela resposta de cada request da API
+API_RETRIES = 3  # novas tentativas de um request da API depois de um HTTP 429
+API_CLOSE_DELAY = 2  # segundos depois do fechamento de um candle para consultá-lo na API
+# requests por minuto permitidos em cada endpoint da API REST v2 da Bitfinex (documentação de cada endpoint)
+API_RATE_LIMITS = {"trades": 15, "candles": 30}
+BACKFILL_TRADES = "trades"  # 'timeframe' das janelas de trades na tabela backfill
+BACKFILL_TRADES_WINDOW = 6 * 3600  # segundos de cada janela de trades da carga histórica
 
 # Instruções Insert SQL
 INSERT_TBL_COINS = '''INSERT IGNORE INTO coins (symbol, description, type, lastintrade, lastincandle) 
     VALUES (%s,%s, %s, (SELECT FROM_UNIXTIME(1)), (SELECT FROM_UNIXTIME(1)))'''
-INSERT_TBL_TRADES= '''INSERT IGNORE INTO trades_raw (tid, time, price, amount, exchange, type, cid)  
-    VALUES (%s,(SELECT FROM_UNIXTIME(%s  * 0.001)),%s,%s,%s,%s,%s)'''
-INSERT_TBL_CANDLES = '''INSERT IGNORE INTO candles_raw (time, open, close, high, low, volume, cid, timeframe) 
-    VALUES ( (SELECT FROM_UNIXTIME(%s * 0.001)),%s, %s, %s, %s, %s, %s, %s)'''
+# inserções em lote (get_insert_rows): '{}' recebe uma lista VALUES_TBL_* por registro. As datas são enviadas em ms
+# e convertidas por FROM_UNIXTIME no fuso horário da sessão do MySQL, como nas demais instruções
+INSERT_TBL_TRADES = '''INSERT IGNORE INTO trades_raw (tid, time, price, amount, exchange, type, cid) VALUES {}'''
+VALUES_TBL_TRADES = '(%s, FROM_UNIXTIME(%s * 0.001), %s, %s, %s, %s, %s)'
+INSERT_TBL_CANDLES = '''INSERT IGNORE INTO candles_raw (time, open, close, high, low, volume, cid, timeframe)
+    VALUES {}'''
+VALUES_TBL_CANDLES = '(FROM_UNIXTIME(%s * 0.001), %s, %s, %s, %s, %s, %s, %s)'
+INSERT_BATCH = 1000  # registros por instrução INSERT em lote
+# argumentos: cid, timeframe, timestamp (ms) do primeiro e do último candle inserido e quantidade de candles inseridos
+UPSERT_TBL_CANDLE_COVERAGE = '''INSERT INTO candle_coverage (cid, timeframe, mintime, maxtime, candles, lastday)
+    VALUES (%s, %s, FROM_UNIXTIME(%s * 0.001), FROM_UNIXTIME(%s * 0.001), %s, DATE(FROM_UNIXTIME(%s * 0.001)))
+    ON DUPLICATE KEY UPDATE mintime = LEAST(mintime, VALUES(mintime)), maxtime = GREATEST(maxtime, VALUES(maxtime)),
+    candles = candles + VALUES(candles), lastday = DATE(maxtime)'''
+# janelas da carga histórica (get_insert_rows), argumentos: cid, timeframe, início e fim (ms) de cada janela. Uma
+# janela que já existe e recebe um fim maior (ex.: a última janela em uma nova carga) volta a ficar pendente
+INSERT_TBL_BACKFILL = '''INSERT INTO backfill (cid, timeframe, starttime, endtime) VALUES {}
+    ON DUPLICATE KEY UPDATE done_at = IF(VALUES(endtime) > endtime, NULL, done_at),
+    endtime = GREATEST(endtime, VALUES(endtime))'''
+VALUES_TBL_BACKFILL = '(%s, %s, FROM_UNIXTIME(%s * 0.001), FROM_UNIXTIME(%s * 0.001))'
+# recria o catálogo a partir de candles_raw (percorre toda a tabela, usado apenas quando o catálogo está vazio)
+REBUILD_TBL_CANDLE_COVERAGE = '''REPLACE INTO candle_coverage (cid, timeframe, mintime, maxtime, candles, lastday)
+    SELECT cid, timeframe, MIN(time), MAX(time), COUNT(*), DATE(MAX(time)) FROM candles_raw GROUP BY cid, timeframe'''
 
 # Instruções Update SQL
 UPDATE_DESCRIPTION_TBL_COINS = 'UPDATE coins SET description=%s WHERE cid = %s'
-UPDATE_LASTINTRADE_TBL_COINS = 'UPDATE coins SET lastintrade=(SELECT FROM_UNIXTIME(%s * 0.001)) WHERE cid = %s'
-UPDATE_LASTINCANDLE_TBL_COINS = 'UPDATE coins SET lastincandle=(SELECT FROM_UNIXTIME(%s * 0.001)) WHERE cid = %s'
+# GREATEST: as janelas da carga histórica podem ser gravadas fora de ordem
+UPDATE_LASTINTRADE_TBL_COINS = 'UPDATE coins SET lastintrade=GREATEST(lastintrade, FROM_UNIXTIME(%s * 0.001)) ' \
+                               'WHERE cid = %s'
+UPDATE_LASTINCANDLE_TBL_COINS = 'UPDATE coins SET lastincandle=GREATEST(lastincandle, FROM_UNIXTIME(%s * 0.001)) ' \
+                                'WHERE cid = %s'
+UPDATE_DONE_TBL_BACKFILL = 'UPDATE backfill SET done_at = NOW(), records = %s WHERE cid = %s AND timeframe = %s ' \
+                           'AND starttime = FROM_UNIXTIME(%s * 0.001)'
 
 # Consultas SQL
 SELECT_ALL_COINS = "SELECT cid, symbol, description FROM coins WHERE type='cryptocurrency' "
-SELECT_LAST_IN_CANDLE = "SELECT IFNULL(Max( UNIX_TIMESTAMP(time)), %s) FROM candles_raw " \
-                        "WHERE cid = (SELECT cid FROM coins WHERE symbol = %s LIMIT 1) AND timeframe = %s "
+SELECT_LAST_IN_CANDLES = "SELECT c.symbol, cv.timeframe, UNIX_TIMESTAMP(cv.maxtime) FROM candle_coverage cv " \
+                         "INNER JOIN coins c ON c.cid = cv.cid"
+SELECT_COUNT_CANDLE_COVERAGE = "SELECT COUNT(*) FROM candle_coverage"
+# candles no formato da API da Bitfinex ([MTS, OPEN, CLOSE, HIGH, LOW, VOLUME]) a partir de um timestamp em ms
+SELECT_CANDLES_SINCE = "SELECT CAST(UNIX_TIMESTAMP(time) * 1000 AS UNSIGNED), open, close, high, low, volume " \
+                       "FROM candles_raw WHERE cid = %s AND timeframe = %s AND time >= FROM_UNIXTIME(%s * 0.001) " \
+                       "ORDER BY time ASC"
+SELECT_PENDING_BACKFILL = "SELECT b.cid, b.timeframe, CAST(UNIX_TIMESTAMP(b.starttime) * 1000 AS UNSIGNED), " \
+                          "CAST(UNIX_TIMESTAMP(b.endtime) * 1000 AS UNSIGNED) FROM backfill b " \
+                          "WHERE b.done_at IS NULL ORDER BY b.starttime"
 SELECT_LAST_IN_TRADE = "SELECT cid, lastintrade FROM coins WHERE symbol = %s AND type = %s LIMIT 1"
 
 # Configurações gerais
 STRATEGIES = {"MAxMA": 1, "MAxPrice": 2, "RSI_Min_Max": 3, "RSI_Quartiles": 4, "RSI_Outliers": 5, "RSI_AVG": 6}
+ENGINES = ("array", "loop")  # motores de backtest: vetorizado (NumPy) ou iteração linha a linha (referência)
+TIME_FRAME_UNITS = {"m": 60, "h": 3600, "D": 86400, "W": 604800}  # segundos de cada unidade de timeframe (sem 'M')
 #KIND = {"Short_MA": 1, "Long_MA": 2, "RSI_Min_Max": 3, "RSI_Quartiles": 4, "RSI_Outliers": 5, "RSI_AVG": 6}
 
 
@@ -137,3 +202,39 @@ def convert_bool(value):
     except:
         return False
 
+
+def get_time_frame_seconds(time_frame):
+    r"""Converte um timeframe (ex.: 15m, 1h, 1D) na sua duração em segundos. O timeframe de mês (1M) não é aceito,
+    pois não possui duração fixa.
+
+    :param str time_frame: quantidade seguida de uma unidade de TIME_FRAME_UNITS
+    :return: duração em segundos
+    :rtype: int
+    """
+    value, unit = str(time_frame)[:-1], str(time_frame)[-1:]
+    if not is_valid_numbers(value) or int(value) <= 0 or unit not in TIME_FRAME_UNITS:
+        raise Exception(f"Valor de time_frame '{time_frame}' é inválido! Unidades aceitas: {list(TIME_FRAME_UNITS)}")
+    return int(value) * TIME_FRAME_UNITS[unit]
+
+
+def get_time_frame(seconds):
+    r"""Converte uma duração em segundos no timeframe com a maior unidade exata, ex.: 5400 -> 90m, 7200 -> 2h."""
+    for unit, size in sorted(TIME_FRAME_UNITS.items(), key=lambda item: -item[1]):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+def get_insert_rows(insert, rows, values=None):
+    r"""Divide 'rows' em instruções INSERT de até INSERT_BATCH registros cada, com uma lista de VALUES por registro.
+
+    :param str insert: instrução INSERT com '{}' no lugar de VALUES (ex.: INSERT_TBL_CANDLES)
+    :param list rows: registros (tuplas com a mesma quantidade de campos)
+    :param str values: lista VALUES de um registro (ex.: VALUES_TBL_CANDLES), padrão um %s por campo
+    :return: gerador de tuplas (instrução, argumentos) para cursor.execute
+    """
+    for i in range(0, len(rows), INSERT_BATCH):
+        batch = rows[i:i + INSERT_BATCH]
+        row_values = values if values is not None else "(" + ", ".join(["%s"] * len(batch[0])) + ")"
+        yield insert.format(", ".join([row_values] * len(batch))), [value for row in batch for value in row]
+